@@ -0,0 +1,245 @@
+"""
+Memory benchmark for the gateway caches and watch-list entries.
+
+Feeds synthetic GUILD_CREATE (and MESSAGE_CREATE) payloads into discord.py's
+connection state under the library defaults and under the bot's tuned
+gateway options, then compares watch entries kept as the dicts n8n returns
+against `WatchEntry`. Reports traced allocations and the RSS growth for
+each, scaled to 1k guilds and 10k watched products.
+
+Usage:
+    python -m src.bench_memory [--guilds 1000] [--watches 10000]
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import resource
+import tracemalloc
+
+import discord
+from discord.ext import commands
+
+from .bot import gateway_options
+from .services import WatchEntry, WatchStore
+
+BASE_ID = 1_000_000_000_000_000_000
+
+
+def rss_bytes() -> int:
+    """Current resident set size (peak RSS where /proc isn't available)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # ru_maxrss is KB on Linux, bytes on macOS; only used as a fallback
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def measure(build) -> tuple[object, int, int]:
+    """Run `build` and return its result with traced and RSS growth in bytes."""
+    gc.collect()
+    tracemalloc.start()
+    rss_before = rss_bytes()
+    result = build()
+    gc.collect()
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, traced, rss_bytes() - rss_before
+
+
+def guild_payload(index: int, rng: random.Random) -> dict:
+    """A mid-sized guild: channels, roles, emojis, stickers, a few members and voice states."""
+    guild_id = BASE_ID + index * 1000
+    members = [
+        {
+            "user": {
+                "id": str(guild_id + 500 + m),
+                "username": f"user{index}_{m}",
+                "discriminator": "0",
+                "global_name": f"User {m}",
+                "avatar": None,
+            },
+            "roles": [str(guild_id + 100 + rng.randrange(30))],
+            "joined_at": "2025-01-01T00:00:00+00:00",
+            "deaf": False,
+            "mute": False,
+            "flags": 0,
+        }
+        for m in range(25)
+    ]
+    return {
+        "id": str(guild_id),
+        "name": f"Guild {index}",
+        "owner_id": str(guild_id + 500),
+        "member_count": 250,
+        "features": [],
+        "channels": [
+            {
+                "id": str(guild_id + c),
+                "type": 0 if c < 20 else 2,
+                "name": f"channel-{c}",
+                "position": c,
+                "permission_overwrites": [],
+                "topic": "Homelab alerts and logs" if c < 20 else None,
+                "bitrate": 64000,
+                "user_limit": 0,
+            }
+            for c in range(1, 26)
+        ],
+        "roles": [
+            {
+                "id": str(guild_id + 100 + r),
+                "name": f"role-{r}",
+                "color": 0,
+                "hoist": False,
+                "position": r,
+                "permissions": "0",
+                "managed": False,
+                "mentionable": False,
+            }
+            for r in range(30)
+        ],
+        "emojis": [
+            {"id": str(guild_id + 200 + e), "name": f"emoji{e}", "roles": [], "animated": False}
+            for e in range(50)
+        ],
+        "stickers": [
+            {
+                "id": str(guild_id + 300 + s),
+                "name": f"sticker{s}",
+                "description": "",
+                "tags": "tag",
+                "format_type": 1,
+                "type": 2,
+                "guild_id": str(guild_id),
+            }
+            for s in range(5)
+        ],
+        "members": members,
+        "voice_states": [
+            {
+                "user_id": members[v]["user"]["id"],
+                "channel_id": str(guild_id + 21),
+                "session_id": f"session{v}",
+                "deaf": False,
+                "mute": False,
+                "self_deaf": False,
+                "self_mute": False,
+                "suppress": False,
+            }
+            for v in range(5)
+        ],
+        "threads": [],
+        "stage_instances": [],
+        "guild_scheduled_events": [],
+    }
+
+
+def message_payload(guild_index: int, number: int) -> dict:
+    guild_id = BASE_ID + guild_index * 1000
+    return {
+        "id": str(guild_id + 900 + number),
+        "channel_id": str(guild_id + 1),
+        "guild_id": str(guild_id),
+        "author": {
+            "id": str(guild_id + 500),
+            "username": "someone",
+            "discriminator": "0",
+            "avatar": None,
+        },
+        "content": "is the travel router back in stock yet? " * 3,
+        "timestamp": "2026-10-01T12:00:00+00:00",
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+    }
+
+
+def fill_gateway(options: dict, guilds: int, messages: int) -> commands.Bot:
+    bot = commands.Bot(command_prefix="!", **options)
+    state = bot._connection
+    rng = random.Random(0)
+    for index in range(guilds):
+        state._add_guild_from_data(guild_payload(index, rng))
+    # Message events only arrive (and get cached) with the messages intent;
+    # this is what MESSAGE_CREATE does, minus dispatching the event
+    if options["intents"].guild_messages and state._messages is not None:
+        for number in range(messages):
+            data = message_payload(number % guilds, number)
+            channel, _ = state._get_guild_channel(data)
+            state._messages.append(discord.Message(channel=channel, data=data, state=state))
+    return bot
+
+
+def watch_dicts(count: int) -> list[dict]:
+    """Watch entries in the shape n8n returns them, as decoded from JSON."""
+    products = [
+        {
+            "url": f"https://www.bestbuy.com/site/item/{6500000 + i % (count // 4 or 1)}.p",
+            "product_name": f"Product {i % (count // 4 or 1)}",
+            "guild_id": str(BASE_ID + (i % 1000) * 1000),
+            "added_by": f"user{i % 200}",
+            "interval_minutes": 5,
+            "logs_channel_id": str(BASE_ID + (i % 1000) * 1000 + 1),
+            "alerts_channel_id": str(BASE_ID + (i % 1000) * 1000 + 2),
+            "added_at": "2026-10-01T12:00:00.000Z",
+            "last_checked": "2026-10-19T08:30:00.000Z",
+            "last_in_stock": False,
+        }
+        for i in range(count)
+    ]
+    # Round-trip so every string is a separate object, as after a real fetch
+    return json.loads(json.dumps(products))
+
+
+def watch_store(products: list[dict]) -> WatchStore:
+    store = WatchStore()
+    for product in products:
+        store.add("bestbuy-stock-watch", WatchEntry.from_dict(product))
+    return store
+
+
+def report(label: str, traced: int, rss: int, count: int, per: int):
+    scale = per / count
+    print(
+        f"{label:<32} {traced * scale / 1e6:>10.2f} MB traced {rss * scale / 1e6:>10.2f} MB RSS"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark gateway cache and watch memory")
+    parser.add_argument("--guilds", type=int, default=1000, help="Synthetic guilds to load")
+    parser.add_argument("--messages", type=int, default=1000, help="Messages sent while cached")
+    parser.add_argument("--watches", type=int, default=10000, help="Watched products")
+    args = parser.parse_args()
+
+    library_intents = discord.Intents.default()
+    library_intents.message_content = True
+    library = {"intents": library_intents}
+
+    print(f"Per 1k guilds ({args.guilds} loaded, {args.messages} messages):")
+    keep, traced, rss = measure(lambda: fill_gateway(library, args.guilds, args.messages))
+    report("  discord.py defaults", traced, rss, args.guilds, 1000)
+    del keep
+    keep, traced, rss = measure(lambda: fill_gateway(gateway_options(), args.guilds, args.messages))
+    report("  tuned gateway options", traced, rss, args.guilds, 1000)
+    del keep
+
+    print(f"\nPer 10k watched products ({args.watches} loaded):")
+    products, traced, rss = measure(lambda: watch_dicts(args.watches))
+    report("  n8n dicts", traced, rss, args.watches, 10000)
+    keep, traced, rss = measure(lambda: watch_store(products))
+    del products
+    report("  WatchEntry store", traced, rss, args.watches, 10000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Micro-benchmark for bot <-> n8n payload encoding and transfer.
+
+Compares the available JSON codecs on payloads shaped like each cog's
+traffic, then times round trips through N8NClient against a local echo
+server with and without request compression.
+
+Usage:
+    python -m src.bench_n8n [--repeat 200] [--transfers 20]
+"""
+import argparse
+import asyncio
+import gzip
+import random
+import string
+import time
+
+from aiohttp import web
+
+from .services.codec import ORJSON_CODEC, STDLIB_CODEC, JSONCodec
+from .services.n8n import N8NClient
+
+ECHO_PORT = 8799
+
+
+def _words(count: int) -> str:
+    rng = random.Random(count)
+    return " ".join(
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 10))) for _ in range(count)
+    )
+
+
+def sample_payloads() -> dict[str, dict]:
+    """Representative request/response bodies for each cog."""
+    html = "<div class='product'>" + _words(40000) + "</div>"
+    return {
+        "stock-check": {
+            "url": "https://store.ui.com/us/en/products/utr",
+            "product": "UniFi Travel Router",
+            "in_stock": False,
+            "price": "$79.00",
+            "message": "Out of stock",
+        },
+        "stock-watchlist": {
+            "watches": [
+                {
+                    "url": f"https://www.bestbuy.com/site/item/{6500000 + i}.p",
+                    "name": _words(6),
+                    "channel_id": 1100000000000000000 + i,
+                    "guild_id": 1000000000000000000,
+                    "last_checked": "2026-10-01T12:00:00Z",
+                    "in_stock": i % 3 == 0,
+                }
+                for i in range(200)
+            ]
+        },
+        "universal-check": {
+            "url": "https://example.com/product/123",
+            "analysis": {"in_stock": True, "price": "$199.99", "confidence": 0.92},
+            "html": html,
+        },
+        "recipe-parse": {
+            "success": True,
+            "parsed": True,
+            "title": "Braised Short Ribs",
+            "recipe": {
+                "title": "Braised Short Ribs",
+                "ingredients": [_words(5) for _ in range(30)],
+                "instructions": [_words(40) for _ in range(15)],
+                "images": [f"https://example.com/img/{i}.jpg" for i in range(3)],
+            },
+            "markdown": "# Braised Short Ribs\n\n" + _words(2500),
+        },
+        "server-status": {
+            "services": {
+                f"service-{i}": {"healthy": i % 7 != 0, "message": "OK", "latency_ms": 12.5 + i}
+                for i in range(20)
+            }
+        },
+        "home-batch": {
+            "action": "batch",
+            "actions": [{"action": "lights_on", "target": f"room-{i}"} for i in range(10)],
+            "user": "someone#0001",
+        },
+        "vettix-events": {
+            "events": [
+                {"title": _words(8), "date": "2026-11-01", "venue": _words(4), "tickets": i}
+                for i in range(100)
+            ]
+        },
+    }
+
+
+def time_per_call(func, repeat: int) -> float:
+    """Best-of-three average time per call in microseconds."""
+    best = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        best = min(best, (time.perf_counter() - started) / repeat)
+    return best * 1e6
+
+
+def bench_codecs(payloads: dict[str, dict], codecs: list[JSONCodec], repeat: int):
+    print(f"{'payload':<18} {'bytes':>9} {'gzip':>9}  " + "  ".join(
+        f"{codec.name + ' enc/dec (us)':>26}" for codec in codecs
+    ))
+    for name, payload in payloads.items():
+        encoded = STDLIB_CODEC.dumps(payload)
+        row = f"{name:<18} {len(encoded):>9,} {len(gzip.compress(encoded)):>9,}  "
+        cells = []
+        for codec in codecs:
+            data = codec.dumps(payload)
+            encode = time_per_call(lambda: codec.dumps(payload), repeat)
+            decode = time_per_call(lambda: codec.loads(data), repeat)
+            cells.append(f"{encode:>12.1f} / {decode:>11.1f}")
+        print(row + "  ".join(cells))
+
+
+async def bench_transfers(payloads: dict[str, dict], codecs: list[JSONCodec], transfers: int):
+    async def echo(request: web.Request) -> web.Response:
+        # aiohttp inflates gzip request bodies; compress the response when asked
+        response = web.Response(body=await request.read(), content_type="application/json")
+        response.enable_compression()
+        return response
+
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app.router.add_post("/webhook/{path}", echo)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", ECHO_PORT).start()
+
+    variants = [
+        (f"{codec.name}{'+gzip' if threshold else ''}", codec, threshold)
+        for codec in codecs
+        for threshold in (0, 1024)
+    ]
+    print()
+    print(f"{'payload':<18} " + "  ".join(f"{label + ' (ms)':>18}" for label, _, _ in variants))
+    try:
+        for name, payload in payloads.items():
+            cells = []
+            for _, codec, threshold in variants:
+                client = N8NClient(
+                    f"http://127.0.0.1:{ECHO_PORT}", codec=codec, compress_threshold=threshold
+                )
+                started = time.perf_counter()
+                for _ in range(transfers):
+                    await client.trigger_webhook(name, payload)
+                await client.close()
+                cells.append(f"{(time.perf_counter() - started) / transfers * 1000:>18.2f}")
+            print(f"{name:<18} " + "  ".join(cells))
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark n8n payload codecs")
+    parser.add_argument("--repeat", type=int, default=200, help="Calls per codec timing")
+    parser.add_argument("--transfers", type=int, default=20, help="Round trips per variant")
+    args = parser.parse_args()
+
+    codecs = [STDLIB_CODEC] + ([ORJSON_CODEC] if ORJSON_CODEC else [])
+    if ORJSON_CODEC is None:
+        print("orjson is not installed; only the stdlib codec is measured\n")
+
+    payloads = sample_payloads()
+    bench_codecs(payloads, codecs, args.repeat)
+    asyncio.run(bench_transfers(payloads, codecs, args.transfers))
+
+
+if __name__ == "__main__":
+    main()
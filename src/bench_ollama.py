@@ -0,0 +1,178 @@
+"""
+Benchmark the bot-side Ollama client against a fake Ollama server.
+
+The fake server answers /api/generate like Ollama: the first request
+after the model's keep-alive lapses pays a load delay, it decodes up to
+--slots requests at once (each step a little slower per extra request,
+as in a shared batch) and queues the rest. Rounds of concurrent stock
+checks, separated by idle gaps longer than the keep-alive, are sent
+with one request at a time (as the n8n workflow does), batched, and
+batched with keep-warm. Reports latency percentiles, cold loads and
+decode throughput for each.
+
+Point --url at a real server to run the same rounds against it.
+
+Usage:
+    python -m src.bench_ollama [--rounds 3] [--checks 8] [--url http://localhost:11434]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from aiohttp import web
+
+from .services import OllamaClient
+from .services.stock_analysis import stock_prompt
+
+NS = 1_000_000_000
+
+
+class FakeOllama:
+    """Simulated model timings behind Ollama's generate API."""
+
+    def __init__(
+        self,
+        slots: int = 4,
+        load_seconds: float = 1.0,
+        step_ms: float = 5.0,
+        tokens: int = 60,
+        batch_overhead: float = 0.1,
+    ):
+        self.slots = asyncio.Semaphore(slots)
+        self.load_seconds = load_seconds
+        self.step_ms = step_ms
+        self.tokens = tokens
+        self.batch_overhead = batch_overhead
+        self.loaded_until = 0.0
+        self.active = 0
+        self.requests = 0
+        self._loading = asyncio.Lock()
+        self._runner: web.AppRunner | None = None
+
+    async def _load(self) -> float:
+        async with self._loading:
+            if time.monotonic() < self.loaded_until:
+                return 0.0
+            await asyncio.sleep(self.load_seconds)
+            self.loaded_until = time.monotonic() + 1
+            return self.load_seconds
+
+    async def generate(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        started = time.monotonic()
+        keep_alive = float(body.get("keep_alive", 300))
+        self.requests += 1
+        async with self.slots:
+            load = await self._load()
+            eval_seconds = 0.0
+            prompt_tokens = 0
+            if body.get("prompt"):
+                prompt_tokens = len(body["prompt"]) // 4
+                self.active += 1
+                try:
+                    for _ in range(self.tokens):
+                        step = self.step_ms / 1000 * (1 + self.batch_overhead * (self.active - 1))
+                        await asyncio.sleep(step)
+                        eval_seconds += step
+                finally:
+                    self.active -= 1
+            self.loaded_until = time.monotonic() + keep_alive
+        answer = {"inStock": False, "productName": "Widget", "price": "$10", "confidence": "high"}
+        return web.json_response(
+            {
+                "model": body["model"],
+                "response": json.dumps(answer) if body.get("prompt") else "",
+                "done": True,
+                "total_duration": int((time.monotonic() - started) * NS),
+                "load_duration": int(load * NS),
+                "prompt_eval_count": prompt_tokens,
+                "eval_count": self.tokens if body.get("prompt") else 0,
+                "eval_duration": int(eval_seconds * NS),
+            }
+        )
+
+    async def start(self) -> str:
+        app = web.Application(client_max_size=16 * 1024 * 1024)
+        app.router.add_post("/api/generate", self.generate)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        return f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+
+async def run_rounds(client: OllamaClient, rounds: int, checks: int, gap: float, warm: bool):
+    page = "<html><body><h1>Widget</h1><button disabled>Sold Out</button></body></html>" * 40
+    started = time.perf_counter()
+    for number in range(rounds):
+        if warm:
+            client.keep_warm(gap * 2)
+        await asyncio.gather(
+            *(client.generate(stock_prompt(f"{page}<!-- {number}:{check} -->")) for check in range(checks))
+        )
+        if number < rounds - 1:
+            await asyncio.sleep(gap)
+    return time.perf_counter() - started
+
+
+async def main_async(args):
+    fake = None
+    url = args.url
+    if not url:
+        fake = FakeOllama(slots=args.slots, load_seconds=args.load)
+        url = await fake.start()
+    keep_alive = args.keep_alive
+    gap = keep_alive * 1.5
+    scenarios = [
+        ("one at a time", dict(parallel=1, batch_window=0), False),
+        ("batched", dict(parallel=args.slots, batch_window=0.05), False),
+        ("batched + keep-warm", dict(parallel=args.slots, batch_window=0.05), True),
+    ]
+    print(
+        f"{args.rounds} rounds of {args.checks} checks, {gap:.1f}s apart "
+        f"(keep-alive {keep_alive:g}s), {'fake' if fake else url} server\n"
+    )
+    print(
+        f"{'client':<21} {'wall (s)':>8} {'p50 ms':>7} {'p95 ms':>7} "
+        f"{'cold':>5} {'tok/s':>7} {'batches':>8}"
+    )
+    for name, options, warm in scenarios:
+        if fake:
+            fake.loaded_until = 0.0
+        client = OllamaClient(
+            url, args.model, keep_alive=keep_alive, max_queue=args.checks, **options
+        )
+        try:
+            wall = await run_rounds(client, args.rounds, args.checks, gap, warm)
+            metrics = client.metrics()
+        finally:
+            await client.close()
+        print(
+            f"{name:<21} {wall:>8.1f} {metrics['p50_ms']:>7} {metrics['p95_ms']:>7} "
+            f"{metrics['cold_loads']:>5} {metrics['tokens_per_second'] or 0:>7.0f} "
+            f"{metrics['batches']:>8}"
+        )
+    if fake:
+        await fake.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Ollama client")
+    parser.add_argument("--rounds", type=int, default=3, help="Monitoring rounds")
+    parser.add_argument("--checks", type=int, default=8, help="Concurrent checks per round")
+    parser.add_argument("--slots", type=int, default=4, help="Parallel slots on the server")
+    parser.add_argument("--load", type=float, default=1.0, help="Fake model load time (s)")
+    parser.add_argument("--keep-alive", type=float, default=1.0, help="Keep-alive (s)")
+    parser.add_argument("--url", help="Real Ollama server instead of the fake one")
+    parser.add_argument("--model", default="qwen2.5-coder:7b-instruct-q6_K")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Backtest adaptive watch polling against fixed intervals.
+
+Simulates products that restock in weekly windows (per retailer, with
+per-product jitter) and sell out again after a while. Every policy first
+learns from the same weeks of fixed-interval history, then runs for the
+evaluation weeks under the same hourly fetch budget. Reports fetches spent
+against detection rate and latency.
+
+Usage:
+    python -m src.bench_polling [--products 40] [--budget 600] [--weeks 4]
+"""
+import argparse
+import bisect
+import random
+import tempfile
+from dataclasses import dataclass, field
+
+from .services.price_history import PriceHistory, PriceSeries
+from .services import AdaptivePoller
+from .services.watches import WatchEntry
+
+WEEK = 7 * 86400
+# Replanning period, as the bot's sync with n8n
+PLAN_SECONDS = 900
+START = 1_767_571_200.0  # a Monday, 00:00 UTC
+
+RETAILERS = {
+    # host: weekly restock windows as (day, hour)
+    "www.bestbuy.com": [(1, 14), (3, 14)],
+    "store.ui.com": [(2, 17)],
+    "shop.example.com": [(0, 9), (4, 20)],
+}
+
+
+@dataclass
+class Product:
+    url: str
+    in_stock: list[tuple[float, float]] = field(default_factory=list)  # sorted intervals
+
+    def stocked(self, when: float) -> bool:
+        index = bisect.bisect_right(self.in_stock, (when, float("inf"))) - 1
+        return index >= 0 and self.in_stock[index][0] <= when < self.in_stock[index][1]
+
+
+def make_products(count: int, weeks: int, rng: random.Random) -> list[Product]:
+    products = []
+    hosts = list(RETAILERS)
+    for index in range(count):
+        host = hosts[index % len(hosts)]
+        product = Product(f"https://{host}/item/{index}")
+        shift = rng.choice((-1, 0, 0, 1)) * 3600  # this product's offset from the retailer's
+        for week in range(weeks):
+            for day, hour in RETAILERS[host]:
+                if rng.random() < 0.6:
+                    start = (
+                        START + week * WEEK + day * 86400 + hour * 3600 + shift
+                        + rng.uniform(0, 3600)
+                    )
+                    product.in_stock.append((start, start + rng.uniform(300, 2700)))
+            # Occasional off-pattern restocks
+            if rng.random() < 0.15:
+                start = START + week * WEEK + rng.uniform(0, WEEK)
+                product.in_stock.append((start, start + rng.uniform(300, 2700)))
+        product.in_stock.sort()
+        products.append(product)
+    return products
+
+
+@dataclass
+class Outcome:
+    fetches: int = 0
+    restocks: int = 0
+    detected: int = 0
+    latencies: list[float] = field(default_factory=list)
+
+
+def simulate(
+    products: list[Product],
+    poller: AdaptivePoller,
+    start: float,
+    end: float,
+    adaptive: bool,
+    fixed_minutes: float,
+) -> Outcome:
+    """Poll every product from `start` to `end`, recording checks into the poller's history."""
+    entries = [
+        WatchEntry(product.url, guild_id=1, interval_minutes=int(fixed_minutes), adaptive=adaptive)
+        for product in products
+    ]
+    poller.watches = {"sim": entries}
+    outcome = Outcome()
+    next_check = {product.url: start for product in products}
+    found: set[tuple[str, float]] = set()
+
+    period = start
+    while period < end:
+        intervals = poller.plan(period).get("sim", {}) if adaptive else {}
+        period_end = min(period + PLAN_SECONDS, end)
+        for product in products:
+            minutes = intervals.get(product.url, fixed_minutes)
+            series = poller.prices.series[product.url]
+            when = next_check[product.url]
+            while when < period_end:
+                stocked = product.stocked(when)
+                series.append(when, None, stocked)
+                outcome.fetches += 1
+                if stocked:
+                    index = bisect.bisect_right(product.in_stock, (when, float("inf"))) - 1
+                    window = product.in_stock[index]
+                    if (product.url, window[0]) not in found:
+                        found.add((product.url, window[0]))
+                        outcome.latencies.append(when - window[0])
+                when += minutes * 60
+            next_check[product.url] = when
+        period = period_end
+
+    for product in products:
+        outcome.restocks += sum(1 for window in product.in_stock if start <= window[0] < end)
+    outcome.detected = len(outcome.latencies)
+    return outcome
+
+
+def new_poller(products: list[Product], budget: float, min_minutes: float) -> AdaptivePoller:
+    prices = PriceHistory(tempfile.mkdtemp(prefix="bench-polling-"))
+    for product in products:
+        prices.series[product.url] = PriceSeries()
+    return AdaptivePoller(
+        n8n=None, prices=prices, webhooks=[], budget_per_hour=budget, min_minutes=min_minutes
+    )
+
+
+def report(label: str, outcome: Outcome, hours: float):
+    latencies = sorted(outcome.latencies)
+
+    def minutes(p: float) -> str:
+        if not latencies:
+            return "-"
+        return f"{latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] / 60:.1f}"
+
+    rate = 100 * outcome.detected / outcome.restocks if outcome.restocks else 0.0
+    print(
+        f"{label:<10} {outcome.fetches:>9,} {outcome.fetches / hours:>8.0f} "
+        f"{outcome.restocks:>9} {rate:>8.1f}% {minutes(50):>9} {minutes(95):>9}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest adaptive watch polling")
+    parser.add_argument("--products", type=int, default=40, help="Watched products")
+    parser.add_argument("--budget", type=float, default=600, help="Fetches per hour, all products")
+    parser.add_argument("--weeks", type=int, default=4, help="Evaluation weeks")
+    parser.add_argument("--training", type=int, default=4, help="Weeks of history to learn from")
+    parser.add_argument("--min-interval", type=float, default=1, help="Fastest interval (min)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    products = make_products(args.products, args.training + args.weeks, rng)
+    fixed_minutes = max(60 * args.products / args.budget, args.min_interval)
+    train_end = START + args.training * WEEK
+    end = train_end + args.weeks * WEEK
+    hours = args.weeks * 168
+
+    print(
+        f"{args.products} products, {args.budget:.0f} fetches/h budget, "
+        f"fixed interval {fixed_minutes:.1f} min, {args.training}w training + {args.weeks}w test\n"
+    )
+    print(
+        f"{'policy':<10} {'fetches':>9} {'per hour':>8} {'restocks':>9} {'detected':>9} "
+        f"{'p50 (min)':>9} {'p95 (min)':>9}"
+    )
+    for label, adaptive in (("fixed", False), ("adaptive", True)):
+        poller = new_poller(products, args.budget, args.min_interval)
+        simulate(products, poller, START, train_end, False, fixed_minutes)
+        outcome = simulate(products, poller, train_end, end, adaptive, fixed_minutes)
+        report(label, outcome, hours)
+
+
+if __name__ == "__main__":
+    main()
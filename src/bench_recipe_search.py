@@ -0,0 +1,87 @@
+"""
+Benchmark the recipe search index.
+
+Builds an index over synthetic recipes, then times a save and load of
+the on-disk form and ranked queries of one to four ingredients.
+
+Usage:
+    python -m src.bench_recipe_search [--recipes 5000] [--queries 1000]
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from .services import RecipeSearchIndex
+from .services.recipe_search import RecipeDoc
+
+INGREDIENTS = [
+    "chicken thighs", "garlic", "lemon", "butter", "olive oil", "onion", "tomatoes",
+    "basil", "parmesan", "spaghetti", "rice", "soy sauce", "ginger", "scallions",
+    "eggs", "flour", "sugar", "milk", "cinnamon", "apples", "potatoes", "carrots",
+    "beef chuck", "red wine", "thyme", "rosemary", "chickpeas", "cumin", "coriander",
+    "yogurt", "spinach", "mushrooms", "cream", "bacon", "cheddar", "tortillas",
+    "black beans", "avocado", "lime", "cilantro", "salmon", "dill", "capers",
+    "honey", "mustard", "paprika", "coconut milk", "curry paste", "noodles", "tofu",
+]
+DISHES = ["Roast", "Stew", "Curry", "Salad", "Pasta", "Soup", "Tacos", "Bake", "Stir Fry", "Pie"]
+TAGS = ["dinner", "vegetarian", "quick", "dessert", "breakfast", "weeknight", "comfort"]
+
+
+def make_doc(index: int, rng: random.Random) -> RecipeDoc:
+    ingredients = rng.sample(INGREDIENTS, rng.randint(5, 14))
+    return RecipeDoc(
+        path=f"recipes/recipe-{index}.md",
+        title=f"{ingredients[0].title()} {rng.choice(DISHES)} {index}",
+        tags=rng.sample(TAGS, 2),
+        ingredients=[f"{rng.randint(1, 4)} cups {name}, chopped" for name in ingredients],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the recipe search index")
+    parser.add_argument("--recipes", type=int, default=5000, help="Recipes to index")
+    parser.add_argument("--queries", type=int, default=1000, help="Queries per query size")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    path = Path(tempfile.mkdtemp(prefix="bench-recipe-search-")) / "recipe-search.idx"
+    index = RecipeSearchIndex(path)
+    started = time.perf_counter()
+    for number in range(args.recipes):
+        index.add(make_doc(number, rng))
+    build_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    index.write(index.dump())
+    save_ms = (time.perf_counter() - started) * 1000
+    loaded = RecipeSearchIndex(path)
+    started = time.perf_counter()
+    loaded.load()
+    load_ms = (time.perf_counter() - started) * 1000
+    assert len(loaded) == args.recipes
+
+    print(
+        f"{args.recipes:,} recipes, {len(index.postings):,} terms: built in {build_ms:.0f}ms, "
+        f"{path.stat().st_size / 1e3:.0f}KB on disk, saved in {save_ms:.0f}ms, "
+        f"loaded in {load_ms:.0f}ms\n"
+    )
+    print(f"{'terms':>5} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for size in range(1, 5):
+        queries = [" ".join(rng.sample(INGREDIENTS, size)) for _ in range(args.queries)]
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            loaded.search(query)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        print(
+            f"{size:>5} {timings[len(timings) // 2]:>9.2f} "
+            f"{timings[min(len(timings) - 1, int(0.99 * len(timings)))]:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
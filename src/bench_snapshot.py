@@ -0,0 +1,96 @@
+"""
+Benchmark warm-restart snapshots.
+
+Fills the watch store, an adaptive poller's plan and the route cache with
+synthetic entries, then times the shutdown side (dump and write) and
+the startup side (map, decode and restore) of a snapshot with each JSON
+codec available.
+
+Usage:
+    python -m src.bench_snapshot [--watches 100000] [--cached 1000]
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from .commands.routing import RouteExecutor
+from .services import AdaptivePoller, SnapshotStore, WatchEntry, WatchStore
+from .services.codec import ORJSON_CODEC, STDLIB_CODEC
+
+WEBHOOKS = ["ubiquiti-watch-list", "bestbuy-watch-list", "universal-watch-list"]
+
+
+def fill(watches: int, cached: int, rng: random.Random):
+    store = WatchStore()
+    poller = AdaptivePoller(n8n=None, prices=None, webhooks=WEBHOOKS)
+    routes = RouteExecutor(n8n=None, admission=None)
+    for index in range(watches):
+        webhook = WEBHOOKS[index % len(WEBHOOKS)]
+        url = f"https://shop{index % 50}.example.com/item/{index // 3}"
+        entry = WatchEntry(
+            url,
+            guild_id=1_000_000_000_000_000_000 + index % 2000,
+            interval_minutes=rng.choice((1, 5, 15)),
+            product_name=f"Product {index // 3}",
+            added_by=f"user{index % 500}",
+            logs_channel_id=rng.getrandbits(60),
+            alerts_channel_id=rng.getrandbits(60),
+            added_at=1.7e9 + index,
+            last_checked=1.7e9 + index * 2,
+            last_price=round(rng.uniform(10, 500), 2),
+            adaptive=index % 4 == 0,
+        )
+        store.add(webhook, entry)
+        if entry.adaptive:
+            poller.intervals.setdefault(webhook, {})[url] = rng.choice((1.0, 2.5, 10.0))
+    for index in range(cached):
+        routes._cache["universal-stock-check", f'{{"url": "https://x/{index}"}}'] = (
+            time.monotonic() + 300,
+            {"inStock": index % 2 == 0, "price": "$19.99", "productName": f"Item {index}"},
+        )
+    return store, poller, routes
+
+
+def register(snapshots: SnapshotStore, store, poller, routes):
+    snapshots.register("watches", 1, store.snapshot, store.restore)
+    snapshots.register("poller", 1, poller.snapshot, poller.restore)
+    snapshots.register("routes", 1, routes.snapshot, routes.restore)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark warm-restart snapshots")
+    parser.add_argument("--watches", type=int, default=100_000, help="Watch entries")
+    parser.add_argument("--cached", type=int, default=1000, help="Cached route results")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    sections = fill(args.watches, args.cached, random.Random(args.seed))
+    print(f"{args.watches:,} watch entries, {args.cached:,} cached results\n")
+    print(f"{'codec':<8} {'size':>10} {'save (ms)':>10} {'load (ms)':>10}")
+    for codec in (STDLIB_CODEC, ORJSON_CODEC):
+        if codec is None:
+            continue
+        path = Path(tempfile.mkdtemp(prefix="bench-snapshot-")) / "snapshot.bin"
+        snapshots = SnapshotStore(path, codec=codec)
+        register(snapshots, *sections)
+        started = time.perf_counter()
+        snapshots.write(snapshots.dump())
+        save_ms = (time.perf_counter() - started) * 1000
+        size = path.stat().st_size
+
+        restored = SnapshotStore(path)
+        started = time.perf_counter()
+        restored.load()
+        store = WatchStore()
+        routes = RouteExecutor(None, None)
+        register(restored, store, AdaptivePoller(None, None, WEBHOOKS), routes)
+        load_ms = (time.perf_counter() - started) * 1000
+        restored.discard()
+        assert len(store) == len(sections[0]) and len(routes._cache) == args.cached
+        print(f"{codec.name:<8} {size / 1e6:>8.1f}MB {save_ms:>10.0f} {load_ms:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,37 @@
+import asyncio
+import hashlib
+import importlib
+import json
 import logging
+import math
+import signal
+import time
+from dataclasses import fields, replace
+from pathlib import Path
 
 import discord
+from discord import app_commands
 from discord.ext import commands
 from dotenv import load_dotenv
 
-from .config import Config
-from .services import N8NClient
-from .commands import stock, home, status, webhook, help, vettix, recipe
+from .config import RESTART_FIELDS, Config, ConfigError
+from .services import (
+    AdmissionController,
+    ClusterIPC,
+    ConfigWatcher,
+    GitHubClient,
+    HostPolicy,
+    HostScheduler,
+    N8NClient,
+    OllamaClient,
+    RecipeBook,
+    SnapshotStore,
+    TrafficRecorder,
+    WatchStore,
+)
+from .services.codec import get_codec
+from .commands import AVAILABLE_COGS
+from .commands.routing import RouteExecutor
 
 logging.basicConfig(
     level=logging.INFO,
@@ -15,47 +40,394 @@ logging.basicConfig(
 logger = logging.getLogger("marcellobot")
 
 
+def gateway_options() -> dict:
+    """
+    Intents and cache settings for a bot that only needs guilds and their channels.
+
+    Everything runs through slash commands, so there is no need for message,
+    member, presence or typing events; members and messages aren't cached
+    and guilds aren't chunked on startup, which keeps memory flat as the
+    guild count grows.
+    """
+    intents = discord.Intents.none()
+    intents.guilds = True
+    return {
+        "intents": intents,
+        "member_cache_flags": discord.MemberCacheFlags.none(),
+        "max_messages": None,
+        "chunk_guilds_at_startup": False,
+    }
+
+
+def host_policies(config: Config) -> tuple[HostPolicy, dict[str, HostPolicy]]:
+    """The default product-page fetch policy and the per-host overrides."""
+    default = HostPolicy(
+        rate_per_minute=config.host_rate_per_minute,
+        burst=config.host_burst,
+        max_concurrent=config.host_max_concurrent,
+    )
+    return default, {
+        host: HostPolicy(rate, default.burst, default.max_concurrent)
+        for host, rate in config.host_rate_limits.items()
+    }
+
+
+class TracingTree(app_commands.CommandTree):
+    """Command tree that hands each slash command to the bot's traffic recorder."""
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        recorder = getattr(self.client, "recorder", None)
+        if recorder and interaction.type is discord.InteractionType.application_command:
+            recorder.command(interaction.guild_id, interaction.user.id, interaction.data or {})
+        return True
+
+
 class MarcelloBot(commands.Bot):
     """Discord bot for homelab automation."""
 
-    def __init__(self, config: Config):
-        intents = discord.Intents.default()
-        intents.message_content = True
-
+    def __init__(self, config: Config, **options):
         super().__init__(
             command_prefix="!",  # Fallback prefix, mainly using slash commands
-            intents=intents,
             description="Marcello homelab automation bot",
+            tree_cls=TracingTree,
+            **gateway_options(),
+            **options,
         )
 
         self.config = config
         self.n8n = N8NClient(
             base_url=config.n8n_base_url,
             webhook_secret=config.n8n_webhook_secret,
+            codec=get_codec(config.n8n_json_codec),
+            compress_threshold=config.n8n_compress_threshold,
+            interactive_connections=config.n8n_interactive_connections,
+            background_connections=config.n8n_background_connections,
+            interactive_target_ms=config.n8n_interactive_target_ms,
+            latency_targets=config.n8n_latency_targets,
+        )
+        # Caps and fair queueing for webhook calls started by users
+        self.admission = AdmissionController(
+            global_limit=config.webhook_max_concurrency,
+            guild_limit=config.webhook_guild_limit or None,
+            user_limit=config.webhook_user_limit or None,
+            webhook_limits=config.webhook_limits,
+            max_queued_per_user=config.webhook_max_queued_per_user,
+        )
+        # Pacing for product-page fetches, shared with the watch monitors
+        self.hosts = HostScheduler(*host_policies(config))
+        # Shared pipeline for the declarative webhook-backed commands
+        self.routes = RouteExecutor(self.n8n, self.admission, self.hosts)
+        # Mirror of the n8n-owned watch lists, kept by the stock commands
+        self.watches = WatchStore()
+
+        # Native recipe commits need a GitHub token; otherwise n8n commits
+        self.recipe_book = None
+        if config.github_token:
+            self.recipe_book = RecipeBook(
+                GitHubClient(config.github_token, config.recipe_repo),
+                max_image_bytes=config.recipe_image_max_bytes,
+                max_image_dimension=config.recipe_image_max_dimension,
+            )
+
+        # Bot-side model for the universal stock checker; otherwise n8n runs it
+        self.ollama = None
+        if config.ollama_url:
+            self.ollama = OllamaClient(
+                config.ollama_url,
+                config.ollama_model,
+                keep_alive=config.ollama_keep_alive,
+                parallel=config.ollama_parallel,
+                max_queue=config.ollama_max_queue,
+                batch_window=config.ollama_batch_window_ms / 1000,
+            )
+
+        # Cross-process channel when running as one cluster of several
+        self.ipc = None
+        self._fanout_tasks: set[asyncio.Task] = set()
+        if config.cluster_count > 1:
+            self.ipc = ClusterIPC(
+                config.cluster_id,
+                config.cluster_count,
+                config.ipc_base_port,
+                config.ipc_token,
+            )
+            self.ipc.register("stats", self.ipc_stats)
+            self.ipc.register("reload_config", self.ipc_reload_config)
+
+        # Opt-in record of commands and n8n calls, replayed by src.replay
+        self.recorder = None
+        if config.traffic_trace:
+            self.recorder = TrafficRecorder(
+                Path(config.traffic_trace.format(cluster=config.cluster_id)), self.n8n.codec
+            )
+            self.n8n.recorder = self.recorder
+
+        # In-memory state handed over between processes on a clean restart
+        self.snapshots = SnapshotStore(
+            Path(config.data_dir) / f"snapshot-{config.cluster_id}.bin",
+            max_age=config.snapshot_max_age,
+            codec=self.n8n.codec,
+        )
+
+        # Settings changes in the config file or from /config, without a restart
+        self.config_watcher = ConfigWatcher(
+            [config.config_path, config.overrides_path],
+            self.reload_config,
+            interval=config.config_reload_interval or 10,
         )
 
     async def setup_hook(self):
         """Called when the bot is starting up."""
-        logger.info("Loading command cogs...")
+        started = time.perf_counter()
+
+        if self.ipc:
+            await self.ipc.start()
+        if self.config.config_reload_interval:
+            self.config_watcher.start()
+        try:
+            # Container runtimes stop with SIGTERM; close cleanly so state is snapshotted
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, lambda: asyncio.create_task(self.close())
+            )
+        except NotImplementedError:  # Windows
+            pass
 
-        # Load all command modules
-        await stock.setup(self, self.n8n)
-        await home.setup(self, self.n8n)
-        await status.setup(self, self.n8n)
-        await webhook.setup(self, self.n8n)
-        await help.setup(self, self.n8n)
-        await vettix.setup(self, self.n8n)
-        await recipe.setup(self, self.n8n)
+        if self.config.snapshot_max_age:
+            await asyncio.to_thread(self.snapshots.load)
+        self.snapshots.register("routes", 1, self.routes.snapshot, self.routes.restore)
+        self.snapshots.register("hosts", 1, self.hosts.snapshot, self.hosts.restore)
+        self.snapshots.register("watches", 1, self.watches.snapshot, self.watches.restore)
+
+        names = self.config.enabled_cogs or list(AVAILABLE_COGS)
+        unknown = set(names) - set(AVAILABLE_COGS)
+        if unknown:
+            logger.warning(f"Ignoring unknown cogs: {', '.join(sorted(unknown))}")
+            names = [name for name in names if name in AVAILABLE_COGS]
+
+        logger.info(f"Loading command cogs: {', '.join(names)}")
+        cog_timings = await asyncio.gather(*(self.load_cog(name) for name in names))
+        logger.info(
+            f"Loaded {len(names)} cog(s) in {time.perf_counter() - started:.2f}s ("
+            + ", ".join(f"{name} {secs:.2f}s" for name, secs in cog_timings)
+            + ")"
+        )
+        # Cogs have restored what they registered; whatever is left goes
+        self.snapshots.discard()
+
+        sync_started = time.perf_counter()
+        await self.sync_command_tree()
+        logger.info(
+            f"Command tree ready in {time.perf_counter() - sync_started:.2f}s; "
+            f"setup took {time.perf_counter() - started:.2f}s"
+        )
+
+    async def load_cog(self, name: str) -> tuple[str, float]:
+        """Import a command module and run its setup, returning the time taken."""
+        started = time.perf_counter()
+        module = importlib.import_module(f".commands.{name}", __package__)
+        await module.setup(self, self.n8n)
+        return name, time.perf_counter() - started
+
+    def command_tree_hash(self) -> str:
+        """Hash the serialized global command tree, as it would be sent to Discord."""
+        payload = sorted(
+            (command.to_dict(self.tree) for command in self.tree.get_commands()),
+            key=lambda command: command["name"],
+        )
+        return hashlib.sha256(
+            json.dumps(payload, sort_keys=True).encode()
+        ).hexdigest()
+
+    async def sync_command_tree(self):
+        """Sync slash commands only when the tree changed since the last sync."""
+        if self.config.cluster_id != 0:
+            # Commands are global; the first cluster syncs for everyone
+            return
+
+        state_file = Path(self.config.data_dir) / "command-tree.sha256"
+        # The application ID is part of the state so a token swap still syncs
+        tree_hash = f"{self.application_id}:{self.command_tree_hash()}"
+
+        if not self.config.force_command_sync and state_file.exists():
+            if state_file.read_text().strip() == tree_hash:
+                logger.info("Command tree unchanged, skipping sync")
+                return
 
         logger.info("Syncing slash commands...")
         await self.tree.sync()
+        state_file.parent.mkdir(parents=True, exist_ok=True)
+        state_file.write_text(tree_hash)
         logger.info("Commands synced!")
 
+    @property
+    def owns_data(self) -> bool:
+        """Whether this process writes the files under DATA_DIR that all clusters share."""
+        return self.config.cluster_id == 0
+
+    async def update_config(self, overrides: dict | None = None) -> tuple[list[str], list[str]]:
+        """
+        `reload_config` on every cluster.
+
+        The first cluster owns the overrides file: others hand the change to
+        it over IPC. Once it has saved and applied the change it answers, and
+        tells the rest to re-read in the background, so one slow cluster
+        doesn't hold up the reply. Returns this cluster's outcome; IPC
+        failures (RuntimeError, OSError, TimeoutError) propagate.
+        """
+        if self.ipc is None:
+            return await self.reload_config(overrides)
+        if not self.owns_data:
+            reply = await self.ipc.request(0, "reload_config", {"overrides": overrides})
+            if reply.get("problems"):
+                raise ConfigError(reply["problems"])
+            return reply["changed"], reply["pending"]
+
+        changed, pending = await self.reload_config(overrides)
+        task = asyncio.create_task(self._reload_other_clusters())
+        self._fanout_tasks.add(task)
+        task.add_done_callback(self._fanout_tasks.discard)
+        return changed, pending
+
+    async def _reload_other_clusters(self):
+        results = await asyncio.gather(
+            *(
+                self.ipc.request(cluster_id, "reload_config")
+                for cluster_id in range(1, self.config.cluster_count)
+            ),
+            return_exceptions=True,
+        )
+        for cluster_id, result in enumerate(results, 1):
+            if isinstance(result, Exception):
+                logger.warning(
+                    f"Cluster {cluster_id} didn't reload config: {result or type(result).__name__}"
+                )
+
+    async def ipc_reload_config(self, data: dict) -> dict:
+        try:
+            if self.owns_data:
+                changed, pending = await self.update_config(data.get("overrides"))
+            else:
+                changed, pending = await self.reload_config()
+        except ConfigError as e:
+            return {"problems": e.problems}
+        return {"changed": changed, "pending": pending}
+
+    async def reload_config(self, overrides: dict | None = None) -> tuple[list[str], list[str]]:
+        """
+        Re-read every config layer and apply it; see `apply_config`.
+
+        With `overrides`, those replace the saved /config overrides and are
+        saved once the result is known to be valid. Raises ConfigError and
+        leaves everything running as it was if any layer is invalid.
+        """
+        config = await asyncio.to_thread(Config.load, overrides)
+        if overrides is not None:
+            await asyncio.to_thread(config.save_overrides, overrides)
+        return self.apply_config(config)
+
+    def apply_config(self, config: Config) -> tuple[list[str], list[str]]:
+        """
+        Switch the running bot to `config`.
+
+        Every subsystem is reconfigured in one step, with no await in
+        between, so no command sees half of a change; cogs get an
+        `on_config_reload(old, new)` event. Settings read only at startup
+        keep their running value. Returns the settings applied and those
+        waiting for a restart.
+        """
+        old = self.config
+        pending = sorted(
+            name for name in RESTART_FIELDS if getattr(config, name) != getattr(old, name)
+        )
+        config = replace(config, **{name: getattr(old, name) for name in pending})
+        changed = [
+            f.name for f in fields(config) if getattr(config, f.name) != getattr(old, f.name)
+        ]
+        if pending:
+            logger.warning(f"Config changes that need a restart: {', '.join(pending)}")
+        if not changed:
+            return changed, pending
+
+        # Everything that can fail is built before anything is touched
+        codec = get_codec(config.n8n_json_codec)
+        policies = host_policies(config)
+        self.n8n.configure(
+            base_url=config.n8n_base_url,
+            webhook_secret=config.n8n_webhook_secret,
+            codec=codec,
+            compress_threshold=config.n8n_compress_threshold,
+            interactive_connections=config.n8n_interactive_connections,
+            background_connections=config.n8n_background_connections,
+            interactive_target_ms=config.n8n_interactive_target_ms,
+            latency_targets=config.n8n_latency_targets,
+        )
+        self.admission.configure(
+            global_limit=config.webhook_max_concurrency,
+            guild_limit=config.webhook_guild_limit or None,
+            user_limit=config.webhook_user_limit or None,
+            webhook_limits=config.webhook_limits,
+            max_queued_per_user=config.webhook_max_queued_per_user,
+        )
+        self.hosts.configure(*policies)
+        if self.ollama:
+            self.ollama.configure(
+                model=config.ollama_model,
+                keep_alive=config.ollama_keep_alive,
+                parallel=config.ollama_parallel,
+                max_queue=config.ollama_max_queue,
+                batch_window=config.ollama_batch_window_ms / 1000,
+            )
+        self.config_watcher.interval = config.config_reload_interval or 10
+        self.config = config
+        self.dispatch("config_reload", old, config)
+        logger.info(f"Applied config changes: {', '.join(changed)}")
+        return changed, pending
+
+    async def ipc_stats(self, data: dict) -> dict:
+        return {
+            "cluster_id": self.config.cluster_id,
+            "shard_ids": self.config.shard_ids,
+            "guilds": len(self.guilds),
+            # NaN until the first heartbeat
+            "latency_ms": None if math.isnan(self.latency) else round(self.latency * 1000),
+            "routes": {
+                name: {"calls": stats.calls, "errors": stats.errors, "cache_hits": stats.cache_hits}
+                for name, stats in self.routes.stats.items()
+            },
+            "admission": self.admission.metrics(),
+            "n8n_lanes": self.n8n.lane_metrics(),
+            "watches": len(self.watches),
+            "watched_products": self.watches.product_count(),
+            "hosts": self.hosts.metrics(),
+            "ollama": self.ollama.metrics() if self.ollama else None,
+        }
+
+    async def close(self):
+        if self.config.snapshot_max_age:
+            try:
+                await self.snapshots.save()
+            except OSError as e:
+                logger.warning(f"Failed to save snapshot: {e}")
+        await self.config_watcher.stop()
+        if self.ipc:
+            await self.ipc.close()
+        await super().close()
+        await self.n8n.close()
+        if self.ollama:
+            await self.ollama.close()
+        if self.recorder:
+            self.recorder.close()
+
     async def on_ready(self):
         """Called when the bot is fully connected."""
         logger.info(f"Logged in as {self.user} (ID: {self.user.id})")
         logger.info(f"Connected to {len(self.guilds)} guild(s)")
-        logger.info(f"n8n base URL: {self.config.n8n_base_url}")
+        if self.shard_count:
+            logger.info(
+                f"Cluster {self.config.cluster_id}: shards "
+                f"{self.config.shard_ids or 'auto'} of {self.shard_count}"
+            )
+        logger.info(f"n8n base URL: {self.config.n8n_base_url} (codec: {self.n8n.codec.name})")
 
         # Set bot status
         await self.change_presence(
@@ -66,11 +438,31 @@ class MarcelloBot(commands.Bot):
         )
 
 
+class ShardedMarcelloBot(MarcelloBot, commands.AutoShardedBot):
+    """MarcelloBot running one or more shards in this process."""
+
+    def __init__(self, config: Config):
+        super().__init__(
+            config, shard_count=config.shard_count, shard_ids=config.shard_ids
+        )
+
+
+def create_bot(config: Config) -> MarcelloBot:
+    if config.sharded or config.shard_ids:
+        return ShardedMarcelloBot(config)
+    return MarcelloBot(config)
+
+
 def main():
     """Entry point for the bot."""
     load_dotenv()
-    config = Config.from_env()
-    bot = MarcelloBot(config)
+    try:
+        config = Config.load()
+    except ConfigError as e:
+        raise SystemExit(f"Invalid configuration: {e}")
+    if not config.discord_token:
+        raise SystemExit("DISCORD_TOKEN must be set")
+    bot = create_bot(config)
 
     logger.info("Starting MarcelloBot...")
     bot.run(config.discord_token, log_handler=None)
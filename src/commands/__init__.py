@@ -1,3 +1,5 @@
-from . import stock, home, status, webhook, help
+# Command modules are imported lazily by MarcelloBot.setup_hook so that
+# features left out of ENABLED_COGS are never imported.
+AVAILABLE_COGS = ("stock", "home", "status", "webhook", "help", "vettix", "recipe", "settings")
 
-__all__ = ["stock", "home", "status", "webhook", "help"]
+__all__ = ["AVAILABLE_COGS"]
@@ -26,7 +26,7 @@ class HelpCommands(commands.Cog):
             name="Ubiquiti Stock Monitoring",
             value=(
                 "`/ubiquiti-stock <url>` - Check if a product is in stock\n"
-                "`/ubiquiti-watch <url> [interval]` - Add product to watch list (default: 5 min)\n"
+                "`/ubiquiti-watch <url> [interval] [price_below] [adaptive]` - Add product to watch list (default: 5 min)\n"
                 "`/ubiquiti-unwatch <url>` - Remove product from watch list\n"
                 "`/ubiquiti-watchlist` - List all monitored products"
             ),
@@ -38,7 +38,7 @@ class HelpCommands(commands.Cog):
             name="Best Buy Stock Monitoring",
             value=(
                 "`/bestbuy-stock <url>` - Check if a product is in stock\n"
-                "`/bestbuy-watch <url> [interval]` - Add product to watch list (default: 5 min)\n"
+                "`/bestbuy-watch <url> [interval] [price_below] [adaptive]` - Add product to watch list (default: 5 min)\n"
                 "`/bestbuy-unwatch <url>` - Remove product from watch list\n"
                 "`/bestbuy-watchlist` - List all monitored products"
             ),
@@ -50,20 +50,32 @@ class HelpCommands(commands.Cog):
             name="Universal Stock Checker (AI-Powered)",
             value=(
                 "`/stock-check <url>` - Check ANY product stock using AI analysis\n"
-                "`/stock-watch <url> [interval]` - Add ANY product to AI watch list (default: 5 min)\n"
+                "`/stock-watch <url> [interval] [price_below] [adaptive]` - Add ANY product to AI watch list (default: 5 min)\n"
                 "`/stock-unwatch <url>` - Remove product from AI watch list\n"
                 "`/stock-watchlist` - List all AI-monitored products\n"
+                "`/stock-find <product>` - Check a product by name or SKU at every known retailer\n"
                 "  Works with any website - analyzes pages with Ollama LLM"
             ),
             inline=False,
         )
 
+        # Price History
+        embed.add_field(
+            name="Price History",
+            value=(
+                "`/price-history <url> [window]` - Price range, percentiles and trend for a product\n"
+                "  Recorded from stock checks and watch lists; `price_below` on a watch alerts on drops"
+            ),
+            inline=False,
+        )
+
         # Home Automation Commands
         embed.add_field(
             name="Home Automation",
             value=(
                 "`/home <action> [target]` - Control home devices\n"
-                "  Actions: `lights on`, `lights off`, `status`"
+                "  Actions: `lights on`, `lights off`, `status`\n"
+                "  Several targets: `kitchen,living,office`"
             ),
             inline=False,
         )
@@ -71,7 +83,11 @@ class HelpCommands(commands.Cog):
         # Status Commands
         embed.add_field(
             name="Status",
-            value="`/status [service]` - Check homelab service status",
+            value=(
+                "`/status [service] [live]` - Check homelab service status\n"
+                "  Answers from the latest background check; `live` probes now\n"
+                "`/status-history <service> [window]` - Uptime, latency and outages (e.g. `24h`, `7d`)"
+            ),
             inline=False,
         )
 
@@ -81,6 +97,8 @@ class HelpCommands(commands.Cog):
             value=(
                 "`/recipe url:<url>` - Parse a recipe from a URL and save to recipe book\n"
                 "`/recipe recipe_text:<text>` - Parse pasted recipe text and save to recipe book\n"
+                "`/recipe-batch urls:<urls>` - Parse several recipe URLs and save them in one commit\n"
+                "`/recipe-search query:<words>` - Find saved recipes by title, ingredients or tags\n"
                 "  Supports unstructured text with ingredients and instructions"
             ),
             inline=False,
@@ -93,6 +111,19 @@ class HelpCommands(commands.Cog):
             inline=False,
         )
 
+        # Settings Commands
+        embed.add_field(
+            name="Settings (bot owner)",
+            value=(
+                "`/config show [setting]` - Show settings and where each comes from\n"
+                "`/config set <setting> <value>` - Change a setting without a restart\n"
+                "`/config unset <setting>` - Remove an override\n"
+                "`/config reload` - Re-read the config file now\n"
+                "`/bot-stats [cluster]` - Queue depth, wait times, n8n lanes, hosts and Ollama"
+            ),
+            inline=False,
+        )
+
         embed.set_footer(text="<required> [optional]")
 
         await interaction.response.send_message(embed=embed)
@@ -2,7 +2,77 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
-from ..services import N8NClient
+from ..config import Config
+from ..services import HomeBatcher, HomeRegistry, N8NClient
+from .routing import Option, RouteContext, WebhookRoute, route_command
+
+
+def parse_targets(target: str | None) -> list[str | None]:
+    """Split `kitchen, living,office` into unique targets; no target means all."""
+    if not target:
+        return [None]
+    targets = list(dict.fromkeys(part.strip() for part in target.split(",") if part.strip()))
+    return targets or [None]
+
+
+async def submit_to_batcher(ctx: RouteContext, payload: dict) -> dict:
+    """Hand the action to the debouncer instead of calling the webhook directly."""
+    outcome = await ctx.cog.batcher.submit(
+        payload["action"], payload["targets"], payload["user"]
+    )
+    ctx.extras["outcome"] = outcome
+    if not outcome.sent:
+        return {}
+    return outcome.result or {}
+
+
+def render_home(ctx: RouteContext, result: dict) -> str:
+    outcome = ctx.extras["outcome"]
+    if not outcome.sent:
+        return (
+            f"Cancelled: {ctx.args['action'].name} cancelled out a pending opposite command "
+            f"for {', '.join(t or 'everything' for t in outcome.cancelled)}."
+        )
+
+    ctx.cog.registry.learn(outcome.sent)
+    message = result.get("message") or result.get("response") or "Done!"
+    if outcome.batch_size > 1:
+        message += f"\n-# Sent together with {outcome.batch_size - 1} other action(s)"
+    if outcome.cancelled:
+        message += f"\n-# Cancelled out: {', '.join(t or 'everything' for t in outcome.cancelled)}"
+    return message
+
+
+HOME_CONTROL = WebhookRoute(
+    name="home",
+    description="Control home automation",
+    webhook="home-control",
+    options=[
+        Option(
+            "action",
+            app_commands.Choice[str],
+            "Action to perform",
+            choices=[
+                app_commands.Choice(name="lights on", value="lights_on"),
+                app_commands.Choice(name="lights off", value="lights_off"),
+                app_commands.Choice(name="status", value="status"),
+            ],
+        ),
+        Option(
+            "target",
+            str | None,
+            "Target device or area (comma-separate several, e.g. kitchen,office)",
+            default=None,
+        ),
+    ],
+    payload=lambda ctx: {
+        "action": ctx.args["action"].value,
+        "targets": parse_targets(ctx.args["target"]),
+        "user": str(ctx.user),
+    },
+    call=submit_to_batcher,
+    render=render_home,
+)
 
 
 class HomeCommands(commands.Cog):
@@ -11,48 +81,44 @@ class HomeCommands(commands.Cog):
     def __init__(self, bot: commands.Bot, n8n: N8NClient):
         self.bot = bot
         self.n8n = n8n
+        self.batcher = HomeBatcher(n8n, window=bot.config.home_debounce_ms / 1000)
+        self.registry = HomeRegistry(
+            n8n, seed=bot.config.home_targets, admission=bot.admission
+        )
 
-    @app_commands.command(name="home", description="Control home automation")
-    @app_commands.describe(
-        action="Action to perform",
-        target="Target device or area",
-    )
-    @app_commands.choices(
-        action=[
-            app_commands.Choice(name="lights on", value="lights_on"),
-            app_commands.Choice(name="lights off", value="lights_off"),
-            app_commands.Choice(name="status", value="status"),
-        ]
-    )
-    async def home_control(
-        self,
-        interaction: discord.Interaction,
-        action: app_commands.Choice[str],
-        target: str | None = None,
-    ):
-        """Control home automation devices."""
-        await interaction.response.defer(thinking=True)
-
-        try:
-            payload = {
-                "action": action.value,
-                "target": target,
-                "user": str(interaction.user),
-            }
-
-            result = await self.n8n.trigger_webhook("home-control", payload)
-
-            if result.get("error"):
-                await interaction.followup.send(
-                    f"Failed: {result.get('message', 'Unknown error')}"
-                )
-                return
-
-            message = result.get("message") or result.get("response") or "Done!"
-            await interaction.followup.send(message)
-
-        except Exception as e:
-            await interaction.followup.send(f"Error: {e}")
+    async def cog_load(self):
+        self.bot.snapshots.register(
+            "home-targets", 1, self.registry.snapshot, self.registry.restore
+        )
+
+    async def cog_unload(self):
+        self.bot.snapshots.unregister("home-targets")
+        await self.batcher.close()
+
+    @commands.Cog.listener()
+    async def on_config_reload(self, old: Config, new: Config):
+        self.batcher.window = new.home_debounce_ms / 1000
+
+    home_control = route_command(HOME_CONTROL)
+
+    @home_control.autocomplete("target")
+    async def target_autocomplete(
+        self, interaction: discord.Interaction, current: str
+    ) -> list[app_commands.Choice[str]]:
+        """Suggest device/area names for the last comma-separated target."""
+        self.registry.refresh_if_stale()
+        *chosen, partial = current.split(",")
+        chosen = [part.strip() for part in chosen if part.strip()]
+        prefix = ",".join(chosen) + "," if chosen else ""
+
+        choices = []
+        for name in self.registry.suggest(partial):
+            if name in chosen:
+                continue
+            value = prefix + name
+            if len(value) <= 100:
+                choices.append(app_commands.Choice(name=value, value=value))
+        return choices[:25]
 
 
 async def setup(bot: commands.Bot, n8n: N8NClient):
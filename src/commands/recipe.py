@@ -1,10 +1,29 @@
+import asyncio
+import logging
+import time
+from pathlib import Path
+
 import discord
 from discord import app_commands
 from discord.ext import commands
 
-from ..services import N8NClient
+from ..services import (
+    AdmissionRejected,
+    CommitResult,
+    N8NClient,
+    ParsedRecipe,
+    RecipeBook,
+    RecipeSearchIndex,
+)
+from ..services.recipe_batch import MAX_BATCH_SIZE, RecipeBatch
+from .routing import QueueNotice
+
+logger = logging.getLogger("marcellobot.recipe")
 
 LOGS_CHANNEL = "logs"
+# Discord rate-limits message edits, so batch progress refreshes at most this often
+PROGRESS_EDIT_INTERVAL = 1.5
+SEARCH_RESULTS = 10
 
 
 class RecipeCommands(commands.Cog):
@@ -13,11 +32,52 @@ class RecipeCommands(commands.Cog):
     def __init__(self, bot: commands.Bot, n8n: N8NClient):
         self.bot = bot
         self.n8n = n8n
+        self.recipe_book: RecipeBook | None = getattr(bot, "recipe_book", None)
+        # Every cluster syncs its own index; only the first writes the shared file
+        self.search_index = RecipeSearchIndex(
+            Path(bot.config.data_dir) / "recipe-search.idx", read_only=not bot.owns_data
+        )
+        self._sync_task: asyncio.Task | None = None
+        self._sync_again = False
+
+    async def cog_load(self):
+        await asyncio.to_thread(self.search_index.load)
+        self.sync_search_index()
+
+    async def cog_unload(self):
+        if self._sync_task:
+            self._sync_task.cancel()
+
+    def sync_search_index(self):
+        """Catch the search index up with the recipe book in the background."""
+        if self.recipe_book is None:
+            return
+        if self._sync_task and not self._sync_task.done():
+            # A commit may have landed after the running sync read the branch
+            self._sync_again = True
+            return
+        self._sync_task = asyncio.create_task(self._sync_search_index())
+
+    async def _sync_search_index(self):
+        self._sync_again = True
+        while self._sync_again:
+            self._sync_again = False
+            try:
+                await self.search_index.sync(self.recipe_book)
+            except Exception as e:
+                logger.warning(f"Failed to sync recipe search index: {e}")
+
+    async def index_commit(self, commit: CommitResult):
+        """Make freshly committed recipes searchable before the next sync."""
+        self.search_index.add_saved(commit.recipes)
+        await self.search_index.save()
+        self.sync_search_index()
 
     async def get_or_create_channel(
         self, guild: discord.Guild, channel_name: str
     ) -> discord.TextChannel:
         """Get an existing channel or create it if it doesn't exist."""
+        channel_name = self.bot.config.channel(channel_name)
         channel = discord.utils.get(guild.text_channels, name=channel_name)
         if channel is None:
             channel = await guild.create_text_channel(channel_name)
@@ -28,6 +88,22 @@ class RecipeCommands(commands.Cog):
         channel = await self.get_or_create_channel(guild, LOGS_CHANNEL)
         await channel.send(message)
 
+    @staticmethod
+    def summarize_commit(commit: CommitResult) -> dict:
+        """Shape a native commit like the workflow's Prepare Response output."""
+        saved = commit.recipes[0]
+        recipe = saved.parsed.recipe
+        main_image = saved.main_image
+        return {
+            "title": saved.parsed.title,
+            "description": recipe.get("description"),
+            "imageUrl": main_image.original_url if main_image else None,
+            "ingredientCount": len(recipe.get("ingredients", [])),
+            "stepCount": len(recipe.get("instructions", [])),
+            "commitUrl": commit.commit_url,
+            "timings": commit.format_timings(),
+        }
+
     @app_commands.command(
         name="recipe",
         description="Parse a recipe from a URL or pasted text and save to recipe book",
@@ -51,6 +127,7 @@ class RecipeCommands(commands.Cog):
             return
 
         await interaction.response.defer(thinking=True)
+        notice = QueueNotice(interaction)
 
         try:
             if url:
@@ -73,16 +150,25 @@ class RecipeCommands(commands.Cog):
                 "recipe_text": recipe_text,
                 "guild_id": str(interaction.guild_id),
                 "requested_by": str(interaction.user),
+                # With a GitHub token the bot commits images itself
+                "parse_only": self.recipe_book is not None,
             }
 
-            result = await self.n8n.trigger_webhook("recipe-parser", payload)
+            async with self.bot.admission.slot(
+                "recipe-parser",
+                interaction.guild_id,
+                interaction.user.id,
+                on_queued=notice.on_queued,
+            ):
+                notice.admitted = True
+                result = await self.n8n.trigger_webhook("recipe-parser", payload)
 
             if result.get("error"):
                 error_msg = f"Failed to parse recipe: {result.get('message', 'Unknown error')}"
                 await self.log_to_channel(
                     interaction.guild, f"`[Recipe]` Error: {error_msg}"
                 )
-                await interaction.followup.send(error_msg)
+                await notice.send(error_msg)
                 return
 
             # Check for duplicate
@@ -91,12 +177,21 @@ class RecipeCommands(commands.Cog):
                     interaction.guild,
                     f"`[Recipe]` Duplicate detected: {result.get('title', 'Unknown')}",
                 )
-                await interaction.followup.send(
+                await notice.send(
                     f"This recipe already exists in the recipe book: **{result.get('title')}**\n"
                     f"View it here: {result.get('existingUrl', 'N/A')}"
                 )
                 return
 
+            # Parse-only response: commit natively
+            if result.get("parsed"):
+                commit = await self.recipe_book.save([ParsedRecipe.from_result(result)])
+                await self.index_commit(commit)
+                result = self.summarize_commit(commit)
+            else:
+                # The workflow committed it; pick it up from the book
+                self.sync_search_index()
+
             # Success case
             title = result.get("title", "Unknown Recipe")
             commit_url = result.get("commitUrl", "")
@@ -132,16 +227,146 @@ class RecipeCommands(commands.Cog):
                     value=f"[View Commit]({commit_url})",
                     inline=False,
                 )
+            if result.get("timings"):
+                embed.set_footer(text=result["timings"])
 
-            await interaction.followup.send(embed=embed)
+            await notice.send(embed=embed)
 
+        except AdmissionRejected as e:
+            await notice.send(str(e))
         except Exception as e:
             error_msg = f"Error parsing recipe: {e}"
             await self.log_to_channel(
                 interaction.guild, f"`[Recipe]` Error: {error_msg}"
             )
+            await notice.send(error_msg)
+
+    @app_commands.command(
+        name="recipe-batch",
+        description="Parse several recipe URLs and save them in one commit",
+    )
+    @app_commands.describe(
+        urls="Recipe URLs separated by spaces or commas",
+    )
+    async def parse_recipe_batch(self, interaction: discord.Interaction, urls: str):
+        """Parse many recipe URLs concurrently and commit them together."""
+        if self.recipe_book is None:
+            await interaction.response.send_message(
+                "Batch import needs GITHUB_TOKEN configured on the bot.", ephemeral=True
+            )
+            return
+
+        url_list = RecipeBatch.split_urls(urls)
+        if not url_list:
+            await interaction.response.send_message(
+                "Please provide at least one recipe URL.", ephemeral=True
+            )
+            return
+        if len(url_list) > MAX_BATCH_SIZE:
+            await interaction.response.send_message(
+                f"That's {len(url_list)} URLs; a batch holds at most {MAX_BATCH_SIZE}. "
+                "Split them over several `/recipe-batch` commands.",
+                ephemeral=True,
+            )
+            return
+
+        await interaction.response.defer(thinking=True)
+
+        try:
+            await self.log_to_channel(
+                interaction.guild,
+                f"`[Recipe]` Batch of {len(url_list)} URLs requested by {interaction.user.mention}",
+            )
+
+            progress = await interaction.followup.send("Starting recipe batch...", wait=True)
+            last_edit = 0.0
+
+            async def update_progress(batch: RecipeBatch):
+                nonlocal last_edit
+                now = time.monotonic()
+                if now - last_edit < PROGRESS_EDIT_INTERVAL:
+                    return
+                last_edit = now
+                await progress.edit(content=batch.format_progress())
+
+            batch = RecipeBatch(
+                self.n8n,
+                self.recipe_book,
+                url_list,
+                requested_by=str(interaction.user),
+                guild_id=interaction.guild_id,
+                user_id=interaction.user.id,
+                admission=self.bot.admission,
+                on_update=update_progress,
+            )
+            try:
+                commit = await batch.run()
+            finally:
+                await progress.edit(content=batch.format_progress())
+
+            if commit:
+                await self.index_commit(commit)
+            counts = batch.counts()
+            await self.log_to_channel(
+                interaction.guild,
+                f"`[Recipe]` Batch done: {counts.get('saved', 0)} saved, "
+                f"{counts.get('duplicate', 0)} duplicate, {counts.get('failed', 0)} failed"
+                + (f" ({commit.format_timings()})" if commit else ""),
+            )
+
+        except Exception as e:
+            error_msg = f"Error importing recipes: {e}"
+            await self.log_to_channel(
+                interaction.guild, f"`[Recipe]` Error: {error_msg}"
+            )
             await interaction.followup.send(error_msg)
 
+    @app_commands.command(
+        name="recipe-search",
+        description="Search the recipe book by title, ingredients and tags",
+    )
+    @app_commands.describe(
+        query="Words or ingredients to look for, e.g. chicken lemon garlic (-word to exclude)",
+    )
+    async def search_recipes(self, interaction: discord.Interaction, query: str):
+        """Rank recipes by how many query terms they contain, then by relevance."""
+        if not len(self.search_index):
+            if self.recipe_book is None:
+                message = "Recipe search needs GITHUB_TOKEN configured on the bot."
+            else:
+                self.sync_search_index()
+                message = "The recipe search index is still being built; try again shortly."
+            await interaction.response.send_message(message, ephemeral=True)
+            return
+
+        started = time.perf_counter()
+        hits = self.search_index.search(query, limit=SEARCH_RESULTS)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if not hits:
+            await interaction.response.send_message(f"No recipes match `{query}`.")
+            return
+
+        embed = discord.Embed(
+            title=f"Recipes matching: {query}"[:256],
+            color=discord.Color.orange(),
+        )
+        github = self.recipe_book.github if self.recipe_book else None
+        lines = []
+        for position, hit in enumerate(hits, start=1):
+            title = hit.doc.title
+            if github:
+                title = f"[{title}]({github.blob_url(hit.doc.path)})"
+            line = f"**{position}.** {title}"
+            ingredients = hit.matching_ingredients()
+            if ingredients:
+                line += "\n" + "; ".join(ingredients)[:200]
+            lines.append(line)
+        embed.description = "\n".join(lines)[:4096]
+        embed.set_footer(
+            text=f"{len(self.search_index)} recipe(s) indexed | {elapsed_ms:.1f}ms"
+        )
+        await interaction.response.send_message(embed=embed)
+
 
 async def setup(bot: commands.Bot, n8n: N8NClient):
     await bot.add_cog(RecipeCommands(bot, n8n))
@@ -0,0 +1,394 @@
+"""
+Declarative command -> webhook routing.
+
+Most slash commands follow the same pipeline: defer, log the request, build
+a payload, call an n8n webhook, report failures, render the result. A
+`WebhookRoute` describes one command in those terms and `route_command`
+turns it into an app command that runs through the bot's shared
+`RouteExecutor`, which adds timing, admission control, timeouts and
+response caching in one place.
+"""
+import asyncio
+import inspect
+import json
+import logging
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from ..services import (
+    AdmissionController,
+    AdmissionRejected,
+    HostBusy,
+    HostScheduler,
+    N8NClient,
+)
+
+logger = logging.getLogger("marcellobot.routing")
+
+LOGS_CHANNEL = "logs"
+
+Reply = str | discord.Embed
+
+
+@dataclass
+class Option:
+    """One slash command option."""
+
+    name: str
+    type: Any
+    description: str
+    default: Any = inspect.Parameter.empty
+    choices: list[app_commands.Choice] | None = None
+
+
+class QueueNotice:
+    """
+    Shows a deferred interaction's place in the admission queue.
+
+    Once a position has been shown, the final reply replaces it by editing
+    the original response instead of sending a new followup.
+    """
+
+    def __init__(self, interaction: discord.Interaction, min_interval: float = 1.0):
+        self.interaction = interaction
+        self.min_interval = min_interval
+        self.admitted = False
+        self.shown = False
+        self._last_edit = 0.0
+        self._lock = asyncio.Lock()
+
+    async def on_queued(self, position: int):
+        async with self._lock:
+            if self.admitted or time.monotonic() - self._last_edit < self.min_interval:
+                return
+            await self.interaction.edit_original_response(
+                content=f"⏳ Waiting for a free slot (position {position} in queue)"
+            )
+            self.shown = True
+            self._last_edit = time.monotonic()
+
+    async def send(
+        self,
+        content: str | None = None,
+        embed: discord.Embed | None = None,
+        file: discord.File | None = None,
+    ):
+        async with self._lock:
+            self.admitted = True
+            if self.shown:
+                await self.interaction.edit_original_response(
+                    content=content, embed=embed, attachments=[file] if file else []
+                )
+                return
+            kwargs = {"content": content}
+            if embed is not None:
+                kwargs["embed"] = embed
+            if file is not None:
+                kwargs["file"] = file
+            await self.interaction.followup.send(**kwargs)
+
+
+@dataclass
+class RouteContext:
+    """Per-invocation state handed to a route's hooks."""
+
+    route: "WebhookRoute"
+    cog: commands.Cog
+    interaction: discord.Interaction
+    args: dict[str, Any]
+    notice: QueueNotice
+    extras: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def guild(self) -> discord.Guild | None:
+        return self.interaction.guild
+
+    @property
+    def user(self) -> discord.abc.User:
+        return self.interaction.user
+
+    async def channel(self, name: str) -> discord.TextChannel:
+        """Get an existing channel or create it if it doesn't exist."""
+        name = self.cog.bot.config.channel(name)
+        channel = discord.utils.get(self.guild.text_channels, name=name)
+        if channel is None:
+            channel = await self.guild.create_text_channel(name)
+        return channel
+
+    async def channel_id(self, name: str) -> str:
+        return str((await self.channel(name)).id)
+
+    async def log(self, message: str):
+        """Send a message tagged with the route's log tag to the logs channel."""
+        if self.guild is None:
+            return
+        channel = await self.channel(LOGS_CHANNEL)
+        await channel.send(f"`[{self.route.log_tag}]` {message}")
+
+
+Hook = Callable[..., Any]
+
+
+@dataclass
+class WebhookRoute:
+    """
+    Declarative description of a webhook-backed slash command.
+
+    Hooks may be plain functions or coroutines:
+        payload(ctx) -> dict         webhook payload
+        render(ctx, result) -> Reply reply for a successful result
+        request_log(ctx) -> str      logged before the call (needs log_tag)
+        validate(ctx) -> str | None  error to reply with instead of calling
+        shortcut(ctx) -> Reply|None  answer without deferring or calling
+        call(ctx, payload) -> dict   replaces the webhook call itself
+        fetches(ctx) -> str          URL the workflow fetches; paced per host
+    """
+
+    name: str
+    description: str
+    webhook: str
+    payload: Hook
+    render: Hook | None = None
+    options: list[Option] = field(default_factory=list)
+    log_tag: str | None = None
+    request_log: Hook | None = None
+    validate: Hook | None = None
+    shortcut: Hook | None = None
+    call: Hook | None = None
+    fetches: Hook | None = None
+    failure: str = "Failed"  # prefix for error results
+    exception: str = "Error"  # prefix for exceptions
+    log_errors: bool = True
+    timeout: float | None = None
+    cache_ttl: float = 0  # seconds; cached results are dropped on any other call to the webhook
+    concurrency: int | None = None  # cap on this webhook, on top of the admission limits
+
+
+def default_render(ctx: RouteContext, result: dict) -> Reply:
+    return result.get("message") or result.get("response") or "Done!"
+
+
+async def _resolve(value: Any) -> Any:
+    return await value if inspect.isawaitable(value) else value
+
+
+@contextmanager
+def _timed(timings: dict[str, float], stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = time.perf_counter() - start
+
+
+@dataclass
+class RouteStats:
+    calls: int = 0
+    errors: int = 0
+    cache_hits: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    def record(self, seconds: float, error: bool):
+        self.calls += 1
+        self.errors += error
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+
+class RouteExecutor:
+    """Runs routes through the shared pipeline with admission, timing and caching."""
+
+    def __init__(
+        self,
+        n8n: N8NClient,
+        admission: AdmissionController,
+        hosts: HostScheduler | None = None,
+    ):
+        self.n8n = n8n
+        self.admission = admission
+        self.hosts = hosts
+        self._cache: dict[tuple[str, str], tuple[float, dict]] = {}
+        self.stats: dict[str, RouteStats] = {}
+
+    def _cache_key(self, route: WebhookRoute, payload: dict) -> tuple[str, str]:
+        return route.webhook, json.dumps(payload, sort_keys=True, default=str)
+
+    def snapshot(self) -> list:
+        """Unexpired cached results, with expiry as epoch seconds."""
+        offset = time.time() - time.monotonic()
+        return [
+            [webhook, key, expires + offset, result]
+            for (webhook, key), (expires, result) in self._cache.items()
+            if expires > time.monotonic()
+        ]
+
+    def restore(self, data: list):
+        offset = time.time() - time.monotonic()
+        for webhook, key, expires, result in data:
+            if expires - offset > time.monotonic():
+                self._cache.setdefault((webhook, key), (expires - offset, result))
+
+    async def _call(self, route: WebhookRoute, ctx: RouteContext, payload: dict) -> dict:
+        stats = self.stats.setdefault(route.name, RouteStats())
+        key = self._cache_key(route, payload)
+        if route.cache_ttl:
+            cached = self._cache.get(key)
+            if cached and cached[0] > time.monotonic():
+                stats.cache_hits += 1
+                return cached[1]
+        else:
+            # Anything else sent to this webhook may change what it returns
+            for cached_key in [k for k in self._cache if k[0] == route.webhook]:
+                del self._cache[cached_key]
+
+        # Page fetches wait for their host first, so a throttled retailer
+        # doesn't hold admission slots other commands could use
+        fetch_url = await _resolve(route.fetches(ctx)) if route.fetches and self.hosts else None
+        async with self.hosts.slot(fetch_url) if fetch_url else nullcontext():
+            async with self.admission.slot(
+                route.webhook,
+                ctx.interaction.guild_id,
+                ctx.user.id,
+                webhook_limit=route.concurrency,
+                on_queued=ctx.notice.on_queued,
+            ):
+                ctx.notice.admitted = True
+                call = (
+                    route.call(ctx, payload)
+                    if route.call
+                    else self.n8n.trigger_webhook(route.webhook, payload)
+                )
+                result = await asyncio.wait_for(_resolve(call), route.timeout)
+        if fetch_url:
+            self.hosts.record_result(fetch_url, result)
+
+        if route.cache_ttl and not result.get("error"):
+            self._cache[key] = (time.monotonic() + route.cache_ttl, result)
+        return result
+
+    async def _fail(self, ctx: RouteContext, message: str):
+        if ctx.route.log_tag and ctx.route.log_errors:
+            try:
+                await ctx.log(f"Error: {message}")
+            except discord.HTTPException:
+                pass
+        await ctx.notice.send(message)
+
+    async def execute(
+        self,
+        route: WebhookRoute,
+        cog: commands.Cog,
+        interaction: discord.Interaction,
+        args: dict[str, Any],
+    ):
+        ctx = RouteContext(route, cog, interaction, args, QueueNotice(interaction))
+        timings: dict[str, float] = {}
+        started = time.perf_counter()
+        error = False
+
+        if route.shortcut:
+            reply = await _resolve(route.shortcut(ctx))
+            if reply is not None:
+                if isinstance(reply, discord.Embed):
+                    await interaction.response.send_message(embed=reply)
+                else:
+                    await interaction.response.send_message(reply)
+                self.stats.setdefault(route.name, RouteStats()).record(
+                    time.perf_counter() - started, False
+                )
+                return
+
+        await interaction.response.defer(thinking=True)
+
+        try:
+            if route.validate:
+                problem = await _resolve(route.validate(ctx))
+                if problem:
+                    await ctx.notice.send(problem)
+                    return
+
+            if route.log_tag and route.request_log:
+                await ctx.log(await _resolve(route.request_log(ctx)))
+
+            with _timed(timings, "payload"):
+                payload = await _resolve(route.payload(ctx))
+            with _timed(timings, "webhook"):
+                result = await self._call(route, ctx, payload)
+
+            if result.get("error"):
+                error = True
+                await self._fail(
+                    ctx, f"{route.failure}: {result.get('message', 'Unknown error')}"
+                )
+                return
+
+            with _timed(timings, "render"):
+                reply = await _resolve((route.render or default_render)(ctx, result))
+            if isinstance(reply, discord.Embed):
+                await ctx.notice.send(embed=reply)
+            else:
+                await ctx.notice.send(reply)
+
+        except (AdmissionRejected, HostBusy) as e:
+            error = True
+            await ctx.notice.send(str(e))
+        except asyncio.TimeoutError:
+            error = True
+            await self._fail(ctx, f"{route.exception}: timed out after {route.timeout:g}s")
+        except Exception as e:
+            error = True
+            await self._fail(ctx, f"{route.exception}: {e}")
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stats.setdefault(route.name, RouteStats()).record(elapsed, error)
+            logger.debug(
+                f"/{route.name} took {elapsed:.2f}s ("
+                + ", ".join(f"{stage} {secs:.2f}s" for stage, secs in timings.items())
+                + ")"
+            )
+
+
+def route_command(route: WebhookRoute) -> app_commands.Command:
+    """Build an app command for a route, to be assigned in a cog's class body."""
+
+    async def callback(cog: commands.Cog, interaction: discord.Interaction, **args):
+        await cog.bot.routes.execute(route, cog, interaction, args)
+
+    parameters = [
+        inspect.Parameter("self", inspect.Parameter.POSITIONAL_OR_KEYWORD),
+        inspect.Parameter(
+            "interaction", inspect.Parameter.POSITIONAL_OR_KEYWORD, annotation=discord.Interaction
+        ),
+    ]
+    parameters += [
+        inspect.Parameter(
+            option.name,
+            inspect.Parameter.KEYWORD_ONLY,
+            annotation=option.type,
+            default=option.default,
+        )
+        for option in route.options
+    ]
+    callback.__signature__ = inspect.Signature(parameters)
+    # A dotted qualname marks the callback as a method so the cog is bound to it
+    callback.__qualname__ = f"WebhookRoute.{route.name.replace('-', '_')}"
+    callback.__name__ = route.name.replace("-", "_")
+    callback.__doc__ = route.description
+
+    command = app_commands.Command(
+        name=route.name, description=route.description, callback=callback
+    )
+    descriptions = {option.name: option.description for option in route.options}
+    if descriptions:
+        command = app_commands.describe(**descriptions)(command)
+    choices = {option.name: option.choices for option in route.options if option.choices}
+    if choices:
+        command = app_commands.choices(**choices)(command)
+    return command
@@ -0,0 +1,174 @@
+import asyncio
+import json
+from dataclasses import fields
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from ..config import RESTART_FIELDS, SECRET_FIELDS, Config, ConfigError, load_config_file
+from ..services import N8NClient, NameIndex
+
+SETTINGS = [f.name for f in fields(Config)]
+# Raised by update_config when cluster 0 is down, slow or fails the request
+IPC_ERRORS = (RuntimeError, OSError)  # OSError covers TimeoutError
+
+
+def show_value(name: str, value) -> str:
+    if name in SECRET_FIELDS and value:
+        return "••••••"
+    return json.dumps(value)
+
+
+def ipc_failure(error: Exception) -> str:
+    reason = str(error) or type(error).__name__
+    return (
+        f"⚠️ Couldn't confirm the change with cluster 0 ({reason}). "
+        "It may still have been applied; check `/config show` before retrying."
+    )
+
+
+class SettingsCommands(commands.Cog):
+    """Admin commands for viewing and changing settings without a restart."""
+
+    config_group = app_commands.Group(
+        name="config",
+        description="View and change bot settings",
+        default_permissions=discord.Permissions(administrator=True),
+        guild_only=True,
+    )
+
+    def __init__(self, bot: commands.Bot, n8n: N8NClient):
+        self.bot = bot
+        self.n8n = n8n
+        self.setting_index = NameIndex(SETTINGS)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # Settings apply to every server, so only the bot's owner may touch them
+        if await self.bot.is_owner(interaction.user):
+            return True
+        await interaction.response.send_message(
+            "Only the bot owner can view or change settings.", ephemeral=True
+        )
+        return False
+
+    async def setting_autocomplete(
+        self, interaction: discord.Interaction, current: str
+    ) -> list[app_commands.Choice[str]]:
+        return [
+            app_commands.Choice(name=name, value=name)
+            for name in self.setting_index.search(current)
+        ]
+
+    def _layers(self) -> tuple[dict, dict]:
+        config = self.bot.config
+        try:
+            file = load_config_file(config.config_path)
+        except ConfigError:
+            file = {}
+        try:
+            overrides = load_config_file(config.overrides_path)
+        except ConfigError:
+            overrides = {}
+        return file, overrides
+
+    @staticmethod
+    def _outcome(message: str, changed: list[str], pending: list[str]) -> str:
+        if changed:
+            message += f"\nApplied: {', '.join(f'`{name}`' for name in changed)}"
+        if pending:
+            names = ", ".join(f"`{name}`" for name in pending)
+            message += f"\n⚠️ Takes effect after a restart: {names}"
+        return message
+
+    @config_group.command(name="show", description="Show current settings and where they come from")
+    @app_commands.describe(setting="Setting to show (default: all)")
+    async def show(self, interaction: discord.Interaction, setting: str | None = None):
+        """Show the running value of each setting and which layer set it."""
+        file, overrides = await asyncio.to_thread(self._layers)
+        if setting is not None and setting not in SETTINGS:
+            await interaction.response.send_message(
+                f"Unknown setting `{setting}`.", ephemeral=True
+            )
+            return
+
+        lines = []
+        for name in [setting] if setting else SETTINGS:
+            source = "override" if name in overrides else "file" if name in file else "env"
+            restart = " (restart)" if name in RESTART_FIELDS else ""
+            lines.append(
+                f"{name} = {show_value(name, getattr(self.bot.config, name))}  [{source}]{restart}"
+            )
+        embed = discord.Embed(
+            title="Settings",
+            description="```\n" + "\n".join(lines)[:4000] + "\n```",
+            color=discord.Color.blue(),
+        )
+        embed.set_footer(text=f"env < {self.bot.config.config_path} < /config overrides")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @config_group.command(name="set", description="Override a setting for the running bot")
+    @app_commands.describe(
+        setting="Setting to change",
+        value="New value; maps as a=1,b=2 and lists as a,b",
+    )
+    async def set_setting(self, interaction: discord.Interaction, setting: str, value: str):
+        """Save an override and apply it right away if the result is valid."""
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        _, overrides = await asyncio.to_thread(self._layers)
+        overrides[setting] = value
+        try:
+            changed, pending = await self.bot.update_config(overrides)
+        except ConfigError as e:
+            await interaction.followup.send(f"❌ Not applied: {e}", ephemeral=True)
+            return
+        except IPC_ERRORS as e:
+            await interaction.followup.send(ipc_failure(e), ephemeral=True)
+            return
+        await interaction.followup.send(
+            self._outcome(f"✅ `{setting}` overridden.", changed, pending), ephemeral=True
+        )
+
+    @config_group.command(name="unset", description="Remove a setting's override")
+    @app_commands.describe(setting="Setting to reset to its file or environment value")
+    async def unset_setting(self, interaction: discord.Interaction, setting: str):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        _, overrides = await asyncio.to_thread(self._layers)
+        if overrides.pop(setting, None) is None:
+            await interaction.followup.send(f"`{setting}` has no override.", ephemeral=True)
+            return
+        try:
+            changed, pending = await self.bot.update_config(overrides)
+        except ConfigError as e:
+            await interaction.followup.send(f"❌ Not applied: {e}", ephemeral=True)
+            return
+        except IPC_ERRORS as e:
+            await interaction.followup.send(ipc_failure(e), ephemeral=True)
+            return
+        await interaction.followup.send(
+            self._outcome(f"✅ `{setting}` override removed.", changed, pending), ephemeral=True
+        )
+
+    @config_group.command(name="reload", description="Re-read the config file and overrides now")
+    async def reload(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        try:
+            changed, pending = await self.bot.update_config()
+        except ConfigError as e:
+            await interaction.followup.send(
+                f"❌ Config is invalid; keeping the running settings: {e}", ephemeral=True
+            )
+            return
+        except IPC_ERRORS as e:
+            await interaction.followup.send(ipc_failure(e), ephemeral=True)
+            return
+        message = "✅ Config reloaded." if changed or pending else "✅ Config unchanged."
+        await interaction.followup.send(self._outcome(message, changed, pending), ephemeral=True)
+
+    show.autocomplete("setting")(setting_autocomplete)
+    set_setting.autocomplete("setting")(setting_autocomplete)
+    unset_setting.autocomplete("setting")(setting_autocomplete)
+
+
+async def setup(bot: commands.Bot, n8n: N8NClient):
+    await bot.add_cog(SettingsCommands(bot, n8n))
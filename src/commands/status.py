@@ -1,8 +1,173 @@
+import asyncio
+import logging
+import time
+from dataclasses import asdict
+from pathlib import Path
+
 import discord
 from discord import app_commands
 from discord.ext import commands
 
-from ..services import N8NClient
+from ..config import Config
+from ..services import HealthMonitor, N8NClient, NameIndex
+from ..services.health import ServiceHealth
+from ..services.health_history import HealthHistory, HealthSummary, Outage, parse_window
+from .routing import Option, RouteContext, WebhookRoute, route_command
+
+logger = logging.getLogger("marcellobot.status")
+
+# /status answers before deferring, so a snapshot fetch from cluster 0 gets little time
+SNAPSHOT_FETCH_TIMEOUT = 1.0
+
+
+async def status_shortcut(ctx: RouteContext) -> discord.Embed | None:
+    """Answer straight from the background poller's snapshot when it is fresh."""
+    monitor = ctx.cog.monitor
+    service = ctx.args["service"]
+    if ctx.args["live"]:
+        return None
+    if not monitor.is_fresh():
+        await ctx.cog.fetch_snapshot()
+    if (
+        monitor.is_fresh()
+        and (service is None or service in monitor.services)
+    ):
+        return ctx.cog.snapshot_embed(service)
+    return None
+
+
+def render_status(ctx: RouteContext, result: dict) -> discord.Embed | str:
+    if isinstance(result, dict) and "services" in result:
+        embed = discord.Embed(
+            title="Homelab Status",
+            color=discord.Color.green(),
+        )
+        for svc, status in result["services"].items():
+            emoji = "✅" if status.get("healthy", False) else "❌"
+            embed.add_field(
+                name=f"{emoji} {svc}",
+                value=status.get("message", "Unknown"),
+                inline=True,
+            )
+        return embed
+    return result.get("message") or result.get("response") or str(result)
+
+
+def format_ms(value: float | None) -> str:
+    return "–" if value is None else f"{value:.0f}ms"
+
+
+def stats_embed(stats: dict, clusters: dict[int, dict | Exception] | None = None) -> discord.Embed:
+    """Render one cluster's `ipc_stats` as an embed, with a line per cluster if several."""
+    embed = discord.Embed(
+        title=f"Bot Stats - cluster {stats['cluster_id']}", color=discord.Color.blurple()
+    )
+    embed.add_field(
+        name="Gateway",
+        value=(
+            f"{stats['guilds']} guild(s), latency {format_ms(stats['latency_ms'])}\n"
+            f"{stats['watches']} watch(es) on {stats['watched_products']} product(s)"
+        ),
+        inline=False,
+    )
+
+    admission = stats["admission"]
+    embed.add_field(
+        name="Admission",
+        value=(
+            f"{admission['in_flight']} in flight, {admission['queue_depth']} queued\n"
+            f"{admission['admitted']} admitted, {admission['queued']} waited, "
+            f"{admission['rejected']} rejected\n"
+            f"Wait p50 {format_ms(admission['wait_ms_p50'])} | "
+            f"p95 {format_ms(admission['wait_ms_p95'])} | "
+            f"max {format_ms(admission['wait_ms_max'])}"
+        ),
+        inline=False,
+    )
+
+    lanes = []
+    for name, lane in stats["n8n_lanes"].items():
+        limit = f" (limit {lane['limit']})" if lane.get("limit") else ""
+        lanes.append(
+            f"**{name}**: {lane['in_flight']} in flight{limit}, {lane['requests']} requests, "
+            f"{lane['throttled']} throttled, p95 {format_ms(lane['p95_ms'])}"
+        )
+    embed.add_field(name="n8n Lanes", value="\n".join(lanes) or "None", inline=False)
+
+    busiest = sorted(stats["hosts"].items(), key=lambda item: -item[1]["requests"])[:8]
+    hosts = [
+        f"**{host}**: {host_stats['requests']} req, {host_stats['errors']} err, "
+        f"p95 {format_ms(host_stats['p95_ms'])}"
+        + (f", backoff {host_stats['backoff_seconds']}s" if host_stats["backoff_seconds"] else "")
+        for host, host_stats in busiest
+    ]
+    embed.add_field(name="Hosts", value="\n".join(hosts) or "None", inline=False)
+
+    routes = sorted(stats["routes"].items(), key=lambda item: -item[1]["calls"])[:8]
+    if routes:
+        embed.add_field(
+            name="Routes",
+            value="\n".join(
+                f"`/{name}`: {route['calls']} calls, {route['errors']} errors, "
+                f"{route['cache_hits']} cached"
+                for name, route in routes
+            ),
+            inline=False,
+        )
+
+    ollama = stats.get("ollama")
+    if ollama:
+        throughput = ollama["tokens_per_second"]
+        embed.add_field(
+            name=f"Ollama ({ollama['model']})",
+            value=(
+                f"{ollama['in_flight']} in flight, {ollama['queued']} queued, "
+                f"{ollama['requests']} requests, {ollama['rejected']} rejected, "
+                f"{ollama['errors']} errors\n"
+                f"p50 {format_ms(ollama['p50_ms'])} | p95 {format_ms(ollama['p95_ms'])} | "
+                f"queue p95 {format_ms(ollama['queue_p95_ms'])}\n"
+                f"{ollama['cold_loads']} cold load(s), "
+                f"{'warm' if ollama['warm'] else 'not held warm'}"
+                + (f", {throughput:.0f} tok/s" if throughput else "")
+            ),
+            inline=False,
+        )
+
+    if clusters:
+        lines = []
+        for cluster_id, result in sorted(clusters.items()):
+            if isinstance(result, Exception):
+                lines.append(f"Cluster {cluster_id}: unreachable ({result})")
+            else:
+                lines.append(
+                    f"Cluster {cluster_id}: {result['guilds']} guild(s), "
+                    f"latency {format_ms(result['latency_ms'])}, "
+                    f"{result['admission']['queue_depth']} queued"
+                )
+        embed.add_field(name="Clusters", value="\n".join(lines), inline=False)
+    return embed
+
+
+CHECK_STATUS = WebhookRoute(
+    name="status",
+    description="Check homelab service status",
+    webhook="server-status",
+    options=[
+        Option("service", str | None, "Specific service to check (optional)", default=None),
+        Option(
+            "live",
+            bool,
+            "Probe services now instead of using the latest background check",
+            default=False,
+        ),
+    ],
+    shortcut=status_shortcut,
+    payload=lambda ctx: {"service": ctx.args["service"]},
+    # Probe through the monitor so live checks also refresh the snapshot
+    call=lambda ctx, payload: ctx.cog.monitor.poll(payload["service"]),
+    render=render_status,
+    failure="Failed to get status",
+)
 
 
 class StatusCommands(commands.Cog):
@@ -12,47 +177,276 @@ class StatusCommands(commands.Cog):
         self.bot = bot
         self.n8n = n8n
 
-    @app_commands.command(name="status", description="Check homelab service status")
-    @app_commands.describe(service="Specific service to check (optional)")
-    async def check_status(
-        self, interaction: discord.Interaction, service: str | None = None
-    ):
-        """Check homelab service status."""
-        await interaction.response.defer(thinking=True)
+        config = bot.config
+        # Only the first cluster polls and keeps history; the others fetch its
+        # snapshot and summaries over IPC and hear about state changes from it
+        self.poll_enabled = config.status_poll_interval > 0 and bot.owns_data
+        self.history = HealthHistory(Path(config.data_dir) / "health", read_only=not bot.owns_data)
+        self.monitor = HealthMonitor(
+            n8n,
+            interval=config.status_poll_interval or 60,
+            service_intervals=config.status_service_intervals,
+            on_change=self.alert_state_change if bot.owns_data else None,
+            history=self.history if bot.owns_data else None,
+        )
+        self.service_index = NameIndex()
+
+    async def cog_load(self):
+        await asyncio.to_thread(self.history.load)
+        self.bot.snapshots.register("health", 1, self.monitor.snapshot, self.monitor.restore)
+        if self.bot.ipc:
+            if self.bot.owns_data:
+                self.bot.ipc.register("health_snapshot", self.ipc_health_snapshot)
+                self.bot.ipc.register("health_summary", self.ipc_health_summary)
+            else:
+                self.bot.ipc.register("health_change", self.ipc_health_change)
+        if self.poll_enabled:
+            self.monitor.start()
+
+    async def cog_unload(self):
+        self.bot.snapshots.unregister("health")
+        if self.bot.ipc:
+            for op in ("health_snapshot", "health_summary", "health_change"):
+                self.bot.ipc.unregister(op)
+        await self.monitor.stop()
+
+    @commands.Cog.listener()
+    async def on_config_reload(self, old: Config, new: Config):
+        if (
+            new.status_poll_interval == old.status_poll_interval
+            and new.status_service_intervals == old.status_service_intervals
+        ):
+            return
+        # The poll loop plans per-service schedules when it starts
+        await self.monitor.stop()
+        self.monitor.interval = new.status_poll_interval or 60
+        self.monitor.service_intervals = new.status_service_intervals
+        self.poll_enabled = new.status_poll_interval > 0 and self.bot.owns_data
+        if self.poll_enabled:
+            self.monitor.start()
+
+    async def get_or_create_channel(
+        self, guild: discord.Guild, channel_name: str
+    ) -> discord.TextChannel:
+        """Get an existing channel or create it if it doesn't exist."""
+        channel_name = self.bot.config.channel(channel_name)
+        channel = discord.utils.get(guild.text_channels, name=channel_name)
+        if channel is None:
+            channel = await guild.create_text_channel(channel_name)
+        return channel
+
+    async def alert_state_change(self, service: ServiceHealth, was_healthy: bool):
+        """Alert this cluster's guilds, then have the other clusters alert theirs."""
+        await self.post_alert(service)
+        if not self.bot.ipc:
+            return
+        data = {
+            "last_poll": self.monitor.last_poll,
+            "service": self.monitor.snapshot_row(service),
+        }
+        results = await asyncio.gather(
+            *(
+                self.bot.ipc.request(cluster_id, "health_change", data)
+                for cluster_id in range(1, self.bot.config.cluster_count)
+            ),
+            return_exceptions=True,
+        )
+        for cluster_id, result in enumerate(results, 1):
+            if isinstance(result, Exception):
+                logger.warning(f"Cluster {cluster_id} missed the {service.name} alert: {result}")
 
+    async def ipc_health_change(self, data: dict):
+        self.monitor.restore({"last_poll": data["last_poll"], "services": [data["service"]]})
+        await self.post_alert(self.monitor.services[data["service"][0]])
+
+    async def ipc_health_snapshot(self, data: dict) -> dict:
+        return self.monitor.snapshot()
+
+    async def fetch_snapshot(self):
+        """Refresh the snapshot from the first cluster, which does the polling."""
+        if not self.bot.ipc or self.bot.owns_data:
+            return
         try:
-            payload = {}
-            if service:
-                payload["service"] = service
+            snapshot = await self.bot.ipc.request(
+                0, "health_snapshot", timeout=SNAPSHOT_FETCH_TIMEOUT
+            )
+        except Exception as e:
+            logger.warning(f"Failed to fetch the status snapshot from cluster 0: {e}")
+            return
+        if snapshot["last_poll"] is not None:
+            self.monitor.restore(snapshot)
 
-            result = await self.n8n.trigger_webhook("server-status", payload)
+    async def ipc_health_summary(self, data: dict) -> dict | None:
+        summary = await asyncio.to_thread(
+            self.history.summarize, data["service"], data["window"]
+        )
+        return asdict(summary) if summary else None
 
-            if result.get("error"):
-                await interaction.followup.send(
-                    f"Failed to get status: {result.get('message', 'Unknown error')}"
+    async def summarize_health(self, service: str, window_seconds: int) -> HealthSummary | None:
+        """Summarize from the first cluster's history, which has every background probe."""
+        if self.bot.ipc and not self.bot.owns_data:
+            try:
+                reply = await self.bot.ipc.request(
+                    0, "health_summary", {"service": service, "window": window_seconds}
                 )
-                return
+                if reply is None:
+                    return None
+                outages = [Outage(**outage) for outage in reply.pop("outages")]
+                return HealthSummary(**reply, outages=outages)
+            except Exception as e:
+                logger.warning(f"Falling back to local health history for {service}: {e}")
+        return await asyncio.to_thread(self.history.summarize, service, window_seconds)
+
+    async def post_alert(self, service: ServiceHealth):
+        """Post to every guild's alerts channel when a service goes down or recovers."""
+        if service.healthy:
+            message = f"✅ **{service.name}** recovered: {service.message}"
+        else:
+            message = f"❌ **{service.name}** is down: {service.message}"
 
-            # Format status response
-            if isinstance(result, dict) and "services" in result:
-                embed = discord.Embed(
-                    title="Homelab Status",
-                    color=discord.Color.green(),
+        for guild in self.bot.guilds:
+            try:
+                channel = await self.get_or_create_channel(
+                    guild, self.bot.config.status_alerts_channel
                 )
-                for svc, status in result["services"].items():
-                    emoji = "✅" if status.get("healthy", False) else "❌"
-                    embed.add_field(
-                        name=f"{emoji} {svc}",
-                        value=status.get("message", "Unknown"),
-                        inline=True,
-                    )
-                await interaction.followup.send(embed=embed)
-            else:
-                message = result.get("message") or result.get("response") or str(result)
-                await interaction.followup.send(message)
+                await channel.send(message)
+            except discord.HTTPException:
+                continue
 
-        except Exception as e:
-            await interaction.followup.send(f"Error: {e}")
+    async def service_autocomplete(
+        self, interaction: discord.Interaction, current: str
+    ) -> list[app_commands.Choice[str]]:
+        """Suggest service names seen in the status snapshot or history."""
+        self.service_index.update(self.monitor.services.keys() | self.history.series.keys())
+        return [
+            app_commands.Choice(name=name, value=name)
+            for name in self.service_index.search(current)
+        ]
+
+    def snapshot_embed(self, service: str | None = None) -> discord.Embed:
+        """Build the status embed from the background poller's snapshot."""
+        services = self.monitor.services
+        if service:
+            services = {service: services[service]}
+
+        all_healthy = all(health.healthy for health in services.values())
+        embed = discord.Embed(
+            title="Homelab Status",
+            color=discord.Color.green() if all_healthy else discord.Color.red(),
+        )
+        for name, health in services.items():
+            emoji = "✅" if health.healthy else "❌"
+            embed.add_field(
+                name=f"{emoji} {name}",
+                value=f"{health.message}\nsince <t:{int(health.changed_at)}:R>",
+                inline=True,
+            )
+        age = int(time.time() - self.monitor.last_poll)
+        embed.set_footer(text=f"Checked {age}s ago")
+        return embed
+
+    check_status = route_command(CHECK_STATUS)
+    check_status.autocomplete("service")(service_autocomplete)
+
+    @app_commands.command(
+        name="status-history", description="Show uptime and latency history for a service"
+    )
+    @app_commands.describe(
+        service="Service name",
+        window="Time window, e.g. 1h, 24h, 7d (default: 24h)",
+    )
+    async def status_history(
+        self, interaction: discord.Interaction, service: str, window: str = "24h"
+    ):
+        """Summarize uptime, latency percentiles and outages for a service."""
+        try:
+            window_seconds = parse_window(window)
+        except ValueError as e:
+            await interaction.response.send_message(str(e), ephemeral=True)
+            return
+
+        summary = await self.summarize_health(service, window_seconds)
+        if summary is None or summary.samples == 0:
+            await interaction.response.send_message(
+                f"No health history for **{service}** in the last {window}.",
+                ephemeral=True,
+            )
+            return
+
+        embed = discord.Embed(
+            title=f"{service} - last {window}",
+            color=discord.Color.green() if summary.uptime >= 99 else discord.Color.orange(),
+        )
+        embed.add_field(name="Uptime", value=f"{summary.uptime:.2f}%", inline=True)
+        embed.add_field(name="Samples", value=str(summary.samples), inline=True)
+        if summary.latency_p50 is not None:
+            embed.add_field(
+                name="Latency",
+                value=(
+                    f"p50 {summary.latency_p50:.0f}ms | "
+                    f"p95 {summary.latency_p95:.0f}ms | "
+                    f"p99 {summary.latency_p99:.0f}ms"
+                ),
+                inline=False,
+            )
+
+        if summary.outages:
+            lines = []
+            for outage in summary.outages[-10:]:
+                end = f"<t:{int(outage.end)}:t>" if outage.end else "ongoing"
+                lines.append(
+                    f"<t:{int(outage.start)}:f> → {end} ({outage.duration / 60:.0f} min)"
+                )
+            embed.add_field(
+                name=f"Outages ({len(summary.outages)})",
+                value="\n".join(lines),
+                inline=False,
+            )
+        else:
+            embed.add_field(name="Outages", value="None", inline=False)
+
+        await interaction.response.send_message(embed=embed)
+
+    status_history.autocomplete("service")(service_autocomplete)
+
+    @app_commands.command(
+        name="bot-stats", description="Show the bot's queues, lanes and latency metrics"
+    )
+    @app_commands.describe(cluster="Cluster to show (default: the one answering)")
+    @app_commands.default_permissions(administrator=True)
+    async def show_stats(self, interaction: discord.Interaction, cluster: int | None = None):
+        """Show admission, n8n lane, host and Ollama metrics for a cluster."""
+        # Metrics cover every server, so only the bot's owner may see them
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message(
+                "Only the bot owner can view bot stats.", ephemeral=True
+            )
+            return
+
+        # Cluster requests can take seconds, past the interaction deadline
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        ipc = self.bot.ipc
+        clusters = None
+        if ipc:
+            clusters = await ipc.broadcast("stats")
+            cluster = self.bot.config.cluster_id if cluster is None else cluster
+            stats = clusters.get(cluster)
+            if not isinstance(stats, dict):
+                await interaction.followup.send(
+                    f"Cluster {cluster} didn't answer: {stats or 'no such cluster'}",
+                    ephemeral=True,
+                )
+                return
+        else:
+            if cluster:
+                await interaction.followup.send(
+                    f"The bot isn't clustered; there is no cluster {cluster}.",
+                    ephemeral=True,
+                )
+                return
+            stats = await self.bot.ipc_stats({})
+        await interaction.followup.send(embed=stats_embed(stats, clusters), ephemeral=True)
 
 
 async def setup(bot: commands.Bot, n8n: N8NClient):
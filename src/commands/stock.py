@@ -1,634 +1,701 @@
+import asyncio
+import inspect
+import logging
+import time
+from dataclasses import asdict
+from pathlib import Path
+
 import discord
 from discord import app_commands
 from discord.ext import commands
 
-from ..services import N8NClient
+from ..config import Config
+from ..services import (
+    AdaptivePoller,
+    AdmissionRejected,
+    N8NClient,
+    NameIndex,
+    OllamaClient,
+    PriceHistory,
+    ProductCatalog,
+    WatchEntry,
+)
+from ..services.health_history import parse_window
+from ..services.price_history import PriceSummary, parse_price
+from ..services.products import ProductLink
+from ..services.stock_analysis import analyze_stock_page
+from ..services.watches import epoch_seconds, normalize_url
+from .routing import Option, QueueNotice, RouteContext, WebhookRoute, route_command
+
+logger = logging.getLogger("marcellobot.stock")
 
-LOGS_CHANNEL = "logs"
 UBIQUITI_ALERTS_CHANNEL = "ubiquiti-stock-alerts"
 BESTBUY_ALERTS_CHANNEL = "bestbuy-stock-alerts"
 UNIVERSAL_ALERTS_CHANNEL = "stock-alerts"
 
-
-class StockCommands(commands.Cog):
-    """Commands for checking product stock status (Ubiquiti, Best Buy, Universal)."""
-
-    def __init__(self, bot: commands.Bot, n8n: N8NClient):
-        self.bot = bot
-        self.n8n = n8n
-
-    async def get_or_create_channel(
-        self, guild: discord.Guild, channel_name: str
-    ) -> discord.TextChannel:
-        """Get an existing channel or create it if it doesn't exist."""
-        channel = discord.utils.get(guild.text_channels, name=channel_name)
-        if channel is None:
-            channel = await guild.create_text_channel(channel_name)
-        return channel
-
-    async def log_to_channel(self, guild: discord.Guild, message: str):
-        """Send a log message to the logs channel."""
-        channel = await self.get_or_create_channel(guild, LOGS_CHANNEL)
-        await channel.send(message)
-
-    async def send_stock_alert(
-        self, guild: discord.Guild, message: str, channel_name: str
-    ):
-        """Send a stock alert to the specified alerts channel."""
-        channel = await self.get_or_create_channel(guild, channel_name)
-        await channel.send(message)
-
-    async def get_channel_ids(
-        self, guild: discord.Guild, alerts_channel_name: str
-    ) -> tuple[str, str]:
-        """Get or create the logs and alerts channels, return their IDs."""
-        logs_channel = await self.get_or_create_channel(guild, LOGS_CHANNEL)
-        alerts_channel = await self.get_or_create_channel(guild, alerts_channel_name)
-        return str(logs_channel.id), str(alerts_channel.id)
-
-    async def get_logs_channel_id(self, guild: discord.Guild) -> str:
-        """Get or create the logs channel, return its ID."""
-        logs_channel = await self.get_or_create_channel(guild, LOGS_CHANNEL)
-        return str(logs_channel.id)
-
-    @app_commands.command(
-        name="ubiquiti-stock", description="Check Ubiquiti product stock"
-    )
-    @app_commands.describe(
-        url="URL of the Ubiquiti product page to check",
-    )
-    async def check_ubiquiti_stock(
-        self,
-        interaction: discord.Interaction,
-        url: str,
-    ):
-        """Check a Ubiquiti product for stock availability."""
-        await interaction.response.defer(thinking=True)
-
-        try:
-            await self.log_to_channel(
-                interaction.guild,
-                f"`[Stock Check]` Checking <{url}> requested by {interaction.user.mention}",
-            )
-
-            payload = {
-                "url": url,
-                "guild_id": str(interaction.guild_id),
-            }
-
-            result = await self.n8n.trigger_webhook("ubiquiti-stock-check", payload)
-
-            if result.get("error"):
-                error_msg = f"Failed to check stock: {result.get('message', 'Unknown error')}"
-                await self.log_to_channel(
-                    interaction.guild, f"`[Stock Check]` Error: {error_msg}"
-                )
-                await interaction.followup.send(error_msg)
-                return
-
-            message = result.get("message", "Stock check complete")
-
-            await self.log_to_channel(
-                interaction.guild,
-                f"`[Stock Check]` {result.get('productName', 'Unknown')}: "
-                f"{'In Stock' if result.get('inStock') else 'Out of Stock'}",
-            )
-
-            if result.get("inStock"):
-                alert_msg = (
-                    f"**{result.get('productName', 'Product')}** is in stock!\n"
-                    f"**Price:** {result.get('price', 'Unknown')}\n"
-                    f"**Link:** <{url}>"
-                )
-                await self.send_stock_alert(
-                    interaction.guild, alert_msg, UBIQUITI_ALERTS_CHANNEL
-                )
-
-            await interaction.followup.send(message)
-
-        except Exception as e:
-            error_msg = f"Error checking stock: {e}"
-            await self.log_to_channel(
-                interaction.guild, f"`[Stock Check]` Error: {error_msg}"
+# Checks can involve page scraping and LLM analysis on the n8n side
+CHECK_TIMEOUT = 300
+WATCH_TIMEOUT = 60
+# Watch lists change only through the watch/unwatch commands, which clear this cache
+WATCHLIST_CACHE_TTL = 30
+
+CONFIDENCE_EMOJI = {"high": "✓", "medium": "~", "low": "?"}
+
+# /stock-find: overall deadline for every retailer to answer, and the
+# admission queue the lookup counts against as one request
+FIND_DEADLINE = 120
+FIND_ADMISSION = "stock-find"
+
+
+def check_route(
+    name: str, description: str, retailer: str, webhook: str, alerts_channel: str
+) -> WebhookRoute:
+    """Stock check for a retailer-specific workflow; in-stock results are also posted as alerts."""
+
+    async def render(ctx: RouteContext, result: dict) -> str:
+        url = ctx.args["url"]
+        await ctx.cog.record_price(
+            url, result.get("price"), bool(result.get("inStock")), name=result.get("productName")
+        )
+        await ctx.log(
+            f"{result.get('productName', 'Unknown')}: "
+            f"{'In Stock' if result.get('inStock') else 'Out of Stock'}"
+        )
+        if result.get("inStock"):
+            channel = await ctx.channel(alerts_channel)
+            await channel.send(
+                f"**{result.get('productName', 'Product')}** is in stock!\n"
+                f"**Price:** {result.get('price', 'Unknown')}\n"
+                f"**Link:** <{url}>"
             )
-            await interaction.followup.send(error_msg)
-
-    @app_commands.command(
-        name="ubiquiti-watch", description="Add a Ubiquiti product to the watch list"
+        return result.get("message", "Stock check complete")
+
+    return WebhookRoute(
+        name=name,
+        description=description,
+        webhook=webhook,
+        options=[Option("url", str, f"URL of the {retailer} product page to check")],
+        log_tag="Stock Check",
+        request_log=lambda ctx: f"Checking <{ctx.args['url']}> requested by {ctx.user.mention}",
+        payload=lambda ctx: {"url": ctx.args["url"], "guild_id": str(ctx.interaction.guild_id)},
+        render=render,
+        fetches=lambda ctx: ctx.args["url"],
+        failure="Failed to check stock",
+        exception="Error checking stock",
+        timeout=CHECK_TIMEOUT,
     )
-    @app_commands.describe(
-        url="URL of the Ubiquiti product page to monitor",
-        interval="Check interval in minutes (default: 5)",
-    )
-    async def add_to_watch_list(
-        self,
-        interaction: discord.Interaction,
-        url: str,
-        interval: int = 5,
-    ):
-        """Add a product to the stock watch list."""
-        await interaction.response.defer(thinking=True)
 
-        try:
-            # Get channel IDs for n8n to use
-            logs_channel_id, alerts_channel_id = await self.get_channel_ids(
-                interaction.guild, UBIQUITI_ALERTS_CHANNEL
-            )
-
-            await self.log_to_channel(
-                interaction.guild,
-                f"`[Watch List]` Adding <{url}> (every {interval}m) by {interaction.user.mention}",
-            )
-
-            payload = {
-                "action": "add",
-                "url": url,
-                "interval_minutes": interval,
-                "guild_id": str(interaction.guild_id),
-                "added_by": str(interaction.user),
-                "logs_channel_id": logs_channel_id,
-                "alerts_channel_id": alerts_channel_id,
-            }
-
-            result = await self.n8n.trigger_webhook("ubiquiti-stock-watch", payload)
-
-            if result.get("error"):
-                error_msg = f"Failed to add to watch list: {result.get('message', 'Unknown error')}"
-                await self.log_to_channel(
-                    interaction.guild, f"`[Watch List]` Error: {error_msg}"
-                )
-                await interaction.followup.send(error_msg)
-                return
 
-            message = result.get("message", f"Added to watch list: {url}")
-            await interaction.followup.send(
-                f"Added to watch list. Checking every {interval} minutes."
+def watch_routes(
+    prefix: str,
+    webhook: str,
+    alerts_channel: str,
+    descriptions: dict[str, str],
+    log_tag: str = "Watch List",
+    list_name: str = "watch list",
+) -> tuple[WebhookRoute, WebhookRoute, WebhookRoute]:
+    """
+    The add / remove / list commands for a watch-list workflow.
+
+    `descriptions` holds the command descriptions (`watch`, `unwatch`,
+    `watchlist`) and URL option descriptions (`watch_url`, `unwatch_url`).
+    """
+
+    async def add_payload(ctx: RouteContext) -> dict:
+        # n8n posts to these channels from its scheduled checks
+        entry = WatchEntry(
+            url=normalize_url(ctx.args["url"]),
+            guild_id=ctx.interaction.guild_id,
+            interval_minutes=ctx.args["interval"],
+            added_by=str(ctx.user),
+            logs_channel_id=(await ctx.channel("logs")).id,
+            alerts_channel_id=(await ctx.channel(alerts_channel)).id,
+            added_at=time.time(),
+            price_drop_below=ctx.args["price_below"] or 0.0,
+            adaptive=ctx.args["adaptive"],
+        )
+        ctx.extras["entry"] = entry
+        return entry.to_payload()
+
+    def render_added(ctx: RouteContext, result: dict) -> str:
+        ctx.cog.bot.watches.add(webhook, ctx.extras["entry"])
+        if ctx.args["adaptive"]:
+            message = (
+                f"Added to {list_name}. Checking adaptively, every {ctx.args['interval']} "
+                "minutes until restock patterns are learned."
             )
-
-        except Exception as e:
-            error_msg = f"Error adding to watch list: {e}"
-            await self.log_to_channel(
-                interaction.guild, f"`[Watch List]` Error: {error_msg}"
+        else:
+            message = f"Added to {list_name}. Checking every {ctx.args['interval']} minutes."
+        if ctx.args["price_below"]:
+            message += f" Alerting when the price drops to {ctx.args['price_below']:,.2f} or less."
+        return message
+
+    def render_removed(ctx: RouteContext, result: dict) -> str:
+        ctx.cog.bot.watches.remove(webhook, ctx.interaction.guild_id, ctx.args["url"])
+        return f"Removed from {list_name}."
+
+    async def render_list(ctx: RouteContext, result: dict) -> str:
+        if isinstance(result.get("products"), list):
+            ctx.cog.bot.watches.replace_guild(
+                webhook, ctx.interaction.guild_id, result["products"]
             )
-            await interaction.followup.send(error_msg)
-
-    @app_commands.command(
-        name="ubiquiti-unwatch",
-        description="Remove a Ubiquiti product from the watch list",
+            # The monitors keep each product's latest check; fold it into the history
+            for product in result["products"]:
+                if product.get("url") and product.get("last_checked"):
+                    await ctx.cog.record_price(
+                        product["url"],
+                        product.get("last_price"),
+                        product.get("last_in_stock") in (True, "true"),
+                        epoch_seconds(product["last_checked"]),
+                        name=product.get("product_name"),
+                    )
+        return result.get("message", "No products in watch list")
+
+    watch = WebhookRoute(
+        name=f"{prefix}-watch",
+        description=descriptions["watch"],
+        webhook=webhook,
+        options=[
+            Option("url", str, descriptions["watch_url"]),
+            Option("interval", int, "Check interval in minutes (default: 5)", default=5),
+            Option(
+                "price_below",
+                float | None,
+                "Also alert when the price drops to or below this amount",
+                default=None,
+            ),
+            Option(
+                "adaptive",
+                bool,
+                "Check more often when restocks are likely and less often otherwise",
+                default=False,
+            ),
+        ],
+        log_tag=log_tag,
+        request_log=lambda ctx: (
+            f"Adding <{ctx.args['url']}> (every {ctx.args['interval']}m) by {ctx.user.mention}"
+        ),
+        payload=add_payload,
+        render=render_added,
+        failure="Failed to add to watch list",
+        exception="Error adding to watch list",
+        timeout=WATCH_TIMEOUT,
     )
-    @app_commands.describe(
-        url="URL of the Ubiquiti product to stop monitoring",
+    unwatch = WebhookRoute(
+        name=f"{prefix}-unwatch",
+        description=descriptions["unwatch"],
+        webhook=webhook,
+        options=[Option("url", str, descriptions["unwatch_url"])],
+        log_tag=log_tag,
+        request_log=lambda ctx: f"Removing <{ctx.args['url']}> by {ctx.user.mention}",
+        payload=lambda ctx: {
+            "action": "remove",
+            "url": normalize_url(ctx.args["url"]),
+            "guild_id": str(ctx.interaction.guild_id),
+        },
+        render=render_removed,
+        failure="Failed to remove from watch list",
+        exception="Error removing from watch list",
+        timeout=WATCH_TIMEOUT,
     )
-    async def remove_from_watch_list(
-        self,
-        interaction: discord.Interaction,
-        url: str,
-    ):
-        """Remove a product from the stock watch list."""
-        await interaction.response.defer(thinking=True)
-
-        try:
-            await self.log_to_channel(
-                interaction.guild,
-                f"`[Watch List]` Removing <{url}> by {interaction.user.mention}",
-            )
-
-            payload = {
-                "action": "remove",
-                "url": url,
-                "guild_id": str(interaction.guild_id),
-            }
-
-            result = await self.n8n.trigger_webhook("ubiquiti-stock-watch", payload)
-
-            if result.get("error"):
-                error_msg = f"Failed to remove from watch list: {result.get('message', 'Unknown error')}"
-                await self.log_to_channel(
-                    interaction.guild, f"`[Watch List]` Error: {error_msg}"
-                )
-                await interaction.followup.send(error_msg)
-                return
-
-            message = result.get("message", f"Removed from watch list: {url}")
-            await interaction.followup.send(f"Removed from watch list.")
-
-        except Exception as e:
-            error_msg = f"Error removing from watch list: {e}"
-            await self.log_to_channel(
-                interaction.guild, f"`[Watch List]` Error: {error_msg}"
-            )
-            await interaction.followup.send(error_msg)
-
-    @app_commands.command(
-        name="ubiquiti-watchlist", description="List all monitored Ubiquiti products"
+    watchlist = WebhookRoute(
+        name=f"{prefix}-watchlist",
+        description=descriptions["watchlist"],
+        webhook=webhook,
+        payload=lambda ctx: {"action": "list", "guild_id": str(ctx.interaction.guild_id)},
+        render=render_list,
+        failure="Failed to get watch list",
+        exception="Error getting watch list",
+        timeout=WATCH_TIMEOUT,
+        cache_ttl=WATCHLIST_CACHE_TTL,
     )
-    async def list_watch_list(self, interaction: discord.Interaction):
-        """List all products in the stock watch list."""
-        await interaction.response.defer(thinking=True)
-
-        try:
-            payload = {
-                "action": "list",
-                "guild_id": str(interaction.guild_id),
-            }
-
-            result = await self.n8n.trigger_webhook("ubiquiti-stock-watch", payload)
+    return watch, unwatch, watchlist
 
-            if result.get("error"):
-                error_msg = f"Failed to get watch list: {result.get('message', 'Unknown error')}"
-                await interaction.followup.send(error_msg)
-                return
 
-            message = result.get("message", "No products in watch list")
-            await interaction.followup.send(message)
-
-        except Exception as e:
-            await interaction.followup.send(f"Error getting watch list: {e}")
-
-    @app_commands.command(
-        name="bestbuy-stock", description="Check Best Buy product stock"
+async def render_universal_check(ctx: RouteContext, result: dict) -> str:
+    await ctx.cog.record_price(
+        ctx.args["url"],
+        result.get("price"),
+        bool(result.get("inStock")),
+        name=result.get("productName"),
     )
-    @app_commands.describe(
-        url="URL of the Best Buy product page to check",
+    message = result.get("message", "Stock check complete")
+    confidence = result.get("confidence", "unknown")
+    confidence_emoji = CONFIDENCE_EMOJI.get(confidence.lower(), "")
+    return f"{message}\n_Confidence: {confidence} {confidence_emoji}_"
+
+
+async def universal_check_payload(ctx: RouteContext) -> dict:
+    # logs_channel_id is provided so the workflow's Discord logging works
+    return {"url": ctx.args["url"], "logs_channel_id": await ctx.channel_id("logs")}
+
+
+async def universal_check_call(ctx: RouteContext, payload: dict) -> dict:
+    result = await ctx.cog.check_universal(payload)
+    if ctx.cog.ollama and result.get("success"):
+        # The workflow logs its own verdicts; the bot's need logging here
+        stock = "✓ In Stock" if result["inStock"] else "✗ Out of Stock"
+        await ctx.log(f"**{result['productName']}**: {stock} ({result['confidence']} confidence)")
+    return result
+
+
+UBIQUITI_CHECK = check_route(
+    "ubiquiti-stock",
+    "Check Ubiquiti product stock",
+    "Ubiquiti",
+    "ubiquiti-stock-check",
+    UBIQUITI_ALERTS_CHANNEL,
+)
+UBIQUITI_WATCH, UBIQUITI_UNWATCH, UBIQUITI_WATCHLIST = watch_routes(
+    "ubiquiti",
+    "ubiquiti-stock-watch",
+    UBIQUITI_ALERTS_CHANNEL,
+    {
+        "watch": "Add a Ubiquiti product to the watch list",
+        "unwatch": "Remove a Ubiquiti product from the watch list",
+        "watchlist": "List all monitored Ubiquiti products",
+        "watch_url": "URL of the Ubiquiti product page to monitor",
+        "unwatch_url": "URL of the Ubiquiti product to stop monitoring",
+    },
+)
+
+BESTBUY_CHECK = check_route(
+    "bestbuy-stock",
+    "Check Best Buy product stock",
+    "Best Buy",
+    "bestbuy-stock-check",
+    BESTBUY_ALERTS_CHANNEL,
+)
+BESTBUY_WATCH, BESTBUY_UNWATCH, BESTBUY_WATCHLIST = watch_routes(
+    "bestbuy",
+    "bestbuy-stock-watch",
+    BESTBUY_ALERTS_CHANNEL,
+    {
+        "watch": "Add a Best Buy product to the watch list",
+        "unwatch": "Remove a Best Buy product from the watch list",
+        "watchlist": "List all monitored Best Buy products",
+        "watch_url": "URL of the Best Buy product page to monitor",
+        "unwatch_url": "URL of the Best Buy product to stop monitoring",
+    },
+)
+
+UNIVERSAL_CHECK = WebhookRoute(
+    name="stock-check",
+    description="Universal stock checker using AI (works with any website)",
+    webhook="universal-stock-check",
+    options=[Option("url", str, "URL of any product page to check")],
+    log_tag="AI Stock Check",
+    request_log=lambda ctx: f"Analyzing <{ctx.args['url']}> requested by {ctx.user.mention}",
+    payload=universal_check_payload,
+    call=universal_check_call,
+    render=render_universal_check,
+    fetches=lambda ctx: ctx.args["url"],
+    failure="Failed to check stock",
+    exception="Error checking stock",
+    timeout=CHECK_TIMEOUT,
+)
+UNIVERSAL_WATCH, UNIVERSAL_UNWATCH, UNIVERSAL_WATCHLIST = watch_routes(
+    "stock",
+    "universal-stock-watch",
+    UNIVERSAL_ALERTS_CHANNEL,
+    {
+        "watch": "Add any product to AI-powered watch list",
+        "unwatch": "Remove a product from AI-powered watch list",
+        "watchlist": "List all AI-monitored products",
+        "watch_url": "URL of any product page to monitor",
+        "unwatch_url": "URL of the product to stop monitoring",
+    },
+    log_tag="Universal Watch",
+    list_name="AI watch list",
+)
+
+
+# Retailer-specific checkers by host; any other site goes to the universal (LLM) checker
+RETAILER_CHECKS = {"store.ui.com": UBIQUITI_CHECK, "bestbuy.com": BESTBUY_CHECK}
+
+
+def _money(value: float | None) -> str:
+    return "Unknown" if value is None else f"{value:,.2f}"
+
+
+def price_history_embed(summary: PriceSummary, window: str) -> discord.Embed:
+    embed = discord.Embed(
+        title=f"Price history - {window}",
+        url=summary.url,
+        description=f"```{summary.spark}```" if summary.spark else None,
+        color=discord.Color.blue(),
     )
-    async def check_bestbuy_stock(
-        self,
-        interaction: discord.Interaction,
-        url: str,
-    ):
-        """Check a Best Buy product for stock availability."""
-        await interaction.response.defer(thinking=True)
-
-        try:
-            await self.log_to_channel(
-                interaction.guild,
-                f"`[Stock Check]` Checking <{url}> requested by {interaction.user.mention}",
-            )
-
-            payload = {
-                "url": url,
-                "guild_id": str(interaction.guild_id),
-            }
-
-            result = await self.n8n.trigger_webhook("bestbuy-stock-check", payload)
-
-            if result.get("error"):
-                error_msg = f"Failed to check stock: {result.get('message', 'Unknown error')}"
-                await self.log_to_channel(
-                    interaction.guild, f"`[Stock Check]` Error: {error_msg}"
-                )
-                await interaction.followup.send(error_msg)
-                return
-
-            message = result.get("message", "Stock check complete")
-
-            await self.log_to_channel(
-                interaction.guild,
-                f"`[Stock Check]` {result.get('productName', 'Unknown')}: "
-                f"{'In Stock' if result.get('inStock') else 'Out of Stock'}",
-            )
-
-            if result.get("inStock"):
-                alert_msg = (
-                    f"**{result.get('productName', 'Product')}** is in stock!\n"
-                    f"**Price:** {result.get('price', 'Unknown')}\n"
-                    f"**Link:** <{url}>"
-                )
-                await self.send_stock_alert(
-                    interaction.guild, alert_msg, BESTBUY_ALERTS_CHANNEL
-                )
-
-            await interaction.followup.send(message)
-
-        except Exception as e:
-            error_msg = f"Error checking stock: {e}"
-            await self.log_to_channel(
-                interaction.guild, f"`[Stock Check]` Error: {error_msg}"
-            )
-            await interaction.followup.send(error_msg)
-
-    @app_commands.command(
-        name="bestbuy-watch", description="Add a Best Buy product to the watch list"
+    embed.add_field(name="Latest", value=_money(summary.latest), inline=True)
+    embed.add_field(
+        name="Low / High", value=f"{_money(summary.low)} / {_money(summary.high)}", inline=True
     )
-    @app_commands.describe(
-        url="URL of the Best Buy product page to monitor",
-        interval="Check interval in minutes (default: 5)",
+    embed.add_field(
+        name="p25 / Median / p75",
+        value=f"{_money(summary.p25)} / {_money(summary.median)} / {_money(summary.p75)}",
+        inline=True,
     )
-    async def add_bestbuy_to_watch_list(
-        self,
-        interaction: discord.Interaction,
-        url: str,
-        interval: int = 5,
-    ):
-        """Add a Best Buy product to the stock watch list."""
-        await interaction.response.defer(thinking=True)
-
-        try:
-            # Get channel IDs for n8n to use
-            logs_channel_id, alerts_channel_id = await self.get_channel_ids(
-                interaction.guild, BESTBUY_ALERTS_CHANNEL
-            )
-
-            await self.log_to_channel(
-                interaction.guild,
-                f"`[Watch List]` Adding <{url}> (every {interval}m) by {interaction.user.mention}",
-            )
-
-            payload = {
-                "action": "add",
-                "url": url,
-                "interval_minutes": interval,
-                "guild_id": str(interaction.guild_id),
-                "added_by": str(interaction.user),
-                "logs_channel_id": logs_channel_id,
-                "alerts_channel_id": alerts_channel_id,
-            }
-
-            result = await self.n8n.trigger_webhook("bestbuy-stock-watch", payload)
-
-            if result.get("error"):
-                error_msg = f"Failed to add to watch list: {result.get('message', 'Unknown error')}"
-                await self.log_to_channel(
-                    interaction.guild, f"`[Watch List]` Error: {error_msg}"
-                )
-                await interaction.followup.send(error_msg)
-                return
-
-            message = result.get("message", f"Added to watch list: {url}")
-            await interaction.followup.send(
-                f"Added to watch list. Checking every {interval} minutes."
-            )
-
-        except Exception as e:
-            error_msg = f"Error adding to watch list: {e}"
-            await self.log_to_channel(
-                interaction.guild, f"`[Watch List]` Error: {error_msg}"
-            )
-            await interaction.followup.send(error_msg)
-
-    @app_commands.command(
-        name="bestbuy-unwatch",
-        description="Remove a Best Buy product from the watch list",
+    embed.add_field(name="In Stock", value=f"{summary.in_stock:.0f}% of checks", inline=True)
+    embed.add_field(
+        name="Last In Stock",
+        value=f"<t:{int(summary.last_in_stock)}:R>" if summary.last_in_stock else "Never",
+        inline=True,
     )
-    @app_commands.describe(
-        url="URL of the Best Buy product to stop monitoring",
+    embed.add_field(
+        name="Checks",
+        value=f"{summary.observations} ({summary.priced} priced)",
+        inline=True,
     )
-    async def remove_bestbuy_from_watch_list(
-        self,
-        interaction: discord.Interaction,
-        url: str,
-    ):
-        """Remove a Best Buy product from the stock watch list."""
-        await interaction.response.defer(thinking=True)
-
-        try:
-            await self.log_to_channel(
-                interaction.guild,
-                f"`[Watch List]` Removing <{url}> by {interaction.user.mention}",
-            )
-
-            payload = {
-                "action": "remove",
-                "url": url,
-                "guild_id": str(interaction.guild_id),
-            }
-
-            result = await self.n8n.trigger_webhook("bestbuy-stock-watch", payload)
-
-            if result.get("error"):
-                error_msg = f"Failed to remove from watch list: {result.get('message', 'Unknown error')}"
-                await self.log_to_channel(
-                    interaction.guild, f"`[Watch List]` Error: {error_msg}"
-                )
-                await interaction.followup.send(error_msg)
-                return
-
-            message = result.get("message", f"Removed from watch list: {url}")
-            await interaction.followup.send(f"Removed from watch list.")
-
-        except Exception as e:
-            error_msg = f"Error removing from watch list: {e}"
-            await self.log_to_channel(
-                interaction.guild, f"`[Watch List]` Error: {error_msg}"
-            )
-            await interaction.followup.send(error_msg)
-
-    @app_commands.command(
-        name="bestbuy-watchlist", description="List all monitored Best Buy products"
+    return embed
+
+
+def find_embed(
+    query: str,
+    links: list[ProductLink],
+    results: dict[str, dict | None],
+    elapsed: float | None = None,
+) -> discord.Embed:
+    """One row per retailer page: checking, in/out of stock with price, or the error."""
+    answered = [result for result in results.values() if result is not None]
+    in_stock = any(result.get("inStock") and not result.get("error") for result in answered)
+    embed = discord.Embed(
+        title=f"Stock for {query}",
+        color=discord.Color.green() if in_stock else discord.Color.blue(),
     )
-    async def list_bestbuy_watch_list(self, interaction: discord.Interaction):
-        """List all Best Buy products in the stock watch list."""
-        await interaction.response.defer(thinking=True)
-
-        try:
-            payload = {
-                "action": "list",
-                "guild_id": str(interaction.guild_id),
-            }
-
-            result = await self.n8n.trigger_webhook("bestbuy-stock-watch", payload)
-
-            if result.get("error"):
-                error_msg = f"Failed to get watch list: {result.get('message', 'Unknown error')}"
-                await interaction.followup.send(error_msg)
-                return
+    for link in links:
+        result = results[link.url]
+        name = link.name or link.sku
+        if result is None:
+            status = "⏳ Checking..."
+        elif result.get("error"):
+            status = f"⚠️ {result.get('message', 'Check failed')}"[:200]
+        else:
+            name = result.get("productName") or name
+            stock = "🟢 In stock" if result.get("inStock") else "🔴 Out of stock"
+            status = f"{stock} - {result.get('price', 'Unknown')}"
+        embed.add_field(
+            name=link.retailer, value=f"{status}\n[{name[:80]}]({link.url})", inline=False
+        )
+    if elapsed is None:
+        embed.set_footer(text=f"{len(answered)}/{len(links)} retailers answered")
+    else:
+        embed.set_footer(text=f"Checked {len(links)} retailer(s) in {elapsed:.1f}s")
+    return embed
 
-            message = result.get("message", "No products in watch list")
-            await interaction.followup.send(message)
 
-        except Exception as e:
-            await interaction.followup.send(f"Error getting watch list: {e}")
+class StockCommands(commands.Cog):
+    """Commands for checking product stock status (Ubiquiti, Best Buy, Universal)."""
 
-    @app_commands.command(
-        name="stock-check",
-        description="Universal stock checker using AI (works with any website)",
-    )
-    @app_commands.describe(
-        url="URL of any product page to check",
-    )
-    async def check_universal_stock(
+    def __init__(self, bot: commands.Bot, n8n: N8NClient):
+        self.bot = bot
+        self.n8n = n8n
+        config = bot.config
+        # The first cluster writes price history and the catalog; the others
+        # hand it their checks over IPC and ask it for /price-history
+        self.prices = PriceHistory(Path(config.data_dir) / "prices", read_only=not bot.owns_data)
+        self.url_index = NameIndex()
+        self.products = ProductCatalog(
+            Path(config.data_dir) / "products.json", read_only=not bot.owns_data
+        )
+        self.product_index = NameIndex()
+        # Watch lists are global in n8n, so only the first cluster syncs them
+        self.poll_enabled = config.watch_sync_interval > 0 and config.cluster_id == 0
+        self.poller = AdaptivePoller(
+            n8n,
+            self.prices,
+            [UBIQUITI_WATCH.webhook, BESTBUY_WATCH.webhook, UNIVERSAL_WATCH.webhook],
+            budget_per_hour=config.watch_fetch_budget,
+            min_minutes=config.watch_min_interval,
+            max_minutes=config.watch_max_interval,
+            sync_interval=config.watch_sync_interval or 300,
+            hosts=bot.hosts,
+            on_sync=self.keep_model_warm,
+        )
+        self.ollama: OllamaClient | None = getattr(bot, "ollama", None)
+
+    async def cog_load(self):
+        await asyncio.to_thread(self.prices.load)
+        await asyncio.to_thread(self._load_products)
+        self.bot.snapshots.register("poller", 1, self.poller.snapshot, self.poller.restore)
+        if self.bot.ipc and self.bot.owns_data:
+            self.bot.ipc.register("record_price", self.ipc_record_price)
+            self.bot.ipc.register("price_summary", self.ipc_price_summary)
+        if self.poll_enabled:
+            self.poller.start()
+
+    async def cog_unload(self):
+        self.bot.snapshots.unregister("poller")
+        if self.bot.ipc:
+            self.bot.ipc.unregister("record_price")
+            self.bot.ipc.unregister("price_summary")
+        await self.poller.stop()
+
+    @commands.Cog.listener()
+    async def on_config_reload(self, old: Config, new: Config):
+        self.poller.budget_per_hour = new.watch_fetch_budget
+        self.poller.min_minutes = new.watch_min_interval
+        self.poller.max_minutes = new.watch_max_interval
+        self.poller.sync_interval = new.watch_sync_interval or 300
+        self.poll_enabled = new.watch_sync_interval > 0 and new.cluster_id == 0
+        if self.poll_enabled:
+            self.poller.start()
+        else:
+            await self.poller.stop()
+
+    def keep_model_warm(self):
+        """Hold the model loaded until the next sync while AI-watched products are monitored."""
+        if self.ollama and self.poller.watches.get(UNIVERSAL_WATCH.webhook):
+            self.ollama.keep_warm(2 * self.poller.sync_interval)
+
+    async def check_universal(self, payload: dict) -> dict:
+        """
+        Run the universal checker. With a bot-side model, n8n only fetches
+        the page and the bot's queue judges it, batched with other checks.
+        """
+        if self.ollama is None:
+            return await self.n8n.trigger_webhook(UNIVERSAL_CHECK.webhook, payload)
+        page = await self.n8n.trigger_webhook(
+            UNIVERSAL_CHECK.webhook, {**payload, "page_only": True}
+        )
+        return await analyze_stock_page(self.ollama, page)
+
+    def _load_products(self):
+        self.products.load()
+        # Pages with price history are known products even before a check names them
+        for url in self.prices.urls:
+            self.products.learn(url)
+        self.products.save()
+
+    async def record_price(
         self,
-        interaction: discord.Interaction,
         url: str,
+        price,
+        in_stock: bool,
+        timestamp: float | None = None,
+        name: str | None = None,
     ):
-        """Check any product stock using AI analysis."""
-        await interaction.response.defer(thinking=True)
-
+        """Add a stock check result to the product's price history and the product catalog."""
+        url = normalize_url(url)
+        price = parse_price(price)
+        timestamp = time.time() if timestamp is None else timestamp
         try:
-            # Get logs channel ID for n8n to use
-            logs_channel_id = await self.get_logs_channel_id(interaction.guild)
-
-            await self.log_to_channel(
-                interaction.guild,
-                f"`[AI Stock Check]` Analyzing <{url}> requested by {interaction.user.mention}",
-            )
-
-            payload = {
-                "url": url,
-                "logs_channel_id": logs_channel_id,
-            }
-
-            # Note: logs_channel_id is provided so Discord logging will work
-
-            result = await self.n8n.trigger_webhook("universal-stock-check", payload)
-
-            if result.get("error"):
-                error_msg = f"Failed to check stock: {result.get('message', 'Unknown error')}"
-                await self.log_to_channel(
-                    interaction.guild, f"`[AI Stock Check]` Error: {error_msg}"
+            await asyncio.to_thread(self._record, url, price, in_stock, timestamp, name)
+        except OSError as e:
+            logger.warning(f"Failed to record price for {url}: {e}")
+        if self.bot.ipc and not self.bot.owns_data:
+            try:
+                await self.bot.ipc.request(
+                    0,
+                    "record_price",
+                    {
+                        "url": url,
+                        "price": price,
+                        "in_stock": in_stock,
+                        "timestamp": timestamp,
+                        "name": name,
+                    },
                 )
-                await interaction.followup.send(error_msg)
-                return
-
-            message = result.get("message", "Stock check complete")
-            confidence = result.get("confidence", "unknown")
-
-            # Add confidence indicator to response
-            confidence_emoji = {
-                "high": "✓",
-                "medium": "~",
-                "low": "?",
-            }.get(confidence.lower(), "")
-
-            response_msg = f"{message}\n_Confidence: {confidence} {confidence_emoji}_"
-            await interaction.followup.send(response_msg)
-
-        except Exception as e:
-            error_msg = f"Error checking stock: {e}"
-            await self.log_to_channel(
-                interaction.guild, f"`[AI Stock Check]` Error: {error_msg}"
-            )
-            await interaction.followup.send(error_msg)
+            except Exception as e:
+                logger.warning(f"Failed to hand price for {url} to cluster 0: {e}")
+
+    async def ipc_record_price(self, data: dict):
+        await asyncio.to_thread(
+            self._record,
+            data["url"],
+            data["price"],
+            data["in_stock"],
+            data["timestamp"],
+            data.get("name"),
+        )
+
+    def _summarize(self, url: str, window_seconds: float | None) -> PriceSummary | None:
+        # History recorded before URLs were normalized is keyed by the URL as given
+        for key in dict.fromkeys((normalize_url(url), url)):
+            summary = self.prices.summarize(key, window_seconds)
+            if summary is not None:
+                return summary
+        return None
+
+    async def ipc_price_summary(self, data: dict) -> dict | None:
+        summary = await asyncio.to_thread(self._summarize, data["url"], data.get("window"))
+        return asdict(summary) if summary else None
+
+    async def summarize_prices(self, url: str, window_seconds: float | None) -> PriceSummary | None:
+        """Summarize from the first cluster's history, which has the monitors' checks."""
+        if self.bot.ipc and not self.bot.owns_data:
+            try:
+                reply = await self.bot.ipc.request(
+                    0, "price_summary", {"url": url, "window": window_seconds}
+                )
+                return PriceSummary(**reply) if reply else None
+            except Exception as e:
+                logger.warning(f"Falling back to local price history for {url}: {e}")
+        return await asyncio.to_thread(self._summarize, url, window_seconds)
 
-    @app_commands.command(
-        name="stock-watch", description="Add any product to AI-powered watch list"
-    )
-    @app_commands.describe(
-        url="URL of any product page to monitor",
-        interval="Check interval in minutes (default: 5)",
-    )
-    async def add_universal_to_watch_list(
+    def _record(
         self,
-        interaction: discord.Interaction,
         url: str,
-        interval: int = 5,
+        price: float | None,
+        in_stock: bool,
+        timestamp: float | None,
+        name: str | None,
     ):
-        """Add any product to the universal AI stock watch list."""
-        await interaction.response.defer(thinking=True)
-
-        try:
-            # Get channel IDs for n8n to use
-            logs_channel_id, alerts_channel_id = await self.get_channel_ids(
-                interaction.guild, UNIVERSAL_ALERTS_CHANNEL
-            )
-
-            await self.log_to_channel(
-                interaction.guild,
-                f"`[Universal Watch]` Adding <{url}> (every {interval}m) by {interaction.user.mention}",
-            )
-
-            payload = {
-                "action": "add",
-                "url": url,
-                "interval_minutes": interval,
-                "guild_id": str(interaction.guild_id),
-                "added_by": str(interaction.user),
-                "logs_channel_id": logs_channel_id,
-                "alerts_channel_id": alerts_channel_id,
-            }
-
-            result = await self.n8n.trigger_webhook("universal-stock-watch", payload)
-
-            if result.get("error"):
-                error_msg = f"Failed to add to watch list: {result.get('message', 'Unknown error')}"
-                await self.log_to_channel(
-                    interaction.guild, f"`[Universal Watch]` Error: {error_msg}"
-                )
-                await interaction.followup.send(error_msg)
-                return
-
-            await interaction.followup.send(
-                f"Added to AI watch list. Checking every {interval} minutes."
-            )
-
-        except Exception as e:
-            error_msg = f"Error adding to watch list: {e}"
-            await self.log_to_channel(
-                interaction.guild, f"`[Universal Watch]` Error: {error_msg}"
-            )
-            await interaction.followup.send(error_msg)
+        self.prices.record(url, price, in_stock, timestamp)
+        if self.products.learn(url, name):
+            self.products.save()
+
+    check_ubiquiti_stock = route_command(UBIQUITI_CHECK)
+    add_to_watch_list = route_command(UBIQUITI_WATCH)
+    remove_from_watch_list = route_command(UBIQUITI_UNWATCH)
+    list_watch_list = route_command(UBIQUITI_WATCHLIST)
+
+    check_bestbuy_stock = route_command(BESTBUY_CHECK)
+    add_bestbuy_to_watch_list = route_command(BESTBUY_WATCH)
+    remove_bestbuy_from_watch_list = route_command(BESTBUY_UNWATCH)
+    list_bestbuy_watch_list = route_command(BESTBUY_WATCHLIST)
+
+    check_universal_stock = route_command(UNIVERSAL_CHECK)
+    add_universal_to_watch_list = route_command(UNIVERSAL_WATCH)
+    remove_universal_from_watch_list = route_command(UNIVERSAL_UNWATCH)
+    list_universal_watch_list = route_command(UNIVERSAL_WATCHLIST)
+
+    async def url_autocomplete(
+        self, interaction: discord.Interaction, current: str
+    ) -> list[app_commands.Choice[str]]:
+        """Suggest product URLs that have price history."""
+        self.url_index.update(self.prices.urls)
+        return [
+            app_commands.Choice(name=url[:100], value=url)
+            for url in self.url_index.search(current)
+            if len(url) <= 100
+        ]
 
     @app_commands.command(
-        name="stock-unwatch",
-        description="Remove a product from AI-powered watch list",
+        name="price-history", description="Show price and availability history for a product"
     )
     @app_commands.describe(
-        url="URL of the product to stop monitoring",
+        url="URL of a checked or watched product",
+        window="Time window, e.g. 24h, 7d, 12w (default: all history)",
     )
-    async def remove_universal_from_watch_list(
-        self,
-        interaction: discord.Interaction,
-        url: str,
+    async def price_history(
+        self, interaction: discord.Interaction, url: str, window: str | None = None
     ):
-        """Remove a product from the universal AI stock watch list."""
-        await interaction.response.defer(thinking=True)
-
+        """Summarize recorded prices for a product: range, percentiles and a sparkline."""
         try:
-            await self.log_to_channel(
-                interaction.guild,
-                f"`[Universal Watch]` Removing <{url}> by {interaction.user.mention}",
+            window_seconds = parse_window(window) if window else None
+        except ValueError as e:
+            await interaction.response.send_message(str(e), ephemeral=True)
+            return
+
+        summary = await self.summarize_prices(url, window_seconds)
+        if summary is None:
+            scope = f" in the last {window}" if window else ""
+            await interaction.response.send_message(
+                f"No price history for <{url}>{scope}. "
+                "Prices are recorded by stock checks and watch lists.",
+                ephemeral=True,
             )
-
-            payload = {
-                "action": "remove",
-                "url": url,
-                "guild_id": str(interaction.guild_id),
-            }
-
-            result = await self.n8n.trigger_webhook("universal-stock-watch", payload)
-
-            if result.get("error"):
-                error_msg = f"Failed to remove from watch list: {result.get('message', 'Unknown error')}"
-                await self.log_to_channel(
-                    interaction.guild, f"`[Universal Watch]` Error: {error_msg}"
-                )
-                await interaction.followup.send(error_msg)
-                return
-
-            await interaction.followup.send(f"Removed from AI watch list.")
-
-        except Exception as e:
-            error_msg = f"Error removing from watch list: {e}"
-            await self.log_to_channel(
-                interaction.guild, f"`[Universal Watch]` Error: {error_msg}"
+            return
+
+        await interaction.response.send_message(
+            embed=price_history_embed(summary, window or "all time")
+        )
+
+    price_history.autocomplete("url")(url_autocomplete)
+
+    async def _find_check(self, interaction: discord.Interaction, link: ProductLink) -> dict:
+        """Check one retailer page through its checker, paced by its host."""
+        route = RETAILER_CHECKS.get(link.retailer, UNIVERSAL_CHECK)
+        ctx = RouteContext(route, self, interaction, {"url": link.url}, QueueNotice(interaction))
+        payload = route.payload(ctx)
+        if inspect.isawaitable(payload):
+            payload = await payload
+        async with self.bot.hosts.slot(link.url):
+            if route is UNIVERSAL_CHECK:
+                result = await self.check_universal(payload)
+            else:
+                result = await self.n8n.trigger_webhook(route.webhook, payload)
+        self.bot.hosts.record_result(link.url, result)
+        if not result.get("error"):
+            await self.record_price(
+                link.url,
+                result.get("price"),
+                bool(result.get("inStock")),
+                name=result.get("productName"),
             )
-            await interaction.followup.send(error_msg)
+        return result
 
     @app_commands.command(
-        name="stock-watchlist", description="List all AI-monitored products"
+        name="stock-find", description="Check a product's stock at every retailer it is known at"
     )
-    async def list_universal_watch_list(self, interaction: discord.Interaction):
-        """List all products in the universal AI stock watch list."""
-        await interaction.response.defer(thinking=True)
+    @app_commands.describe(product="Product name or SKU")
+    async def stock_find(self, interaction: discord.Interaction, product: str):
+        """Check every known retailer page for a product at once, updating as answers arrive."""
+        links = self.products.find(product)
+        if not links:
+            await interaction.response.send_message(
+                f"No known product pages match **{product}**. Pages are learned from stock "
+                "checks and watch lists, so check the product by URL once first.",
+                ephemeral=True,
+            )
+            return
 
+        await interaction.response.defer(thinking=True)
+        results: dict[str, dict | None] = {link.url: None for link in links}
+        started = time.monotonic()
         try:
-            payload = {
-                "action": "list",
-                "guild_id": str(interaction.guild_id),
-            }
-
-            result = await self.n8n.trigger_webhook("universal-stock-watch", payload)
-
-            if result.get("error"):
-                error_msg = f"Failed to get watch list: {result.get('message', 'Unknown error')}"
-                await interaction.followup.send(error_msg)
-                return
-
-            message = result.get("message", "No products in watch list")
-            await interaction.followup.send(message)
-
-        except Exception as e:
-            await interaction.followup.send(f"Error getting watch list: {e}")
+            async with self.bot.admission.slot(
+                FIND_ADMISSION, interaction.guild_id, interaction.user.id
+            ):
+                tasks = {
+                    asyncio.create_task(self._find_check(interaction, link)): link
+                    for link in links
+                }
+                message = await interaction.followup.send(
+                    embed=find_embed(product, links, results), wait=True
+                )
+                pending = set(tasks)
+                while pending:
+                    done, pending = await asyncio.wait(
+                        pending,
+                        timeout=max(started + FIND_DEADLINE - time.monotonic(), 0),
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    if not done:
+                        break
+                    for task in done:
+                        try:
+                            results[tasks[task].url] = task.result()
+                        except Exception as e:
+                            results[tasks[task].url] = {
+                                "error": True,
+                                "message": str(e) or type(e).__name__,
+                            }
+                    if pending:
+                        await message.edit(embed=find_embed(product, links, results))
+                for task in pending:
+                    task.cancel()
+                    results[tasks[task].url] = {
+                        "error": True,
+                        "message": f"No answer within {FIND_DEADLINE}s",
+                    }
+        except AdmissionRejected as e:
+            await interaction.followup.send(str(e))
+            return
+
+        await message.edit(
+            embed=find_embed(product, links, results, elapsed=time.monotonic() - started)
+        )
+
+    @stock_find.autocomplete("product")
+    async def product_autocomplete(
+        self, interaction: discord.Interaction, current: str
+    ) -> list[app_commands.Choice[str]]:
+        """Suggest product names and SKUs from the product catalog."""
+        self.product_index.update(self.products.names())
+        return [
+            app_commands.Choice(name=name[:100], value=name[:100])
+            for name in self.product_index.search(current)
+        ]
 
 
 async def setup(bot: commands.Bot, n8n: N8NClient):
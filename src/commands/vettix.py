@@ -1,13 +1,72 @@
-import discord
 from discord import app_commands
 from discord.ext import commands
 
 from ..services import N8NClient
+from .routing import Option, RouteContext, WebhookRoute, route_command
 
-LOGS_CHANNEL = "logs"
 VETTIX_CHANNEL = "vettix-scraper"
 
 
+def validate_state(ctx: RouteContext) -> str | None:
+    ctx.args["state"] = ctx.args["state"].lower().strip()
+    if len(ctx.args["state"]) != 2:
+        return "Please provide a two-letter state code (e.g., tx, tn, ca)"
+    return None
+
+
+async def scrape_payload(ctx: RouteContext) -> dict:
+    # n8n posts the results to this channel itself, threaded per event
+    channel = ctx.extras["channel"] = await ctx.channel(VETTIX_CHANNEL)
+    return {
+        "state": ctx.args["state"],
+        "status": ctx.args["status"],
+        "guild_id": str(ctx.interaction.guild_id),
+        "channel_id": str(channel.id),
+    }
+
+
+async def render_scrape(ctx: RouteContext, result: dict) -> str:
+    state = ctx.args["state"].upper()
+    event_count = result.get("count", 0)
+    await ctx.log(f"Scraped {event_count} events for {state}")
+    return (
+        f"Scraped {event_count} events for {state}. "
+        f"Results posted to {ctx.extras['channel'].mention}"
+    )
+
+
+SCRAPE = WebhookRoute(
+    name="vettix",
+    description="Scrape VetTix events for a state",
+    webhook="vettix-scraper",
+    options=[
+        Option("state", str, "Two-letter state code (e.g., tx, tn, ca, nv)"),
+        Option(
+            "status",
+            str,
+            "Event status filter",
+            default="open",
+            choices=[
+                app_commands.Choice(name="Open tickets only", value="open"),
+                app_commands.Choice(name="All events", value="all"),
+            ],
+        ),
+    ],
+    log_tag="VetTix",
+    validate=validate_state,
+    request_log=lambda ctx: (
+        f"Scraping {ctx.args['state'].upper()} events requested by {ctx.user.mention}"
+    ),
+    payload=scrape_payload,
+    render=render_scrape,
+    failure="Failed to scrape VetTix",
+    exception="Error scraping VetTix",
+    timeout=300,
+    # Scrapes are heavy on the n8n side; don't let several run at once
+    concurrency=2,
+)
+
+
 class VetTixCommands(commands.Cog):
     """Commands for scraping VetTix events."""
 
@@ -15,97 +74,7 @@ class VetTixCommands(commands.Cog):
         self.bot = bot
         self.n8n = n8n
 
-    async def get_or_create_channel(
-        self, guild: discord.Guild, channel_name: str
-    ) -> discord.TextChannel:
-        """Get an existing channel or create it if it doesn't exist."""
-        channel = discord.utils.get(guild.text_channels, name=channel_name)
-        if channel is None:
-            channel = await guild.create_text_channel(channel_name)
-        return channel
-
-    async def log_to_channel(self, guild: discord.Guild, message: str):
-        """Send a log message to the logs channel."""
-        channel = await self.get_or_create_channel(guild, LOGS_CHANNEL)
-        await channel.send(message)
-
-    @app_commands.command(
-        name="vettix", description="Scrape VetTix events for a state"
-    )
-    @app_commands.describe(
-        state="Two-letter state code (e.g., tx, tn, ca, nv)",
-        status="Event status filter",
-    )
-    @app_commands.choices(
-        status=[
-            app_commands.Choice(name="Open tickets only", value="open"),
-            app_commands.Choice(name="All events", value="all"),
-        ]
-    )
-    async def scrape_vettix(
-        self,
-        interaction: discord.Interaction,
-        state: str,
-        status: str = "open",
-    ):
-        """Scrape VetTix events for a given state."""
-        await interaction.response.defer(thinking=True)
-
-        state = state.lower().strip()
-        if len(state) != 2:
-            await interaction.followup.send(
-                "Please provide a two-letter state code (e.g., tx, tn, ca)"
-            )
-            return
-
-        try:
-            await self.log_to_channel(
-                interaction.guild,
-                f"`[VetTix]` Scraping {state.upper()} events requested by {interaction.user.mention}",
-            )
-
-            # Get or create the vettix channel
-            vettix_channel = await self.get_or_create_channel(
-                interaction.guild, VETTIX_CHANNEL
-            )
-
-            payload = {
-                "state": state,
-                "status": status,
-                "guild_id": str(interaction.guild_id),
-                "channel_id": str(vettix_channel.id),
-            }
-
-            result = await self.n8n.trigger_webhook("vettix-scraper", payload)
-
-            if result.get("error"):
-                error_msg = f"Failed to scrape VetTix: {result.get('message', 'Unknown error')}"
-                await self.log_to_channel(
-                    interaction.guild, f"`[VetTix]` Error: {error_msg}"
-                )
-                await interaction.followup.send(error_msg)
-                return
-
-            # n8n handles posting to Discord with threading
-            # Just log and respond to the user
-            event_count = result.get("count", 0)
-
-            await self.log_to_channel(
-                interaction.guild,
-                f"`[VetTix]` Scraped {event_count} events for {state.upper()}",
-            )
-
-            await interaction.followup.send(
-                f"Scraped {event_count} events for {state.upper()}. "
-                f"Results posted to {vettix_channel.mention}"
-            )
-
-        except Exception as e:
-            error_msg = f"Error scraping VetTix: {e}"
-            await self.log_to_channel(
-                interaction.guild, f"`[VetTix]` Error: {error_msg}"
-            )
-            await interaction.followup.send(error_msg)
+    scrape_vettix = route_command(SCRAPE)
 
 
 async def setup(bot: commands.Bot, n8n: N8NClient):
@@ -1,8 +1,74 @@
+import asyncio
+import io
+import json
+import re
+
 import discord
 from discord import app_commands
 from discord.ext import commands
 
-from ..services import N8NClient
+from ..config import Config
+from ..services import AdmissionRejected, N8NClient, WebhookBody, WebhookCatalog
+from .routing import QueueNotice
+
+PREVIEW_CHARS = 1800
+
+
+def render_body(workflow: str, body: WebhookBody, max_bytes: int) -> tuple[str, bytes | None, str]:
+    """
+    Turn a raw webhook response into a bounded preview message.
+
+    Returns the message, the full content to attach when the preview is
+    cut short (or None), and the attachment filename. Parsing and
+    pretty-printing can be slow for big payloads, so this runs in a thread.
+    """
+    name = re.sub(r"[^\w.-]", "_", workflow)
+    text = body.data.decode("utf-8", errors="replace")
+
+    if not body.ok:
+        return f"Workflow failed: {text[:PREVIEW_CHARS] or body.status}", None, ""
+
+    if body.truncated:
+        limit = f"{max_bytes / (1024 * 1024):.1f} MB"
+        return (
+            f"**{workflow}** response exceeded the {limit} limit and was cut off. "
+            f"The first {limit} is attached.\n```\n{text[:PREVIEW_CHARS]}\n```",
+            body.data,
+            f"{name}-partial.txt",
+        )
+
+    if not text.strip():
+        return f"**{workflow}** triggered successfully!", None, ""
+
+    try:
+        result = json.loads(text)
+    except json.JSONDecodeError:
+        # n8n might return plain text
+        result = {"response": text}
+
+    message = result.get("message") or result.get("response") if isinstance(result, dict) else None
+    if isinstance(message, str):
+        if len(message) <= PREVIEW_CHARS:
+            return f"**{workflow}**: {message}", None, ""
+        return (
+            f"**{workflow}**: {message[:PREVIEW_CHARS]}…\n-# Full response attached",
+            message.encode(),
+            f"{name}.txt",
+        )
+
+    pretty = json.dumps(result, indent=2, ensure_ascii=False)
+    if len(pretty) <= PREVIEW_CHARS:
+        return f"**{workflow}** triggered successfully!\n```json\n{pretty}\n```", None, ""
+    full = pretty.encode()
+    if len(full) > max_bytes:
+        # Indentation can push a body near the cap past it; attach it as sent
+        full = body.data
+    return (
+        f"**{workflow}** triggered successfully!\n```json\n{pretty[:PREVIEW_CHARS]}\n…\n```"
+        f"\n-# Full result attached ({len(body.data):,} bytes)",
+        full,
+        f"{name}.json",
+    )
 
 
 class WebhookCommands(commands.Cog):
@@ -11,6 +77,29 @@ class WebhookCommands(commands.Cog):
     def __init__(self, bot: commands.Bot, n8n: N8NClient):
         self.bot = bot
         self.n8n = n8n
+        self.max_body_bytes = bot.config.trigger_max_body_bytes
+        self.catalog = WebhookCatalog(
+            bot.config.workflows_dir,
+            bot.config.n8n_base_url,
+            api_token=bot.config.n8n_api_token,
+        )
+
+    async def cog_load(self):
+        self.bot.snapshots.register(
+            "webhook-catalog", 1, self.catalog.snapshot, self.catalog.restore
+        )
+        self.catalog.refresh_if_stale()
+
+    async def cog_unload(self):
+        self.bot.snapshots.unregister("webhook-catalog")
+
+    @commands.Cog.listener()
+    async def on_config_reload(self, old: Config, new: Config):
+        self.max_body_bytes = new.trigger_max_body_bytes
+        if new.n8n_base_url != old.n8n_base_url:
+            # List the new server's workflows on the next autocomplete
+            self.catalog.base_url = new.n8n_base_url.rstrip("/")
+            self.catalog.invalidate()
 
     @app_commands.command(name="trigger", description="Trigger a custom n8n workflow")
     @app_commands.describe(
@@ -25,10 +114,9 @@ class WebhookCommands(commands.Cog):
     ):
         """Trigger any n8n webhook by name."""
         await interaction.response.defer(thinking=True)
+        notice = QueueNotice(interaction)
 
         try:
-            import json
-
             payload = {"triggered_by": str(interaction.user)}
 
             if data:
@@ -39,24 +127,42 @@ class WebhookCommands(commands.Cog):
                     # If not valid JSON, send as raw data
                     payload["data"] = data
 
-            result = await self.n8n.trigger_webhook(workflow, payload)
-
-            if result.get("error"):
-                await interaction.followup.send(
-                    f"Workflow failed: {result.get('message', 'Unknown error')}"
-                )
-                return
+            async with self.bot.admission.slot(
+                workflow,
+                interaction.guild_id,
+                interaction.user.id,
+                on_queued=notice.on_queued,
+            ):
+                notice.admitted = True
+                body = await self.n8n.stream_webhook(workflow, payload, self.max_body_bytes)
+            if body.ok:
+                self.catalog.learn(workflow)
 
-            message = result.get("message") or result.get("response")
-            if message:
-                await interaction.followup.send(f"**{workflow}**: {message}")
+            message, attachment, filename = await asyncio.to_thread(
+                render_body, workflow, body, self.max_body_bytes
+            )
+            if attachment is None:
+                await notice.send(message)
             else:
-                await interaction.followup.send(
-                    f"**{workflow}** triggered successfully!\n```json\n{json.dumps(result, indent=2)[:1800]}\n```"
+                await notice.send(
+                    message, file=discord.File(io.BytesIO(attachment), filename=filename)
                 )
 
+        except AdmissionRejected as e:
+            await notice.send(str(e))
         except Exception as e:
-            await interaction.followup.send(f"Error: {e}")
+            await notice.send(f"Error: {e}")
+
+    @trigger_workflow.autocomplete("workflow")
+    async def workflow_autocomplete(
+        self, interaction: discord.Interaction, current: str
+    ) -> list[app_commands.Choice[str]]:
+        """Suggest known webhook paths from the cached catalog."""
+        self.catalog.refresh_if_stale()
+        return [
+            app_commands.Choice(name=self.catalog.label(path)[:100], value=path)
+            for path in self.catalog.suggest(current)
+        ]
 
 
 async def setup(bot: commands.Bot, n8n: N8NClient):
@@ -1,5 +1,129 @@
+import json
 import os
-from dataclasses import dataclass
+import types
+import typing
+from dataclasses import dataclass, field, fields, replace
+from pathlib import Path
+from urllib.parse import urlsplit
+
+# Settings that are read once at startup; a reload keeps the running value
+RESTART_FIELDS = frozenset(
+    {
+        "discord_token",
+        "n8n_api_token",
+        "workflows_dir",
+        "github_token",
+        "recipe_repo",
+        "enabled_cogs",
+        "data_dir",
+        "sharded",
+        "shard_count",
+        "shard_ids",
+        "cluster_id",
+        "cluster_count",
+        "ipc_base_port",
+        "ipc_token",
+        "config_file",
+        "traffic_trace",
+        "ollama_url",
+    }
+)
+# Webhooks whose runs take tens of seconds by design (LLM parsing), left out
+# of the interactive latency signal unless N8N_LATENCY_TARGETS sets them
+DEFAULT_LATENCY_TARGETS = {"recipe-parser": 0, "universal-stock-check": 0}
+# Shown masked by /config
+SECRET_FIELDS = frozenset(
+    {"discord_token", "n8n_webhook_secret", "n8n_api_token", "github_token", "ipc_token"}
+)
+
+
+class ConfigError(ValueError):
+    """Raised when a config layer doesn't parse or the merged config is invalid."""
+
+    def __init__(self, problems: list[str]):
+        super().__init__("; ".join(problems))
+        self.problems = problems
+
+
+def _env_bool(name: str) -> bool:
+    return os.environ.get(name, "").lower() in ("1", "true", "yes")
+
+
+def _env_list(name: str) -> list[str]:
+    return [item.strip() for item in os.environ.get(name, "").split(",") if item.strip()]
+
+
+def _env_int_map(name: str) -> dict[str, int]:
+    """Parse `a=1,b=2` into {"a": 1, "b": 2}."""
+    return {
+        key.strip(): int(value)
+        for key, _, value in (item.partition("=") for item in _env_list(name))
+    }
+
+
+def _env_str_map(name: str) -> dict[str, str]:
+    """Parse `a=x,b=y` into {"a": "x", "b": "y"}."""
+    return {
+        key.strip(): value.strip()
+        for key, _, value in (item.partition("=") for item in _env_list(name))
+    }
+
+
+def _coerce(value, kind):
+    """Convert a config file or admin value to a field's annotated type."""
+    origin = typing.get_origin(kind)
+    if origin in (types.UnionType, typing.Union):
+        inner = [arg for arg in typing.get_args(kind) if arg is not type(None)]
+        if value is None or value == "":
+            return None
+        return _coerce(value, inner[0])
+    if origin is dict:
+        value_kind = typing.get_args(kind)[1]
+        if isinstance(value, str):
+            value = {
+                key.strip(): item.strip()
+                for key, _, item in (part.partition("=") for part in value.split(","))
+                if key.strip()
+            }
+        if not isinstance(value, dict):
+            raise ValueError("expected a mapping such as a=1,b=2")
+        return {str(key): _coerce(item, value_kind) for key, item in value.items()}
+    if origin is list:
+        item_kind = typing.get_args(kind)[0]
+        if isinstance(value, str):
+            value = [part.strip() for part in value.split(",") if part.strip()]
+        if not isinstance(value, list):
+            raise ValueError("expected a list such as a,b")
+        return [_coerce(item, item_kind) for item in value]
+    if kind is bool:
+        if isinstance(value, bool):
+            return value
+        if str(value).lower() in ("1", "true", "yes", "on"):
+            return True
+        if str(value).lower() in ("0", "false", "no", "off", ""):
+            return False
+        raise ValueError("expected true or false")
+    if kind is int:
+        if isinstance(value, float) and not value.is_integer():
+            raise ValueError("expected a whole number")
+        return int(value)
+    if kind is float:
+        return float(value)
+    return str(value)
+
+
+def load_config_file(path: str | Path) -> dict:
+    """Settings from a JSON config file, keyed by Config field name ({} if absent)."""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    try:
+        values = json.loads(path.read_text())
+    except (OSError, ValueError) as e:
+        raise ConfigError([f"{path}: {e}"]) from e
+    if not isinstance(values, dict):
+        raise ConfigError([f"{path}: expected a JSON object"])
+    return values
 
 
 @dataclass
@@ -7,11 +131,260 @@ class Config:
     discord_token: str
     n8n_base_url: str
     n8n_webhook_secret: str | None = None
+    n8n_api_token: str | None = None  # optional; lets /trigger list server workflows
+    workflows_dir: str = "workflows"
+    trigger_max_body_bytes: int = 8 * 1024 * 1024
+    n8n_json_codec: str | None = None  # json or orjson; default picks orjson if installed
+    n8n_compress_threshold: int = 64 * 1024
+    # Separate pools for slash commands and background polling; background is
+    # throttled while interactive p95 latency is above the target. Per-webhook
+    # targets override it, and 0 leaves a slow-by-design webhook out
+    n8n_interactive_connections: int = 16
+    n8n_background_connections: int = 4
+    n8n_interactive_target_ms: int = 10000
+    n8n_latency_targets: dict[str, int] = field(
+        default_factory=lambda: dict(DEFAULT_LATENCY_TARGETS)
+    )
+    # Admission control for webhook calls started by users (0 = no per-guild/user cap)
+    webhook_max_concurrency: int = 16
+    webhook_guild_limit: int = 4
+    webhook_user_limit: int = 2
+    webhook_limits: dict[str, int] = field(default_factory=dict)
+    webhook_max_queued_per_user: int = 5
+    github_token: str | None = None
+    recipe_repo: str = "ltruong0/recipe-book"
+    recipe_image_max_bytes: int = 5 * 1024 * 1024
+    recipe_image_max_dimension: int = 1600
+    enabled_cogs: list[str] = field(default_factory=list)  # empty = all
+    data_dir: str = "data"
+    force_command_sync: bool = False
+    # Sharding: SHARDED=true runs AutoShardedBot; the cluster launcher sets the rest
+    sharded: bool = False
+    shard_count: int | None = None
+    shard_ids: list[int] | None = None
+    cluster_id: int = 0
+    cluster_count: int = 1
+    ipc_base_port: int = 8790
+    ipc_token: str | None = None  # generated by the launcher, required on every IPC request
+    # Background health polling for /status (0 disables)
+    status_poll_interval: int = 60
+    status_service_intervals: dict[str, int] = field(default_factory=dict)
+    status_alerts_channel: str = "homelab-alerts"
+    # /home: actions within this window are merged into one webhook call
+    home_debounce_ms: int = 750
+    home_targets: list[str] = field(default_factory=list)
+    # Adaptive watches: n8n sync period in seconds (0 disables), fetches per
+    # hour shared by all watches, and bounds on planned intervals in minutes
+    watch_sync_interval: int = 300
+    watch_fetch_budget: int = 600
+    watch_min_interval: float = 1
+    watch_max_interval: float = 60
+    # Product-page fetches per retailer host: steady rate, burst and
+    # concurrency, with per-host rate overrides (fetches per minute)
+    host_rate_per_minute: int = 30
+    host_burst: int = 5
+    host_max_concurrent: int = 2
+    host_rate_limits: dict[str, int] = field(default_factory=dict)
+    # Channel renames: the bot's channel name (e.g. logs) -> this server's name
+    channel_names: dict[str, str] = field(default_factory=dict)
+    # Layered settings: this JSON file (default DATA_DIR/config.json) and
+    # /config overrides apply over the environment; checked every N seconds (0 = never)
+    config_file: str | None = None
+    config_reload_interval: int = 10
+    # Warm restarts: state is snapshotted on shutdown and restored if the
+    # snapshot is younger than this many seconds (0 disables snapshots)
+    snapshot_max_age: int = 900
+    # Opt-in: record commands and n8n calls to this JSONL trace for src.replay
+    traffic_trace: str | None = None
+    # Bot-side LLM for the universal stock checker (unset: n8n runs the model).
+    # Keep-alive in seconds; parallel should match the server's OLLAMA_NUM_PARALLEL
+    ollama_url: str | None = None
+    ollama_model: str = "qwen2.5-coder:7b-instruct-q6_K"
+    ollama_keep_alive: int = 600
+    ollama_parallel: int = 4
+    ollama_max_queue: int = 32
+    ollama_batch_window_ms: int = 50
 
     @classmethod
     def from_env(cls) -> "Config":
         return cls(
-            discord_token=os.environ["DISCORD_TOKEN"],
+            discord_token=os.environ.get("DISCORD_TOKEN", ""),
             n8n_base_url=os.environ.get("N8N_BASE_URL", "https://n8n.marcellolab.com"),
             n8n_webhook_secret=os.environ.get("N8N_WEBHOOK_SECRET"),
+            n8n_api_token=os.environ.get("N8N_TOKEN"),
+            workflows_dir=os.environ.get("WORKFLOWS_DIR", "workflows"),
+            trigger_max_body_bytes=int(
+                os.environ.get("TRIGGER_MAX_BODY_BYTES", 8 * 1024 * 1024)
+            ),
+            n8n_json_codec=os.environ.get("N8N_JSON_CODEC") or None,
+            n8n_compress_threshold=int(os.environ.get("N8N_COMPRESS_THRESHOLD", 64 * 1024)),
+            n8n_interactive_connections=int(os.environ.get("N8N_INTERACTIVE_CONNECTIONS", 16)),
+            n8n_background_connections=int(os.environ.get("N8N_BACKGROUND_CONNECTIONS", 4)),
+            n8n_interactive_target_ms=int(os.environ.get("N8N_INTERACTIVE_TARGET_MS", 10000)),
+            n8n_latency_targets={
+                **DEFAULT_LATENCY_TARGETS,
+                **_env_int_map("N8N_LATENCY_TARGETS"),
+            },
+            webhook_max_concurrency=int(os.environ.get("WEBHOOK_MAX_CONCURRENCY", 16)),
+            webhook_guild_limit=int(os.environ.get("WEBHOOK_GUILD_LIMIT", 4)),
+            webhook_user_limit=int(os.environ.get("WEBHOOK_USER_LIMIT", 2)),
+            webhook_limits=_env_int_map("WEBHOOK_LIMITS"),
+            webhook_max_queued_per_user=int(os.environ.get("WEBHOOK_MAX_QUEUED_PER_USER", 5)),
+            github_token=os.environ.get("GITHUB_TOKEN"),
+            recipe_repo=os.environ.get("RECIPE_REPO", "ltruong0/recipe-book"),
+            recipe_image_max_bytes=int(
+                os.environ.get("RECIPE_IMAGE_MAX_BYTES", 5 * 1024 * 1024)
+            ),
+            recipe_image_max_dimension=int(
+                os.environ.get("RECIPE_IMAGE_MAX_DIMENSION", 1600)
+            ),
+            enabled_cogs=_env_list("ENABLED_COGS"),
+            data_dir=os.environ.get("DATA_DIR", "data"),
+            force_command_sync=_env_bool("FORCE_COMMAND_SYNC"),
+            sharded=_env_bool("SHARDED"),
+            shard_count=int(os.environ["SHARD_COUNT"]) if os.environ.get("SHARD_COUNT") else None,
+            shard_ids=[int(shard) for shard in _env_list("SHARD_IDS")] or None,
+            cluster_id=int(os.environ.get("CLUSTER_ID", 0)),
+            cluster_count=int(os.environ.get("CLUSTER_COUNT", 1)),
+            ipc_base_port=int(os.environ.get("IPC_BASE_PORT", 8790)),
+            ipc_token=os.environ.get("IPC_TOKEN") or None,
+            status_poll_interval=int(os.environ.get("STATUS_POLL_INTERVAL", 60)),
+            status_service_intervals=_env_int_map("STATUS_SERVICE_INTERVALS"),
+            status_alerts_channel=os.environ.get("STATUS_ALERTS_CHANNEL", "homelab-alerts"),
+            home_debounce_ms=int(os.environ.get("HOME_DEBOUNCE_MS", 750)),
+            home_targets=_env_list("HOME_TARGETS"),
+            watch_sync_interval=int(os.environ.get("WATCH_SYNC_INTERVAL", 300)),
+            watch_fetch_budget=int(os.environ.get("WATCH_FETCH_BUDGET", 600)),
+            watch_min_interval=float(os.environ.get("WATCH_MIN_INTERVAL", 1)),
+            watch_max_interval=float(os.environ.get("WATCH_MAX_INTERVAL", 60)),
+            host_rate_per_minute=int(os.environ.get("HOST_RATE_PER_MINUTE", 30)),
+            host_burst=int(os.environ.get("HOST_BURST", 5)),
+            host_max_concurrent=int(os.environ.get("HOST_MAX_CONCURRENT", 2)),
+            host_rate_limits=_env_int_map("HOST_RATE_LIMITS"),
+            channel_names=_env_str_map("CHANNEL_NAMES"),
+            config_file=os.environ.get("CONFIG_FILE") or None,
+            config_reload_interval=int(os.environ.get("CONFIG_RELOAD_INTERVAL", 10)),
+            snapshot_max_age=int(os.environ.get("SNAPSHOT_MAX_AGE", 900)),
+            traffic_trace=os.environ.get("TRAFFIC_TRACE") or None,
+            ollama_url=os.environ.get("OLLAMA_URL") or None,
+            ollama_model=os.environ.get("OLLAMA_MODEL", "qwen2.5-coder:7b-instruct-q6_K"),
+            ollama_keep_alive=int(os.environ.get("OLLAMA_KEEP_ALIVE", 600)),
+            ollama_parallel=int(os.environ.get("OLLAMA_PARALLEL", 4)),
+            ollama_max_queue=int(os.environ.get("OLLAMA_MAX_QUEUE", 32)),
+            ollama_batch_window_ms=int(os.environ.get("OLLAMA_BATCH_WINDOW_MS", 50)),
         )
+
+    @classmethod
+    def load(cls, overrides: dict | None = None) -> "Config":
+        """
+        The environment, then the config file, then /config overrides.
+
+        `overrides` replaces the saved overrides, to check a change before
+        saving it. Raises ConfigError if any layer is invalid.
+        """
+        env = cls.from_env()
+        if overrides is None:
+            overrides = load_config_file(env.overrides_path)
+        return env.layered(load_config_file(env.config_path), overrides)
+
+    def save_overrides(self, overrides: dict):
+        path = self.overrides_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(overrides, indent=2, sort_keys=True))
+        os.replace(tmp, path)
+
+    @property
+    def config_path(self) -> Path:
+        return Path(self.config_file or Path(self.data_dir) / "config.json")
+
+    @property
+    def overrides_path(self) -> Path:
+        return Path(self.data_dir) / "config-overrides.json"
+
+    def channel(self, name: str) -> str:
+        """This server's name for one of the bot's channels."""
+        return self.channel_names.get(name, name)
+
+    def layered(self, *layers: dict) -> "Config":
+        """
+        This config with each layer of `{field: value}` applied in turn.
+
+        Values may be JSON-typed or strings in the environment's format
+        (`a=1,b=2` maps, `a,b` lists); raises ConfigError listing every
+        unknown field, unparseable value and failed check.
+        """
+        kinds = {f.name: f.type for f in fields(self)}
+        changes = {}
+        problems = []
+        for layer in layers:
+            for name, value in layer.items():
+                if name not in kinds:
+                    problems.append(f"unknown setting '{name}'")
+                    continue
+                try:
+                    changes[name] = _coerce(value, kinds[name])
+                except (TypeError, ValueError) as e:
+                    problems.append(f"{name}: {e}")
+        if problems:
+            raise ConfigError(problems)
+        config = replace(self, **changes)
+        problems = config.validate()
+        if problems:
+            raise ConfigError(problems)
+        return config
+
+    def validate(self) -> list[str]:
+        problems = []
+        url = urlsplit(self.n8n_base_url)
+        if url.scheme not in ("http", "https") or not url.hostname:
+            problems.append(f"n8n_base_url: '{self.n8n_base_url}' is not an http(s) URL")
+        if self.n8n_json_codec not in (None, "json", "orjson"):
+            problems.append("n8n_json_codec: use json or orjson")
+        for name in (
+            "n8n_interactive_connections",
+            "n8n_background_connections",
+            "n8n_interactive_target_ms",
+            "webhook_max_concurrency",
+            "webhook_max_queued_per_user",
+            "trigger_max_body_bytes",
+            "host_rate_per_minute",
+            "host_burst",
+            "host_max_concurrent",
+            "watch_fetch_budget",
+            "watch_min_interval",
+            "ollama_parallel",
+            "ollama_max_queue",
+        ):
+            if getattr(self, name) <= 0:
+                problems.append(f"{name}: must be positive")
+        for name in (
+            "n8n_compress_threshold",
+            "webhook_guild_limit",
+            "webhook_user_limit",
+            "status_poll_interval",
+            "home_debounce_ms",
+            "watch_sync_interval",
+            "config_reload_interval",
+            "snapshot_max_age",
+            "ollama_keep_alive",
+            "ollama_batch_window_ms",
+        ):
+            if getattr(self, name) < 0:
+                problems.append(f"{name}: must not be negative")
+        for name in ("webhook_limits", "status_service_intervals", "host_rate_limits"):
+            if any(value <= 0 for value in getattr(self, name).values()):
+                problems.append(f"{name}: values must be positive")
+        if any(value < 0 for value in self.n8n_latency_targets.values()):
+            problems.append("n8n_latency_targets: values must not be negative")
+        if self.watch_max_interval < self.watch_min_interval:
+            problems.append("watch_max_interval: must be at least watch_min_interval")
+        if self.ollama_url:
+            url = urlsplit(self.ollama_url)
+            if url.scheme not in ("http", "https") or not url.hostname:
+                problems.append(f"ollama_url: '{self.ollama_url}' is not an http(s) URL")
+        if self.cluster_count > 1 and not self.ipc_token:
+            problems.append("ipc_token: must be set when running more than one cluster")
+        if not all(self.channel_names.values()):
+            problems.append("channel_names: names must not be empty")
+        return problems
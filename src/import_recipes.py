@@ -0,0 +1,102 @@
+"""
+Import many recipes into the recipe book, one commit per batch.
+
+More URLs than a batch holds are split into consecutive batches.
+
+Usage:
+    python -m src.import_recipes URL [URL ...] [--file urls.txt] [--workers 3]
+"""
+import argparse
+import asyncio
+import logging
+import sys
+
+from dotenv import load_dotenv
+
+from .config import Config
+from .services import GitHubClient, N8NClient, RecipeBook
+from .services.codec import get_codec
+from .services.recipe_batch import MAX_BATCH_SIZE, RecipeBatch
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+
+async def run(urls: list[str], workers: int) -> int:
+    config = Config.from_env()
+    if not config.github_token:
+        print("GITHUB_TOKEN must be set to import recipes", file=sys.stderr)
+        return 1
+
+    n8n = N8NClient(
+        base_url=config.n8n_base_url,
+        webhook_secret=config.n8n_webhook_secret,
+        codec=get_codec(config.n8n_json_codec),
+        compress_threshold=config.n8n_compress_threshold,
+    )
+    recipe_book = RecipeBook(
+        GitHubClient(config.github_token, config.recipe_repo),
+        max_image_bytes=config.recipe_image_max_bytes,
+        max_image_dimension=config.recipe_image_max_dimension,
+    )
+
+    reported: dict[int, str] = {}
+
+    async def print_changes(batch: RecipeBatch):
+        for position, item in enumerate(batch.items):
+            if reported.get(position) != item.status:
+                reported[position] = item.status
+                print(item.describe().replace("**", ""))
+
+    chunks = [urls[start : start + MAX_BATCH_SIZE] for start in range(0, len(urls), MAX_BATCH_SIZE)]
+    totals: dict[str, int] = {}
+    failed = False
+    try:
+        for number, chunk in enumerate(chunks, 1):
+            if len(chunks) > 1:
+                print(f"Batch {number}/{len(chunks)} ({len(chunk)} URLs)")
+            reported.clear()
+            batch = RecipeBatch(
+                n8n,
+                recipe_book,
+                chunk,
+                workers=workers,
+                requested_by="import_recipes",
+                on_update=print_changes,
+            )
+            commit = await batch.run()
+            for status, count in batch.counts().items():
+                totals[status] = totals.get(status, 0) + count
+            failed = failed or any(item.status == "failed" for item in batch.items)
+            if commit:
+                print(f"Commit: {commit.commit_url}")
+                print(f"Timings: {commit.format_timings()}")
+            print()
+    finally:
+        await n8n.close()
+
+    print(", ".join(f"{count} {status}" for status, count in totals.items()))
+    return 1 if failed else 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Import recipes from URLs")
+    parser.add_argument("urls", nargs="*", help="Recipe URLs")
+    parser.add_argument("-f", "--file", help="File with one URL per line")
+    parser.add_argument("-w", "--workers", type=int, default=3, help="Parallel parses")
+    args = parser.parse_args()
+
+    urls = list(args.urls)
+    if args.file:
+        with open(args.file) as f:
+            urls.extend(RecipeBatch.split_urls(f.read()))
+    if not urls:
+        parser.error("no URLs given")
+
+    load_dotenv()
+    sys.exit(asyncio.run(run(urls, args.workers)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Run MarcelloBot as several processes, each owning a group of shards.
+
+The processes share DATA_DIR; cluster 0 is its only writer and the
+others hand it their writes over IPC (see the README's Sharding section).
+
+Usage:
+    python -m src.launcher [--clusters N] [--shards N]
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import secrets
+import signal
+import time
+
+import aiohttp
+from dotenv import load_dotenv
+
+from .config import Config, ConfigError
+from .services.cluster import shard_groups
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger("marcellobot.launcher")
+
+RESTART_DELAY = 5.0
+
+
+async def fetch_recommended_shards(token: str) -> int:
+    """Ask Discord how many shards this bot should run."""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(
+            "https://discord.com/api/v10/gateway/bot",
+            headers={"Authorization": f"Bot {token}"},
+        ) as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+    return int(data["shards"])
+
+
+def run_cluster(
+    cluster_id: int,
+    shard_ids: list[int],
+    shard_count: int,
+    cluster_count: int,
+    ipc_token: str,
+):
+    """Process entry point: run one cluster's shards."""
+    from .bot import ShardedMarcelloBot
+
+    load_dotenv()
+    # Through the environment, so config reloads in this process see them too
+    os.environ.update(
+        SHARDED="true",
+        SHARD_IDS=",".join(map(str, shard_ids)),
+        SHARD_COUNT=str(shard_count),
+        CLUSTER_ID=str(cluster_id),
+        CLUSTER_COUNT=str(cluster_count),
+        IPC_TOKEN=ipc_token,
+    )
+    config = Config.load()
+    bot = ShardedMarcelloBot(config)
+    bot.run(config.discord_token, log_handler=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run MarcelloBot as a shard cluster")
+    parser.add_argument(
+        "--clusters", type=int, default=os.cpu_count() or 1, help="Processes to run"
+    )
+    parser.add_argument(
+        "--shards", type=int, help="Total shards (default: Discord's recommendation)"
+    )
+    args = parser.parse_args()
+
+    load_dotenv()
+    try:
+        config = Config.load()
+    except ConfigError as e:
+        raise SystemExit(f"Invalid configuration: {e}")
+    if not config.discord_token:
+        raise SystemExit("DISCORD_TOKEN must be set")
+
+    shard_count = args.shards or config.shard_count
+    if not shard_count:
+        shard_count = asyncio.run(fetch_recommended_shards(config.discord_token))
+    cluster_count = max(1, min(args.clusters, shard_count))
+    groups = shard_groups(shard_count, cluster_count)
+    logger.info(f"Starting {cluster_count} cluster(s) for {shard_count} shard(s)")
+
+    # Shared secret for cluster IPC, new on every launch
+    ipc_token = secrets.token_urlsafe(32)
+
+    ctx = multiprocessing.get_context("spawn")
+    processes: dict[int, multiprocessing.Process] = {}
+    started_at: dict[int, float] = {}
+
+    def start(cluster_id: int):
+        process = ctx.Process(
+            target=run_cluster,
+            args=(cluster_id, groups[cluster_id], shard_count, cluster_count, ipc_token),
+            name=f"marcellobot-cluster-{cluster_id}",
+        )
+        process.start()
+        processes[cluster_id] = process
+        started_at[cluster_id] = time.monotonic()
+        logger.info(f"Cluster {cluster_id} (shards {groups[cluster_id]}) pid {process.pid}")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for cluster_id in range(cluster_count):
+        start(cluster_id)
+
+    # Supervise: restart clusters that die, but not in a tight loop
+    while not stopping:
+        time.sleep(1)
+        for cluster_id, process in processes.items():
+            if process.is_alive() or stopping:
+                continue
+            if time.monotonic() - started_at[cluster_id] < RESTART_DELAY:
+                continue
+            logger.warning(f"Cluster {cluster_id} exited ({process.exitcode}), restarting")
+            start(cluster_id)
+
+    logger.info("Stopping clusters...")
+    for process in processes.values():
+        if process.is_alive():
+            process.terminate()
+    for process in processes.values():
+        process.join(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
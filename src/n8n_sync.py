@@ -0,0 +1,463 @@
+"""
+Bidirectional n8n workflow sync (scoped to this repo's workflows only).
+
+Python counterpart of scripts/n8n-sync.sh. All API calls share one pooled
+HTTP session and run concurrently, and a local manifest of content hashes
+lets unchanged workflows be skipped without any API calls.
+
+Usage:
+    python -m src.n8n_sync push [file.json ...] [--force]
+    python -m src.n8n_sync pull [name] [--all] [--force]
+    python -m src.n8n_sync diff
+    python -m src.n8n_sync list
+
+Environment variables:
+    N8N_URL     - n8n server URL (default: https://workflows.marcellolab.com)
+    N8N_TOKEN   - n8n API token (required)
+    DRY_RUN     - Set to "true" to preview changes without applying
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+import aiohttp
+from dotenv import load_dotenv
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+WORKFLOWS_DIR = REPO_ROOT / "workflows"
+MANIFEST_PATH = REPO_ROOT / ".n8n-sync-manifest.json"
+MAX_CONCURRENCY = 8
+ERROR_BODY_CHARS = 200  # of a non-JSON error page shown in API errors
+
+RED = "\033[0;31m"
+GREEN = "\033[0;32m"
+YELLOW = "\033[1;33m"
+CYAN = "\033[0;36m"
+NC = "\033[0m"
+
+
+def log_info(message: str):
+    print(f"{GREEN}[INFO]{NC} {message}")
+
+
+def log_warn(message: str):
+    print(f"{YELLOW}[WARN]{NC} {message}")
+
+
+def log_error(message: str):
+    print(f"{RED}[ERROR]{NC} {message}")
+
+
+def clean_for_push(workflow: dict[str, Any]) -> dict[str, Any]:
+    """The fields n8n accepts on create/update, minus nulls."""
+    return {
+        key: workflow[key]
+        for key in ("name", "nodes", "connections", "settings")
+        if workflow.get(key) is not None
+    }
+
+
+def clean_for_save(workflow: dict[str, Any]) -> dict[str, Any]:
+    """Strip instance-specific fields before writing a workflow to disk."""
+    workflow = {
+        key: value
+        for key, value in workflow.items()
+        if key not in ("staticData", "triggerCount", "pinData", "versionId")
+    }
+    meta = dict(workflow.get("meta") or {})
+    meta.pop("instanceId", None)
+    meta["templateCredsSetupCompleted"] = False
+    workflow["meta"] = meta
+    return workflow
+
+
+def content_hash(workflow: dict[str, Any]) -> str:
+    """Hash of the cleaned {name, nodes, connections, settings} payload."""
+    payload = json.dumps(clean_for_push(workflow), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def name_to_filename(name: str) -> str:
+    return re.sub(r"-+", "-", re.sub(r"[^a-z0-9]", "-", name.lower())).strip("-")
+
+
+def write_workflow(path: Path, workflow: dict[str, Any]):
+    path.write_text(json.dumps(workflow, indent=2, ensure_ascii=False) + "\n")
+
+
+class Timer:
+    """Collects per-phase wall-clock timings for the summary line."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: list[tuple[str, float]] = []
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def summary(self) -> str:
+        parts = [f"{name} {secs:.2f}s" for name, secs in self.phases]
+        parts.append(f"total {time.perf_counter() - self.started:.2f}s")
+        return ", ".join(parts)
+
+
+class N8NSync:
+    def __init__(self, base_url: str, token: str, dry_run: bool = False):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.dry_run = dry_run
+        self.timer = Timer()
+        self.manifest = self._load_manifest()
+        self._slots = asyncio.Semaphore(MAX_CONCURRENCY)
+        self._session: aiohttp.ClientSession | None = None
+
+    # ------------------------------------------------------------------
+    # Manifest
+    # ------------------------------------------------------------------
+
+    def _load_manifest(self) -> dict[str, dict[str, Any]]:
+        try:
+            data = json.loads(MANIFEST_PATH.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        # A manifest recorded against another server says nothing about this one
+        if data.get("server") != self.base_url:
+            return {}
+        return data.get("workflows", {})
+
+    def save_manifest(self):
+        if self.dry_run:
+            return
+        MANIFEST_PATH.write_text(
+            json.dumps(
+                {"server": self.base_url, "workflows": self.manifest},
+                indent=2,
+                sort_keys=True,
+            )
+            + "\n"
+        )
+
+    def _record(self, name: str, workflow_id: str, local_hash: str, updated_at: str | None):
+        self.manifest[name] = {
+            "id": workflow_id,
+            "hash": local_hash,
+            "updatedAt": updated_at,
+        }
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    async def __aenter__(self) -> "N8NSync":
+        self._session = aiohttp.ClientSession(
+            headers={"X-N8N-API-KEY": self.token},
+            connector=aiohttp.TCPConnector(limit=MAX_CONCURRENCY),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+
+    async def api(self, method: str, endpoint: str, payload: Any = None, params=None) -> Any:
+        async with self._slots:
+            async with self._session.request(
+                method,
+                f"{self.base_url}/api/v1{endpoint}",
+                json=payload,
+                params=params,
+            ) as resp:
+                # Proxies and auth failures answer with HTML or plain text
+                text = await resp.text()
+                try:
+                    data = json.loads(text) if text else None
+                except json.JSONDecodeError:
+                    data = None
+                if resp.status >= 400 or (data is None and text):
+                    message = data.get("message") if isinstance(data, dict) else None
+                    detail = message or " ".join(text.split())[:ERROR_BODY_CHARS] or "empty body"
+                    raise RuntimeError(f"{method} {endpoint}: HTTP {resp.status}: {detail}")
+                return data
+
+    async def remote_workflows(self) -> list[dict[str, Any]]:
+        """All remote workflows, following pagination."""
+        workflows: list[dict[str, Any]] = []
+        cursor = None
+        with self.timer.phase("list"):
+            while True:
+                params = {"limit": 250}
+                if cursor:
+                    params["cursor"] = cursor
+                page = await self.api("GET", "/workflows", params=params)
+                workflows.extend(page.get("data") or [])
+                cursor = page.get("nextCursor")
+                if not cursor:
+                    return workflows
+
+    # ------------------------------------------------------------------
+    # Local files
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def local_workflows(files: list[Path] | None = None) -> dict[str, tuple[Path, dict]]:
+        """Map workflow name -> (path, parsed JSON) for local workflow files."""
+        local = {}
+        for path in files or sorted(WORKFLOWS_DIR.glob("*.json")):
+            try:
+                workflow = json.loads(path.read_text())
+            except (FileNotFoundError, json.JSONDecodeError) as e:
+                log_error(f"Invalid workflow file {path}: {e}")
+                continue
+            if not workflow.get("name"):
+                log_error(f"Invalid workflow file (no name): {path}")
+                continue
+            local[workflow["name"]] = (path, workflow)
+        return local
+
+    # ------------------------------------------------------------------
+    # Commands
+    # ------------------------------------------------------------------
+
+    async def cmd_push(self, files: list[Path] | None, force: bool = False) -> bool:
+        local = self.local_workflows(files)
+        if not local:
+            log_warn(f"No workflow files found in {WORKFLOWS_DIR}")
+            return True
+
+        pending = {}
+        for name, (path, workflow) in local.items():
+            entry = self.manifest.get(name)
+            local_hash = content_hash(workflow)
+            if not force and entry and entry["hash"] == local_hash:
+                continue
+            pending[name] = (path, workflow, local_hash)
+
+        skipped = len(local) - len(pending)
+        if not pending:
+            log_info(f"All {len(local)} workflow(s) unchanged since last sync")
+            return True
+
+        # Only look up remote IDs for workflows the manifest doesn't know
+        ids = {
+            name: self.manifest[name]["id"]
+            for name in pending
+            if name in self.manifest
+        }
+        if len(ids) < len(pending):
+            ids.update(
+                {
+                    workflow["name"]: workflow["id"]
+                    for workflow in await self.remote_workflows()
+                    if workflow["name"] in pending and workflow["name"] not in ids
+                }
+            )
+
+        async def push_one(name: str) -> bool:
+            path, workflow, local_hash = pending[name]
+            workflow_id = ids.get(name)
+            action = "update" if workflow_id else "create"
+            if self.dry_run:
+                log_info(f"[DRY RUN] Would {action}: {name}")
+                return True
+            try:
+                if workflow_id:
+                    response = await self.api(
+                        "PUT", f"/workflows/{workflow_id}", clean_for_push(workflow)
+                    )
+                else:
+                    response = await self.api("POST", "/workflows", clean_for_push(workflow))
+            except Exception as e:
+                log_error(f"Failed to {action} {name}: {e}")
+                return False
+            self._record(name, response["id"], local_hash, response.get("updatedAt"))
+            log_info(f"{action.capitalize()}d: {name} (ID: {response['id']})")
+            return True
+
+        log_info(f"Pushing {len(pending)} workflow(s), {skipped} unchanged...")
+        with self.timer.phase("push"):
+            results = await asyncio.gather(*(push_one(name) for name in pending))
+
+        failed = results.count(False)
+        log_info(f"Push complete: {results.count(True)} succeeded, {failed} failed, {skipped} skipped")
+        return failed == 0
+
+    async def cmd_pull(self, name: str | None = None, pull_all: bool = False, force: bool = False) -> bool:
+        remote = await self.remote_workflows()
+        log_info(f"Found {len(remote)} remote workflow(s)")
+        local = self.local_workflows()
+
+        if name:
+            selected = [workflow for workflow in remote if workflow["name"] == name]
+            if not selected:
+                log_error(f"Workflow not found: {name}")
+                return False
+        elif pull_all:
+            log_warn("Pulling ALL remote workflows (including unmanaged)")
+            selected = remote
+        else:
+            log_info("Pulling only workflows managed by this repo...")
+            selected = [workflow for workflow in remote if workflow["name"] in local]
+            log_info(f"Skipped {len(remote) - len(selected)} unmanaged workflow(s)")
+
+        def unchanged(workflow: dict[str, Any]) -> bool:
+            entry = self.manifest.get(workflow["name"])
+            if force or not entry or workflow["name"] not in local:
+                return False
+            _, local_workflow = local[workflow["name"]]
+            return (
+                entry["id"] == workflow["id"]
+                and entry["updatedAt"] == workflow.get("updatedAt")
+                and entry["hash"] == content_hash(local_workflow)
+            )
+
+        pending = [workflow for workflow in selected if not unchanged(workflow)]
+        skipped = len(selected) - len(pending)
+
+        async def pull_one(summary: dict[str, Any]) -> bool:
+            workflow_name = summary["name"]
+            path = (
+                local[workflow_name][0]
+                if workflow_name in local
+                else WORKFLOWS_DIR / f"{name_to_filename(workflow_name)}.json"
+            )
+            if self.dry_run:
+                log_info(f"[DRY RUN] Would save: {workflow_name} -> {path.name}")
+                return True
+            try:
+                workflow = await self.api("GET", f"/workflows/{summary['id']}")
+            except Exception as e:
+                log_error(f"Failed to fetch {workflow_name}: {e}")
+                return False
+            workflow = clean_for_save(workflow)
+            write_workflow(path, workflow)
+            self._record(
+                workflow_name, workflow["id"], content_hash(workflow), workflow.get("updatedAt")
+            )
+            log_info(f"Saved: {workflow_name} -> {path.name}")
+            return True
+
+        WORKFLOWS_DIR.mkdir(exist_ok=True)
+        with self.timer.phase("pull"):
+            results = await asyncio.gather(*(pull_one(workflow) for workflow in pending))
+
+        failed = results.count(False)
+        log_info(f"Pull complete: {results.count(True)} saved, {failed} failed, {skipped} unchanged")
+        return failed == 0
+
+    async def cmd_diff(self) -> bool:
+        log_info("Comparing local and remote workflows...")
+        remote = {workflow["name"]: workflow for workflow in await self.remote_workflows()}
+        local = self.local_workflows()
+
+        def state(name: str) -> str:
+            entry = self.manifest.get(name)
+            if not entry:
+                return "unknown (never synced)"
+            changes = []
+            if entry["hash"] != content_hash(local[name][1]):
+                changes.append("local changes")
+            if entry["updatedAt"] != remote[name].get("updatedAt"):
+                changes.append("remote changes")
+            return ", ".join(changes) or "in sync"
+
+        print()
+        print(f"{CYAN}Local only (will be created on push):{NC}")
+        for name in local:
+            if name not in remote:
+                print(f"  + {name}")
+
+        print()
+        print(f"{CYAN}Synced (exist in both local and remote):{NC}")
+        for name in local:
+            if name in remote:
+                print(f"  = {name}  [{state(name)}]")
+
+        print()
+        print(f"{CYAN}Unmanaged (remote only, not tracked by this repo):{NC}")
+        for name in remote:
+            if name not in local:
+                print(f"  · {name}")
+
+        print()
+        log_info("Only workflows in 'Local only' and 'Synced' are managed by this repo")
+        return True
+
+    async def cmd_list(self) -> bool:
+        log_info(f"Workflows on {self.base_url}:")
+        print()
+        remote = await self.remote_workflows()
+        local = self.local_workflows()
+        for workflow in remote:
+            active = "✓" if workflow.get("active") else "○"
+            managed = f"{GREEN}[managed]{NC}" if workflow["name"] in local else ""
+            print(f"  {workflow['id']:<8} {active}  {workflow['name']:<40} {managed}")
+        print()
+        managed_count = sum(1 for workflow in remote if workflow["name"] in local)
+        log_info(f"Total: {len(remote)} workflow(s), {managed_count} managed by this repo")
+        return True
+
+
+async def run(args: argparse.Namespace) -> bool:
+    base_url = os.environ.get("N8N_URL", "https://workflows.marcellolab.com")
+    token = os.environ.get("N8N_TOKEN")
+    if not token:
+        log_error("N8N_TOKEN must be set in environment or .env file")
+        return False
+
+    dry_run = os.environ.get("DRY_RUN", "false").lower() == "true"
+    if dry_run:
+        log_warn("DRY RUN mode - no changes will be made")
+
+    async with N8NSync(base_url, token, dry_run=dry_run) as sync:
+        log_info(f"Server: {base_url}")
+        if args.command == "push":
+            files = [
+                Path(arg) if Path(arg).is_absolute() else WORKFLOWS_DIR / arg
+                for arg in args.targets
+            ]
+            ok = await sync.cmd_push(files or None, force=args.force)
+        elif args.command == "pull":
+            name = " ".join(args.targets) or None
+            ok = await sync.cmd_pull(name, pull_all=args.all, force=args.force)
+        elif args.command == "diff":
+            ok = await sync.cmd_diff()
+        else:
+            ok = await sync.cmd_list()
+
+        sync.save_manifest()
+        log_info(f"Timing: {sync.timer.summary()}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Sync this repo's workflows with n8n",
+        epilog="Only workflows defined in workflows/ are synced; others are not affected.",
+    )
+    parser.add_argument("command", nargs="?", default="push", choices=["push", "pull", "diff", "list"])
+    parser.add_argument("targets", nargs="*", help="push: workflow files; pull: workflow name")
+    parser.add_argument("--all", action="store_true", help="pull: include unmanaged workflows")
+    parser.add_argument("--force", action="store_true", help="Ignore the manifest and sync everything")
+    args = parser.parse_args()
+
+    # scripts/.env takes precedence over the repo root .env, as in n8n-sync.sh
+    for env_file in (REPO_ROOT / "scripts" / ".env", REPO_ROOT / ".env"):
+        load_dotenv(env_file)
+
+    sys.exit(0 if asyncio.run(run(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+"""
+Replay a recorded traffic trace against a local stand-in for n8n.
+
+The trace comes from a bot run with TRAFFIC_TRACE set. Its n8n responses
+are served by a local webhook server, after each call's recorded latency
+unless --no-latency. Its slash commands are replayed through the cogs
+with stand-in interactions (no Discord connection), at the recorded pace
+scaled by --speed, or all at once with --speed max. Reports per-command
+latency percentiles and error rates, the n8n calls served and the
+process's memory growth.
+
+Usage:
+    python -m src.replay trace.jsonl[.gz] [--speed 1|10|max] [--no-latency]
+"""
+import argparse
+import asyncio
+import dataclasses
+import gc
+import inspect
+import logging
+import tempfile
+import time
+import typing
+from collections import defaultdict, deque
+from itertools import count
+
+from aiohttp import web
+from discord import app_commands
+
+from .bench_memory import rss_bytes
+from .bot import MarcelloBot
+from .commands import AVAILABLE_COGS
+from .config import Config
+from .services.codec import default_codec
+from .services.traffic import read_trace, unredact_option
+
+logger = logging.getLogger("marcellobot.replay")
+
+# Admin-only commands are left out of replays
+SKIPPED_COGS = {"settings"}
+MEMORY_SAMPLE_INTERVAL = 0.5
+_ids = count(1)
+
+
+class StandInN8N:
+    """
+    Serves recorded webhook responses, per webhook in recorded order.
+
+    A request carrying a product URL gets the next response recorded for
+    that URL when there is one. Once a webhook's recordings run out they
+    are served again from the start.
+    """
+
+    def __init__(self, calls: list[dict], latency: bool = True):
+        self.latency = latency
+        self.codec = default_codec()
+        self.recorded: dict[str, list[dict]] = defaultdict(list)
+        for call in calls:
+            self.recorded[call["webhook"]].append(call)
+        self.queues = {webhook: deque(items) for webhook, items in self.recorded.items()}
+        self.served: defaultdict[str, int] = defaultdict(int)
+        self.missing: defaultdict[str, int] = defaultdict(int)
+        self._runner: web.AppRunner | None = None
+
+    def _next(self, webhook: str, key: str | None) -> dict | None:
+        if webhook not in self.recorded:
+            return None
+        queue = self.queues[webhook]
+        if not queue:
+            queue.extend(self.recorded[webhook])
+        if key:
+            for call in queue:
+                if call.get("key") == key:
+                    queue.remove(call)
+                    return call
+        return queue.popleft()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        webhook = request.match_info["path"]
+        key = None
+        if request.can_read_body:
+            try:
+                payload = self.codec.loads(await request.read())
+                key = payload.get("url") if isinstance(payload, dict) else None
+            except ValueError:
+                pass
+        call = self._next(webhook, key)
+        if call is None:
+            self.missing[webhook] += 1
+            return web.json_response({"message": f"{webhook} is not in the trace"}, status=404)
+        self.served[webhook] += 1
+        if self.latency:
+            await asyncio.sleep(call["ms"] / 1000)
+        if "status" in call:
+            return web.Response(
+                status=call["status"], body=call["response"].encode(), content_type=call["content_type"]
+            )
+        return web.Response(body=self.codec.dumps(call["response"]), content_type="application/json")
+
+    async def start(self) -> str:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_route("*", "/webhook/{path:.+}", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+
+class ReplayMessage:
+    def __init__(self, channel: "ReplayChannel | None" = None):
+        self.id = next(_ids)
+        self.channel = channel
+
+    async def edit(self, **kwargs):
+        return self
+
+
+class ReplayChannel:
+    def __init__(self, name: str):
+        self.id = next(_ids)
+        self.name = name
+        self.sent = 0
+
+    async def send(self, *args, **kwargs) -> ReplayMessage:
+        self.sent += 1
+        return ReplayMessage(self)
+
+
+class ReplayGuild:
+    def __init__(self, guild_id: int):
+        self.id = guild_id
+        self.text_channels: list[ReplayChannel] = []
+
+    async def create_text_channel(self, name: str) -> ReplayChannel:
+        channel = ReplayChannel(name)
+        self.text_channels.append(channel)
+        return channel
+
+
+class ReplayUser:
+    def __init__(self, user_id: int):
+        self.id = user_id
+        self.mention = f"<@{user_id}>"
+
+    def __str__(self) -> str:
+        return f"user{self.id}"
+
+
+class ReplayResponse:
+    def __init__(self, interaction: "ReplayInteraction"):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def defer(self, **kwargs):
+        self._done = True
+
+    async def send_message(self, *args, **kwargs):
+        self._done = True
+        self.interaction.replied()
+
+
+class ReplayFollowup:
+    def __init__(self, interaction: "ReplayInteraction"):
+        self.interaction = interaction
+
+    async def send(self, *args, **kwargs) -> ReplayMessage:
+        self.interaction.replied()
+        return ReplayMessage()
+
+
+class ReplayInteraction:
+    """The parts of discord.Interaction the cogs use, timing the first reply."""
+
+    def __init__(self, guild: ReplayGuild | None, user: ReplayUser):
+        self.guild = guild
+        self.guild_id = guild.id if guild else None
+        self.user = user
+        self.response = ReplayResponse(self)
+        self.followup = ReplayFollowup(self)
+        self.started = time.perf_counter()
+        self.first_reply: float | None = None
+
+    def replied(self):
+        if self.first_reply is None:
+            self.first_reply = time.perf_counter() - self.started
+
+    async def edit_original_response(self, **kwargs):
+        self.replied()
+        return ReplayMessage()
+
+
+@dataclasses.dataclass
+class CommandStats:
+    latencies: list[float] = dataclasses.field(default_factory=list)
+    first_replies: list[float] = dataclasses.field(default_factory=list)
+    errors: int = 0
+
+    def percentile(self, p: float, values: list[float] | None = None) -> float | None:
+        values = sorted(self.latencies if values is None else values)
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def find_command(bot: MarcelloBot, name: str) -> app_commands.Command | None:
+    command = bot.tree.get_command(name.split(" ")[0])
+    for part in name.split(" ")[1:]:
+        command = command.get_command(part) if isinstance(command, app_commands.Group) else None
+    return command if isinstance(command, app_commands.Command) else None
+
+
+def call_arguments(command: app_commands.Command, options: dict) -> dict:
+    """Recorded option values as the callback takes them, defaults filled in."""
+    arguments = {}
+    choices = {parameter.name: parameter.choices for parameter in command.parameters}
+    for name, parameter in inspect.signature(command.callback).parameters.items():
+        if name in ("self", "interaction"):
+            continue
+        if name in options:
+            value = unredact_option(options[name])
+            if typing.get_origin(parameter.annotation) is app_commands.Choice:
+                value = next(
+                    (choice for choice in choices.get(name) or [] if choice.value == value),
+                    app_commands.Choice(name=str(value), value=value),
+                )
+            arguments[name] = value
+        elif parameter.default is not inspect.Parameter.empty:
+            arguments[name] = parameter.default
+    return arguments
+
+
+async def replay_command(
+    bot: MarcelloBot,
+    event: dict,
+    guilds: dict[int, ReplayGuild],
+    stats: defaultdict[str, CommandStats],
+):
+    name = event["command"]
+    command = find_command(bot, name)
+    entry = stats[name]
+    if command is None:
+        entry.errors += 1
+        return
+    guild = None
+    if event.get("guild") is not None:
+        guild = guilds.setdefault(event["guild"], ReplayGuild(event["guild"]))
+    interaction = ReplayInteraction(guild, ReplayUser(event.get("user") or 0))
+    route_stats = bot.routes.stats.get(name)
+    errors_before = route_stats.errors if route_stats else 0
+    try:
+        await command.callback(
+            command.binding, interaction, **call_arguments(command, event.get("options") or {})
+        )
+    except Exception as e:
+        logger.debug(f"/{name} raised {e!r}")
+        entry.errors += 1
+    else:
+        # Routed commands report failures (n8n errors, timeouts) to the executor
+        route_stats = bot.routes.stats.get(name)
+        if route_stats and route_stats.errors > errors_before:
+            entry.errors += 1
+    entry.latencies.append(time.perf_counter() - interaction.started)
+    if interaction.first_reply is not None:
+        entry.first_replies.append(interaction.first_reply)
+
+
+async def sample_memory(samples: list[int]):
+    while True:
+        samples.append(rss_bytes())
+        await asyncio.sleep(MEMORY_SAMPLE_INTERVAL)
+
+
+def replay_config(base_url: str, data_dir: str) -> Config:
+    """Settings for an offline bot: no background polling, reloads or snapshots."""
+    return Config(
+        discord_token="",
+        n8n_base_url=base_url,
+        data_dir=data_dir,
+        status_poll_interval=0,
+        watch_sync_interval=0,
+        config_reload_interval=0,
+        snapshot_max_age=0,
+    )
+
+
+def ms(seconds: float | None) -> str:
+    return "-" if seconds is None else f"{seconds * 1000:.0f}"
+
+
+async def run(args) -> int:
+    events = list(read_trace(args.trace))
+    if not events or events[0].get("type") != "trace":
+        raise SystemExit(f"{args.trace} is not a traffic trace")
+    commands_ = [event for event in events if event["type"] == "command"]
+    calls = [event for event in events if event["type"] == "n8n"]
+    speed = None if args.speed == "max" else float(args.speed)
+
+    n8n = StandInN8N(calls, latency=not args.no_latency)
+    base_url = await n8n.start()
+    bot = MarcelloBot(replay_config(base_url, tempfile.mkdtemp(prefix="replay-")))
+    # Gives the bot its event loop without logging in
+    await bot._async_setup_hook()
+    for name in AVAILABLE_COGS:
+        if name not in SKIPPED_COGS:
+            await bot.load_cog(name)
+
+    print(
+        f"Replaying {len(commands_)} command(s) and {len(calls)} recorded n8n call(s) "
+        f"at {'max' if speed is None else f'{speed:g}x'} speed"
+        + (" without n8n latency" if args.no_latency else "")
+        + "\n"
+    )
+    gc.collect()
+    memory: list[int] = [rss_bytes()]
+    sampler = asyncio.create_task(sample_memory(memory))
+    stats: defaultdict[str, CommandStats] = defaultdict(CommandStats)
+    guilds: dict[int, ReplayGuild] = {}
+    tasks = []
+    started = time.perf_counter()
+    for event in commands_:
+        if speed is not None:
+            delay = event["t"] / speed - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(replay_command(bot, event, guilds, stats)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    sampler.cancel()
+    gc.collect()
+    memory.append(rss_bytes())
+
+    print(
+        f"{'command':<22} {'count':>6} {'errors':>7} {'p50 ms':>7} {'p95 ms':>7} "
+        f"{'p99 ms':>7} {'max ms':>7} {'reply p50':>9}"
+    )
+    for name, entry in sorted(stats.items()):
+        total = len(entry.latencies) or entry.errors
+        print(
+            f"{'/' + name:<22} {total:>6} {100 * entry.errors / total:>6.1f}% "
+            f"{ms(entry.percentile(50)):>7} {ms(entry.percentile(95)):>7} "
+            f"{ms(entry.percentile(99)):>7} {ms(entry.percentile(100)):>7} "
+            f"{ms(entry.percentile(50, entry.first_replies)):>9}"
+        )
+    print(
+        f"\n{len(commands_)} command(s) in {elapsed:.1f}s; n8n served "
+        f"{sum(n8n.served.values())} call(s)"
+        + (
+            ", not in trace: " + ", ".join(f"{w} x{n}" for w, n in sorted(n8n.missing.items()))
+            if n8n.missing
+            else ""
+        )
+    )
+    print(
+        f"Memory: {memory[0] / 2**20:.1f} MB before, {max(memory) / 2**20:.1f} MB peak, "
+        f"{memory[-1] / 2**20:.1f} MB after ({(memory[-1] - memory[0]) / 2**20:+.1f} MB)"
+    )
+
+    await bot.close()
+    await n8n.stop()
+    return sum(entry.errors for entry in stats.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded traffic trace")
+    parser.add_argument("trace", help="Trace file written with TRAFFIC_TRACE")
+    parser.add_argument(
+        "--speed", default="1", help="Pace relative to the recording (1, 10, ...) or max"
+    )
+    parser.add_argument(
+        "--no-latency", action="store_true", help="Answer at once instead of at recorded latency"
+    )
+    args = parser.parse_args()
+    if args.speed != "max":
+        try:
+            if float(args.speed) <= 0:
+                raise ValueError
+        except ValueError:
+            parser.error("--speed must be a positive number or max")
+    logging.getLogger("marcellobot").setLevel(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
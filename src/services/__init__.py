@@ -1,3 +1,54 @@
-from .n8n import N8NClient
+from .admission import AdmissionController, AdmissionRejected
+from .catalog import NameIndex, WebhookCatalog
+from .cluster import ClusterIPC
+from .config_watch import ConfigWatcher
+from .github import GitHubClient, GitHubError
+from .health import HealthMonitor
+from .health_history import HealthHistory
+from .home import HomeBatcher, HomeRegistry
+from .n8n import N8NClient, WebhookBody
+from .ollama import Generation, OllamaBusy, OllamaClient, OllamaError
+from .politeness import HostBusy, HostPolicy, HostScheduler
+from .price_history import PriceHistory
+from .products import ProductCatalog
+from .recipe_book import CommitResult, ParsedRecipe, RecipeBook
+from .recipe_search import RecipeSearchIndex
+from .restock import AdaptivePoller
+from .snapshot import SnapshotStore
+from .traffic import TrafficRecorder
+from .watches import WatchEntry, WatchStore
 
-__all__ = ["N8NClient"]
+__all__ = [
+    "AdaptivePoller",
+    "AdmissionController",
+    "AdmissionRejected",
+    "ClusterIPC",
+    "CommitResult",
+    "ConfigWatcher",
+    "GitHubClient",
+    "GitHubError",
+    "Generation",
+    "HealthHistory",
+    "HealthMonitor",
+    "HomeBatcher",
+    "HomeRegistry",
+    "HostBusy",
+    "HostPolicy",
+    "HostScheduler",
+    "N8NClient",
+    "NameIndex",
+    "OllamaBusy",
+    "OllamaClient",
+    "OllamaError",
+    "ParsedRecipe",
+    "PriceHistory",
+    "ProductCatalog",
+    "RecipeBook",
+    "RecipeSearchIndex",
+    "SnapshotStore",
+    "TrafficRecorder",
+    "WatchEntry",
+    "WatchStore",
+    "WebhookBody",
+    "WebhookCatalog",
+]
@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+logger = logging.getLogger("marcellobot.admission")
+
+# Recent waits kept for the wait-time percentiles in metrics()
+WAIT_SAMPLES = 1000
+
+QueuedCallback = Callable[[int], Awaitable[None]]
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request can't even be queued (too many already waiting)."""
+
+
+@dataclass(eq=False)
+class _Waiter:
+    webhook: str
+    guild_id: int | None
+    user_id: int | None
+    webhook_limit: int | None
+    future: asyncio.Future
+    enqueued_at: float
+    on_queued: QueuedCallback | None = None
+    position: int = 0
+
+
+class AdmissionController:
+    """
+    Concurrency caps for webhook calls: global, per webhook, per guild and per user.
+
+    A request that fits under every cap starts immediately. Otherwise it
+    waits in its guild's queue; when a slot frees, guilds are served
+    round-robin (FIFO within a guild), so one busy guild or one user can't
+    starve everyone else. Waiters are told their position as it changes.
+    """
+
+    def __init__(
+        self,
+        global_limit: int = 16,
+        guild_limit: int | None = 4,
+        user_limit: int | None = 2,
+        webhook_limits: dict[str, int] | None = None,
+        max_queued_per_user: int = 5,
+    ):
+        self.global_limit = global_limit
+        self.guild_limit = guild_limit
+        self.user_limit = user_limit
+        self.webhook_limits = webhook_limits or {}
+        self.max_queued_per_user = max_queued_per_user
+
+        self.in_flight = 0
+        self._by_webhook: Counter[str] = Counter()
+        self._by_guild: Counter[int | None] = Counter()
+        self._by_user: Counter[int | None] = Counter()
+        # guild -> waiting requests; iteration order is the round-robin rotation
+        self._queues: OrderedDict[int | None, deque[_Waiter]] = OrderedDict()
+
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self._waits: deque[float] = deque(maxlen=WAIT_SAMPLES)
+
+    def configure(
+        self,
+        global_limit: int,
+        guild_limit: int | None,
+        user_limit: int | None,
+        webhook_limits: dict[str, int],
+        max_queued_per_user: int,
+    ):
+        """Change the caps in place; waiters that now fit are admitted right away."""
+        self.global_limit = global_limit
+        self.guild_limit = guild_limit
+        self.user_limit = user_limit
+        self.webhook_limits = webhook_limits
+        self.max_queued_per_user = max_queued_per_user
+        # Lowered caps take effect as calls finish; nothing in flight is cut off
+        self._dispatch()
+
+    @property
+    def depth(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _webhook_limit(self, waiter: _Waiter) -> int | None:
+        limits = [
+            limit
+            for limit in (waiter.webhook_limit, self.webhook_limits.get(waiter.webhook))
+            if limit
+        ]
+        return min(limits) if limits else None
+
+    def _fits(self, waiter: _Waiter) -> bool:
+        webhook_limit = self._webhook_limit(waiter)
+        return (
+            self.in_flight < self.global_limit
+            and (webhook_limit is None or self._by_webhook[waiter.webhook] < webhook_limit)
+            and (
+                self.guild_limit is None
+                or waiter.guild_id is None
+                or self._by_guild[waiter.guild_id] < self.guild_limit
+            )
+            and (
+                self.user_limit is None
+                or waiter.user_id is None
+                or self._by_user[waiter.user_id] < self.user_limit
+            )
+        )
+
+    def _take(self, waiter: _Waiter):
+        self.in_flight += 1
+        self._by_webhook[waiter.webhook] += 1
+        self._by_guild[waiter.guild_id] += 1
+        self._by_user[waiter.user_id] += 1
+        self.admitted += 1
+        self._waits.append(time.monotonic() - waiter.enqueued_at)
+
+    def _release(self, waiter: _Waiter):
+        self.in_flight -= 1
+        for counter, key in (
+            (self._by_webhook, waiter.webhook),
+            (self._by_guild, waiter.guild_id),
+            (self._by_user, waiter.user_id),
+        ):
+            counter[key] -= 1
+            if counter[key] <= 0:
+                del counter[key]
+
+    def _dispatch(self):
+        """Admit waiters round-robin across guilds until nothing else fits."""
+        progress = True
+        while progress and self._queues:
+            progress = False
+            for guild_id in list(self._queues):
+                queue = self._queues[guild_id]
+                for waiter in queue:
+                    if self._fits(waiter):
+                        queue.remove(waiter)
+                        self._take(waiter)
+                        waiter.future.set_result(None)
+                        # Served this round; go to the back of the rotation
+                        self._queues.move_to_end(guild_id)
+                        progress = True
+                        break
+                if not queue:
+                    del self._queues[guild_id]
+        self._update_positions()
+
+    def _update_positions(self):
+        """Recompute each waiter's place in the round-robin order and notify changes."""
+        position = 0
+        round_index = 0
+        remaining = self.depth
+        while remaining:
+            for queue in self._queues.values():
+                if round_index < len(queue):
+                    waiter = queue[round_index]
+                    position += 1
+                    remaining -= 1
+                    if waiter.position != position:
+                        waiter.position = position
+                        if waiter.on_queued:
+                            asyncio.create_task(self._notify(waiter, position))
+            round_index += 1
+
+    @staticmethod
+    async def _notify(waiter: _Waiter, position: int):
+        try:
+            await waiter.on_queued(position)
+        except Exception as e:
+            logger.debug(f"Queue position callback failed: {e}")
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        webhook: str,
+        guild_id: int | None = None,
+        user_id: int | None = None,
+        webhook_limit: int | None = None,
+        on_queued: QueuedCallback | None = None,
+    ):
+        """Hold one admission slot for the duration of the block."""
+        waiter = _Waiter(
+            webhook,
+            guild_id,
+            user_id,
+            webhook_limit,
+            asyncio.get_running_loop().create_future(),
+            time.monotonic(),
+            on_queued,
+        )
+
+        if not self._queues and self._fits(waiter):
+            self._take(waiter)
+        else:
+            queued_by_user = sum(
+                1
+                for queue in self._queues.values()
+                for other in queue
+                if user_id is not None and other.user_id == user_id
+            )
+            if queued_by_user >= self.max_queued_per_user:
+                self.rejected += 1
+                raise AdmissionRejected(
+                    f"You already have {queued_by_user} requests waiting; try again shortly."
+                )
+
+            self.queued += 1
+            self._queues.setdefault(guild_id, deque()).append(waiter)
+            self._dispatch()
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                if waiter.future.done() and not waiter.future.cancelled():
+                    # Admitted just as we were cancelled; give the slot back
+                    self._release(waiter)
+                else:
+                    queue = self._queues.get(guild_id)
+                    if queue and waiter in queue:
+                        queue.remove(waiter)
+                        if not queue:
+                            del self._queues[guild_id]
+                self._dispatch()
+                raise
+
+        try:
+            yield
+        finally:
+            self._release(waiter)
+            self._dispatch()
+
+    def metrics(self) -> dict:
+        waits = sorted(self._waits)
+
+        def percentile(p: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(p / 100 * len(waits)))] * 1000, 1)
+
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.depth,
+            "queue_by_guild": {
+                str(guild_id): len(queue) for guild_id, queue in self._queues.items()
+            },
+            "in_flight_by_webhook": dict(self._by_webhook),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "wait_ms_p50": percentile(50),
+            "wait_ms_p95": percentile(95),
+            "wait_ms_max": round(waits[-1] * 1000, 1) if waits else 0.0,
+        }
@@ -0,0 +1,219 @@
+import asyncio
+import bisect
+import difflib
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Iterable
+
+import aiohttp
+
+logger = logging.getLogger("marcellobot.catalog")
+
+
+class NameIndex:
+    """
+    Sorted, case-insensitive index of names for autocomplete.
+
+    Prefix matches come from a binary search over the sorted keys, followed
+    by substring matches and finally close (typo-tolerant) matches.
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._names: frozenset[str] = frozenset()
+        self._keys: list[str] = []
+        self._originals: dict[str, str] = {}
+        self.update(names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self._originals
+
+    def update(self, names: Iterable[str]):
+        """Replace the indexed names, rebuilding only if they changed."""
+        names = frozenset(name for name in names if name)
+        if names == self._names:
+            return
+        self._names = names
+        self._originals = {name.lower(): name for name in sorted(names)}
+        self._keys = sorted(self._originals)
+
+    def add(self, names: Iterable[str]):
+        self.update(self._names | {name for name in names if name})
+
+    def search(self, query: str, limit: int = 25) -> list[str]:
+        query = query.strip().lower()
+        if not query:
+            return [self._originals[key] for key in self._keys[:limit]]
+
+        matches: list[str] = []
+        start = bisect.bisect_left(self._keys, query)
+        for key in self._keys[start:]:
+            if not key.startswith(query) or len(matches) >= limit:
+                break
+            matches.append(key)
+
+        if len(matches) < limit:
+            seen = set(matches)
+            matches.extend(key for key in self._keys if query in key and key not in seen)
+        if len(matches) < limit:
+            seen = set(matches)
+            matches.extend(
+                key
+                for key in difflib.get_close_matches(query, self._keys, n=limit, cutoff=0.6)
+                if key not in seen
+            )
+        return [self._originals[key] for key in matches[:limit]]
+
+
+class RefreshingCatalog:
+    """
+    Base for name catalogs that are read from memory and refreshed lazily.
+
+    `refresh_if_stale` is cheap enough to call from an autocomplete handler:
+    it only schedules a background refresh once the cache is older than
+    `ttl` seconds, and never runs two at once.
+    """
+
+    def __init__(self, ttl: float = 600):
+        self.ttl = ttl
+        self.index = NameIndex()
+        self._refreshed_at = 0.0
+        self._refresh_task: asyncio.Task | None = None
+
+    async def refresh(self):
+        raise NotImplementedError
+
+    def invalidate(self):
+        """Make the next `refresh_if_stale` refresh, e.g. after the source moved."""
+        self._refreshed_at = 0.0
+
+    def refresh_if_stale(self):
+        if time.monotonic() - self._refreshed_at < self.ttl:
+            return
+        if self._refresh_task and not self._refresh_task.done():
+            return
+        self._refreshed_at = time.monotonic()
+        self._refresh_task = asyncio.create_task(self._safe_refresh())
+
+    async def _safe_refresh(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.warning(f"Failed to refresh {type(self).__name__}: {e}")
+
+    def suggest(self, query: str, limit: int = 25) -> list[str]:
+        return self.index.search(query, limit)
+
+    def snapshot(self) -> dict:
+        # The refresh clock is monotonic; carry its age across processes
+        return {
+            "names": self.index.search("", len(self.index)),
+            "age": time.monotonic() - self._refreshed_at if self._refreshed_at else None,
+        }
+
+    def restore(self, data: dict):
+        self.index.add(data["names"])
+        if data["age"] is not None:
+            self._refreshed_at = time.monotonic() - data["age"]
+
+
+def local_webhook_paths(workflows_dir: Path) -> dict[str, str]:
+    """Map webhook path -> workflow name from the Webhook nodes in `workflows/*.json`."""
+    paths = {}
+    for path in sorted(workflows_dir.glob("*.json")):
+        try:
+            workflow = json.loads(path.read_text())
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Skipping unreadable workflow {path}: {e}")
+            continue
+        paths.update(_webhook_paths(workflow))
+    return paths
+
+
+def _webhook_paths(workflow: dict) -> dict[str, str]:
+    return {
+        node["parameters"]["path"]: workflow.get("name", "")
+        for node in workflow.get("nodes", [])
+        if node.get("type") == "n8n-nodes-base.webhook"
+        and node.get("parameters", {}).get("path")
+    }
+
+
+class WebhookCatalog(RefreshingCatalog):
+    """
+    Known webhook paths for /trigger autocomplete.
+
+    Paths are read from the repo's workflow files and, when an API token is
+    configured, from the active workflows on the n8n server. Paths that were
+    triggered successfully are remembered too.
+    """
+
+    def __init__(
+        self,
+        workflows_dir: str | Path,
+        base_url: str,
+        api_token: str | None = None,
+        ttl: float = 600,
+    ):
+        super().__init__(ttl)
+        self.workflows_dir = Path(workflows_dir)
+        self.base_url = base_url.rstrip("/")
+        self.api_token = api_token
+        self.labels: dict[str, str] = {}  # path -> workflow name
+        self._learned: set[str] = set()
+
+    async def refresh(self):
+        labels = await asyncio.to_thread(local_webhook_paths, self.workflows_dir)
+        if self.api_token:
+            try:
+                labels.update(await self._remote_webhook_paths())
+            except (aiohttp.ClientError, asyncio.TimeoutError, RuntimeError) as e:
+                logger.warning(f"Failed to list n8n workflows: {e}")
+
+        self.labels = labels
+        self.index.update(labels.keys() | self._learned)
+        logger.info(f"Webhook catalog has {len(self.index)} path(s)")
+
+    async def _remote_webhook_paths(self) -> dict[str, str]:
+        paths: dict[str, str] = {}
+        cursor = None
+        async with aiohttp.ClientSession(
+            headers={"X-N8N-API-KEY": self.api_token},
+            timeout=aiohttp.ClientTimeout(total=30),
+        ) as session:
+            while True:
+                params = {"active": "true", "limit": 250}
+                if cursor:
+                    params["cursor"] = cursor
+                async with session.get(
+                    f"{self.base_url}/api/v1/workflows", params=params
+                ) as resp:
+                    if resp.status >= 400:
+                        raise RuntimeError(f"HTTP {resp.status}")
+                    page = await resp.json(content_type=None)
+                for workflow in page.get("data") or []:
+                    paths.update(_webhook_paths(workflow))
+                cursor = page.get("nextCursor")
+                if not cursor:
+                    return paths
+
+    def learn(self, path: str):
+        if path not in self.index:
+            self._learned.add(path)
+            self.index.add([path])
+
+    def snapshot(self) -> dict:
+        return {**super().snapshot(), "labels": self.labels, "learned": sorted(self._learned)}
+
+    def restore(self, data: dict):
+        super().restore(data)
+        self.labels = data["labels"]
+        self._learned.update(data["learned"])
+
+    def label(self, path: str) -> str:
+        name = self.labels.get(path)
+        return f"{path} ({name})" if name else path
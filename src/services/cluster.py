@@ -0,0 +1,157 @@
+import asyncio
+import hmac
+import json
+import logging
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger("marcellobot.cluster")
+
+# Replies such as `stats` grow with the number of hosts and lanes tracked;
+# asyncio's default 64 KiB line limit is too small for them
+LINE_LIMIT = 16 * 1024 * 1024
+
+Handler = Callable[[dict[str, Any]], Awaitable[Any]]
+
+
+def shard_groups(shard_count: int, cluster_count: int) -> list[list[int]]:
+    """Split shard IDs into contiguous, near-equal groups, one per cluster."""
+    base, extra = divmod(shard_count, cluster_count)
+    groups, start = [], 0
+    for cluster_id in range(cluster_count):
+        size = base + (1 if cluster_id < extra else 0)
+        groups.append(list(range(start, start + size)))
+        start += size
+    return groups
+
+
+class ClusterIPC:
+    """
+    Local request/response channel between cluster processes.
+
+    Each cluster listens on `base_port + cluster_id` on localhost and speaks
+    one JSON object per line: requests are `{"op": ..., "data": ..., "token": ...}`
+    and replies are `{"ok": true, "result": ...}` or `{"ok": false, "error": ...}`.
+    Any local process can connect, so a request whose token doesn't match the
+    one the launcher handed every cluster is refused and its connection closed.
+    """
+
+    def __init__(
+        self,
+        cluster_id: int,
+        cluster_count: int,
+        base_port: int,
+        token: str,
+        host: str = "127.0.0.1",
+    ):
+        if not token:
+            raise ValueError("ClusterIPC needs a token")
+        self.cluster_id = cluster_id
+        self.cluster_count = cluster_count
+        self.base_port = base_port
+        self.token = token
+        self.host = host
+        self.handlers: dict[str, Handler] = {}
+        self._server: asyncio.AbstractServer | None = None
+
+    def register(self, op: str, handler: Handler):
+        self.handlers[op] = handler
+
+    def unregister(self, op: str):
+        self.handlers.pop(op, None)
+
+    async def start(self):
+        self._server = await asyncio.start_server(
+            self._handle_connection,
+            self.host,
+            self.base_port + self.cluster_id,
+            limit=LINE_LIMIT,
+        )
+        logger.info(
+            f"Cluster {self.cluster_id} IPC listening on "
+            f"{self.host}:{self.base_port + self.cluster_id}"
+        )
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _dispatch(self, op: str, data: dict[str, Any]) -> Any:
+        handler = self.handlers.get(op)
+        if handler is None:
+            raise ValueError(f"Unknown IPC op: {op}")
+        return await handler(data)
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    request = None
+                if not self._authorized(request):
+                    logger.warning("Refused an IPC request without a valid token")
+                    writer.write(json.dumps({"ok": False, "error": "unauthorized"}).encode() + b"\n")
+                    await writer.drain()
+                    return
+                try:
+                    result = await self._dispatch(request["op"], request.get("data") or {})
+                    reply = {"ok": True, "result": result}
+                except Exception as e:
+                    reply = {"ok": False, "error": str(e)}
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def _authorized(self, request: Any) -> bool:
+        token = request.get("token") if isinstance(request, dict) else None
+        return isinstance(token, str) and hmac.compare_digest(
+            token.encode(), self.token.encode()
+        )
+
+    async def request(
+        self,
+        cluster_id: int,
+        op: str,
+        data: dict[str, Any] | None = None,
+        timeout: float = 5.0,
+    ) -> Any:
+        """Run an op on another cluster (or locally) and return its result."""
+        if cluster_id == self.cluster_id:
+            return await self._dispatch(op, data or {})
+
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(
+                self.host, self.base_port + cluster_id, limit=LINE_LIMIT
+            ),
+            timeout,
+        )
+        try:
+            request = {"op": op, "data": data or {}, "token": self.token}
+            writer.write(json.dumps(request).encode() + b"\n")
+            await writer.drain()
+            reply = json.loads(await asyncio.wait_for(reader.readline(), timeout))
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+        if not reply.get("ok"):
+            raise RuntimeError(f"Cluster {cluster_id} {op} failed: {reply.get('error')}")
+        return reply.get("result")
+
+    async def broadcast(
+        self, op: str, data: dict[str, Any] | None = None, timeout: float = 5.0
+    ) -> dict[int, Any]:
+        """Run an op on every cluster; failed clusters map to their exception."""
+        results = await asyncio.gather(
+            *(
+                self.request(cluster_id, op, data, timeout)
+                for cluster_id in range(self.cluster_count)
+            ),
+            return_exceptions=True,
+        )
+        return dict(enumerate(results))
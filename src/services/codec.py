@@ -0,0 +1,59 @@
+import json
+import logging
+from typing import Any, Callable
+
+logger = logging.getLogger("marcellobot.codec")
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+
+class JSONCodec:
+    """A named pair of JSON encode (to bytes) / decode (from bytes or str) functions."""
+
+    def __init__(
+        self,
+        name: str,
+        dumps: Callable[[Any], bytes],
+        loads: Callable[[bytes | str], Any],
+    ):
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+
+    def __repr__(self) -> str:
+        return f"JSONCodec({self.name!r})"
+
+
+STDLIB_CODEC = JSONCodec(
+    "json",
+    lambda obj: json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode(),
+    json.loads,
+)
+
+ORJSON_CODEC = (
+    JSONCodec("orjson", lambda obj: orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS), orjson.loads)
+    if orjson
+    else None
+)
+
+
+def default_codec() -> JSONCodec:
+    """orjson when it is installed, the stdlib otherwise."""
+    return ORJSON_CODEC or STDLIB_CODEC
+
+
+def get_codec(name: str | None) -> JSONCodec:
+    """Look a codec up by name (`json`, `orjson`); empty means the default."""
+    if not name:
+        return default_codec()
+    if name == "orjson":
+        if ORJSON_CODEC is None:
+            logger.warning("orjson is not installed, falling back to json")
+            return STDLIB_CODEC
+        return ORJSON_CODEC
+    if name == "json":
+        return STDLIB_CODEC
+    raise ValueError(f"Unknown JSON codec '{name}' (use json or orjson)")
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+from pathlib import Path
+from typing import Awaitable, Callable
+
+logger = logging.getLogger("marcellobot.config_watch")
+
+
+class ConfigWatcher:
+    """
+    Polls config files and calls `on_change` when any of them changes.
+
+    Files are compared by modification time and size, so an edit, a
+    replace-by-rename or a deletion all count; a file that doesn't exist
+    yet is watched for being created.
+    """
+
+    def __init__(
+        self,
+        paths: list[Path],
+        on_change: Callable[[], Awaitable[None]],
+        interval: float = 10,
+    ):
+        self.paths = paths
+        self.on_change = on_change
+        self.interval = interval
+        self._seen = self._stamps()
+        self._task: asyncio.Task | None = None
+
+    def _stamps(self) -> dict[Path, tuple[int, int] | None]:
+        stamps = {}
+        for path in self.paths:
+            try:
+                stat = path.stat()
+            except OSError:
+                stamps[path] = None
+            else:
+                stamps[path] = (stat.st_mtime_ns, stat.st_size)
+        return stamps
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self._run(), name="config-watcher")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def check(self) -> bool:
+        """Call `on_change` if a file changed since the last check."""
+        stamps = await asyncio.to_thread(self._stamps)
+        if stamps == self._seen:
+            return False
+        self._seen = stamps
+        await self.on_change()
+        return True
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.warning(f"Config reload failed: {e}")
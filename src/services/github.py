@@ -0,0 +1,123 @@
+import aiohttp
+from typing import Any
+
+GITHUB_API_URL = "https://api.github.com"
+
+
+class GitHubError(Exception):
+    """Raised when a GitHub API call fails."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"GitHub API error {status}: {message}")
+        self.status = status
+
+
+class GitHubClient:
+    """Minimal client for the GitHub git data API (blobs, trees, commits, refs)."""
+
+    def __init__(
+        self,
+        token: str,
+        repo: str,
+        branch: str = "main",
+        api_url: str = GITHUB_API_URL,
+    ):
+        self.token = token
+        self.repo = repo
+        self.branch = branch
+        self.api_url = api_url.rstrip("/")
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.token}",
+            "Accept": "application/vnd.github+json",
+        }
+
+    def _url(self, endpoint: str) -> str:
+        return f"{self.api_url}/repos/{self.repo}{endpoint}"
+
+    async def _request(
+        self,
+        session: aiohttp.ClientSession,
+        method: str,
+        endpoint: str,
+        payload: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        async with session.request(
+            method, self._url(endpoint), headers=self.headers, json=payload
+        ) as resp:
+            if resp.status >= 400:
+                raise GitHubError(resp.status, await resp.text())
+            return await resp.json()
+
+    async def get_branch_sha(self, session: aiohttp.ClientSession) -> str:
+        """Return the commit SHA the branch currently points at."""
+        ref = await self._request(session, "GET", f"/git/ref/heads/{self.branch}")
+        return ref["object"]["sha"]
+
+    async def get_file(
+        self, session: aiohttp.ClientSession, path: str, ref: str
+    ) -> bytes | None:
+        """Fetch raw file contents at a ref, or None if the file doesn't exist."""
+        headers = {**self.headers, "Accept": "application/vnd.github.raw+json"}
+        async with session.get(
+            self._url(f"/contents/{path}"), headers=headers, params={"ref": ref}
+        ) as resp:
+            if resp.status == 404:
+                return None
+            if resp.status >= 400:
+                raise GitHubError(resp.status, await resp.text())
+            return await resp.read()
+
+    async def create_blob(
+        self, session: aiohttp.ClientSession, content: str, encoding: str = "utf-8"
+    ) -> str:
+        """Create a blob and return its SHA."""
+        blob = await self._request(
+            session, "POST", "/git/blobs", {"content": content, "encoding": encoding}
+        )
+        return blob["sha"]
+
+    async def create_tree(
+        self,
+        session: aiohttp.ClientSession,
+        base_tree: str,
+        entries: list[dict[str, Any]],
+    ) -> str:
+        """Create a tree on top of base_tree and return its SHA."""
+        tree = await self._request(
+            session, "POST", "/git/trees", {"base_tree": base_tree, "tree": entries}
+        )
+        return tree["sha"]
+
+    async def create_commit(
+        self,
+        session: aiohttp.ClientSession,
+        message: str,
+        tree_sha: str,
+        parent_sha: str,
+    ) -> str:
+        """Create a commit and return its SHA."""
+        commit = await self._request(
+            session,
+            "POST",
+            "/git/commits",
+            {"message": message, "tree": tree_sha, "parents": [parent_sha]},
+        )
+        return commit["sha"]
+
+    async def update_branch(self, session: aiohttp.ClientSession, sha: str):
+        """Fast-forward the branch to the given commit."""
+        await self._request(
+            session,
+            "PATCH",
+            f"/git/refs/heads/{self.branch}",
+            {"sha": sha, "force": False},
+        )
+
+    def commit_url(self, sha: str) -> str:
+        return f"https://github.com/{self.repo}/commit/{sha}"
+
+    def blob_url(self, path: str) -> str:
+        return f"https://github.com/{self.repo}/blob/{self.branch}/{path}"
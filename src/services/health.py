@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from .health_history import HealthHistory
+from .n8n import BACKGROUND, INTERACTIVE, N8NClient
+
+logger = logging.getLogger("marcellobot.health")
+
+HISTORY_LENGTH = 100
+HISTORY_FLUSH_INTERVAL = 300
+
+
+@dataclass(slots=True)
+class ServiceHealth:
+    """
+    Latest known health of one service plus a short history of probes.
+
+    Times are epoch seconds; history holds `(epoch, healthy)` pairs.
+    """
+
+    name: str
+    healthy: bool
+    message: str
+    checked_at: float
+    changed_at: float
+    history: deque = field(default_factory=lambda: deque(maxlen=HISTORY_LENGTH))
+
+
+ChangeCallback = Callable[[ServiceHealth, bool | None], Awaitable[None]]
+
+
+class HealthMonitor:
+    """
+    Polls the `server-status` webhook in the background and keeps a snapshot.
+
+    Services without their own interval are refreshed together by a full
+    poll every `interval` seconds; services listed in `service_intervals`
+    are also probed individually on their own schedule. `on_change` is
+    awaited whenever a service flips between healthy and unhealthy. Every
+    probe is also recorded in `history`, if given, which is flushed to disk
+    periodically and on stop.
+    """
+
+    def __init__(
+        self,
+        n8n: N8NClient,
+        interval: float = 60,
+        service_intervals: dict[str, float] | None = None,
+        on_change: ChangeCallback | None = None,
+        history: HealthHistory | None = None,
+    ):
+        self.n8n = n8n
+        self.interval = interval
+        self.service_intervals = service_intervals or {}
+        self.on_change = on_change
+        self.history = history
+        self.services: dict[str, ServiceHealth] = {}
+        self.last_poll: float | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self._run(), name="health-monitor")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.history:
+            await asyncio.to_thread(self.history.flush)
+
+    def is_fresh(self, max_age: float | None = None) -> bool:
+        """Whether the snapshot is recent enough to answer /status from."""
+        if self.last_poll is None:
+            return False
+        return time.time() - self.last_poll <= (max_age or self.interval * 3)
+
+    async def poll(self, service: str | None = None, lane: str = INTERACTIVE) -> dict[str, Any]:
+        """Probe one service (or all) through n8n and update the snapshot."""
+        payload = {"service": service} if service else {}
+        started = time.perf_counter()
+        result = await self.n8n.trigger_webhook("server-status", payload, lane=lane)
+        round_trip_ms = (time.perf_counter() - started) * 1000
+        if result.get("error") or "services" not in result:
+            return result
+
+        now = time.time()
+        self.last_poll = now
+        for name, status in result["services"].items():
+            await self._record(name, status, now, round_trip_ms)
+        return result
+
+    async def _record(
+        self, name: str, status: dict[str, Any], now: float, round_trip_ms: float
+    ):
+        healthy = bool(status.get("healthy", False))
+        # Status messages repeat ("OK", "Healthy", ...) across services and polls
+        message = sys.intern(str(status.get("message", "Unknown")))
+        if self.history:
+            # Prefer the probe's own latency when the workflow reports it
+            self.history.record(
+                name, now, healthy, status.get("latency_ms", round_trip_ms)
+            )
+
+        current = self.services.get(name)
+
+        if current is None:
+            current = ServiceHealth(name, healthy, message, now, now)
+            self.services[name] = current
+            previous = None
+        else:
+            previous = current.healthy
+            if healthy != previous:
+                current.changed_at = now
+            current.healthy = healthy
+            current.message = message
+            current.checked_at = now
+        current.history.append((now, healthy))
+
+        if previous is not None and previous != healthy and self.on_change:
+            try:
+                await self.on_change(current, previous)
+            except Exception as e:
+                logger.error(f"Health change callback failed for {name}: {e}")
+
+    @staticmethod
+    def snapshot_row(s: ServiceHealth) -> list:
+        return [s.name, s.healthy, s.message, s.checked_at, s.changed_at, list(s.history)]
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "last_poll": self.last_poll,
+            "services": [self.snapshot_row(s) for s in self.services.values()],
+        }
+
+    def restore(self, data: dict[str, Any]):
+        self.last_poll = data["last_poll"]
+        for name, healthy, message, checked_at, changed_at, history in data["services"]:
+            service = ServiceHealth(name, healthy, sys.intern(message), checked_at, changed_at)
+            service.history.extend((when, up) for when, up in history)
+            self.services[name] = service
+
+    def _first_due(self, target: str | None, interval: float) -> float:
+        """When a poll is first due: at once, or on schedule after a restored one."""
+        if target is None:
+            last = self.last_poll
+        else:
+            last = self.services[target].checked_at if target in self.services else None
+        if last is None:
+            return 0.0
+        return time.monotonic() + max(last + interval - time.time(), 0.0)
+
+    async def _run(self):
+        next_due: dict[str | None, float] = {None: self._first_due(None, self.interval)}
+        next_due.update(
+            {name: self._first_due(name, every) for name, every in self.service_intervals.items()}
+        )
+        last_flush = time.monotonic()
+
+        while True:
+            now = time.monotonic()
+            due = [target for target, when in next_due.items() if when <= now]
+            for target in due:
+                interval = (
+                    self.interval if target is None else self.service_intervals[target]
+                )
+                next_due[target] = now + interval
+
+            if due:
+                results = await asyncio.gather(
+                    *(self.poll(target, lane=BACKGROUND) for target in due),
+                    return_exceptions=True,
+                )
+                for target, result in zip(due, results):
+                    if isinstance(result, Exception):
+                        logger.warning(f"Health poll for {target or 'all'} failed: {result}")
+                    elif result.get("error"):
+                        logger.warning(
+                            f"Health poll for {target or 'all'} failed: {result.get('message')}"
+                        )
+
+            if self.history and time.monotonic() - last_flush >= HISTORY_FLUSH_INTERVAL:
+                last_flush = time.monotonic()
+                try:
+                    await asyncio.to_thread(self.history.flush)
+                except OSError as e:
+                    logger.warning(f"Failed to flush health history: {e}")
+
+            await asyncio.sleep(max(0.0, min(next_due.values()) - time.monotonic()))
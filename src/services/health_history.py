@@ -0,0 +1,221 @@
+import bisect
+import logging
+import os
+import re
+import struct
+import time
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger("marcellobot.health_history")
+
+# ~90 days of per-minute samples
+DEFAULT_CAPACITY = 131072
+
+FILE_MAGIC = b"MBHS"
+FILE_VERSION = 1
+# magic, version, capacity, count
+FILE_HEADER = struct.Struct("<4sHII")
+
+UNKNOWN_LATENCY = -1.0
+
+WINDOW_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parse_window(window: str) -> int:
+    """Parse a window like `30m`, `24h` or `7d` into seconds."""
+    match = re.fullmatch(r"\s*(\d+)\s*([mhdw])\s*", window.lower())
+    if not match:
+        raise ValueError(f"Invalid window '{window}' (use e.g. 30m, 24h, 7d)")
+    return int(match.group(1)) * WINDOW_UNITS[match.group(2)]
+
+
+@dataclass
+class Outage:
+    start: float
+    end: float | None  # None while still down
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.time()) - self.start
+
+
+@dataclass
+class HealthSummary:
+    service: str
+    samples: int
+    uptime: float  # percent
+    latency_p50: float | None
+    latency_p95: float | None
+    latency_p99: float | None
+    outages: list[Outage]
+
+
+class HealthSeries:
+    """
+    Fixed-size ring buffer of probe results for one service.
+
+    Samples live in three parallel preallocated arrays (timestamps, healthy
+    flags, latency in ms), so memory stays flat no matter how long the bot
+    runs and aggregation works on contiguous typed buffers.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.timestamps = array("d", bytes(8 * capacity))
+        self.healthy = array("b", bytes(capacity))
+        self.latency = array("f", bytes(4 * capacity))
+        self.head = 0  # next write position
+        self.size = 0
+        self.dirty = False
+
+    def append(self, timestamp: float, healthy: bool, latency_ms: float | None):
+        self.timestamps[self.head] = timestamp
+        self.healthy[self.head] = 1 if healthy else 0
+        self.latency[self.head] = UNKNOWN_LATENCY if latency_ms is None else latency_ms
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.dirty = True
+
+    def ordered(self) -> tuple[array, array, array]:
+        """Copies of the buffers, oldest sample first."""
+        if self.size < self.capacity:
+            return (
+                self.timestamps[: self.size],
+                self.healthy[: self.size],
+                self.latency[: self.size],
+            )
+        return tuple(
+            buffer[self.head :] + buffer[: self.head]
+            for buffer in (self.timestamps, self.healthy, self.latency)
+        )
+
+    def summarize(self, service: str, since: float) -> HealthSummary:
+        timestamps, healthy, latency = self.ordered()
+        start = bisect.bisect_left(timestamps, since)
+        timestamps, healthy, latency = timestamps[start:], healthy[start:], latency[start:]
+
+        samples = len(healthy)
+        uptime = 100.0 * sum(healthy) / samples if samples else 0.0
+
+        known = sorted(value for value in latency if value >= 0)
+
+        def percentile(p: float) -> float | None:
+            if not known:
+                return None
+            return known[min(len(known) - 1, int(p / 100 * len(known)))]
+
+        return HealthSummary(
+            service=service,
+            samples=samples,
+            uptime=uptime,
+            latency_p50=percentile(50),
+            latency_p95=percentile(95),
+            latency_p99=percentile(99),
+            outages=self._outages(timestamps, healthy.tobytes()),
+        )
+
+    @staticmethod
+    def _outages(timestamps: array, flags: bytes) -> list[Outage]:
+        """Find down intervals by jumping between 0/1 transitions with bytes.find."""
+        outages = []
+        position = flags.find(b"\x00")
+        while position != -1:
+            recovered = flags.find(b"\x01", position)
+            if recovered == -1:
+                outages.append(Outage(timestamps[position], None))
+                break
+            outages.append(Outage(timestamps[position], timestamps[recovered]))
+            position = flags.find(b"\x00", recovered)
+        return outages
+
+    def to_bytes(self) -> bytes:
+        timestamps, healthy, latency = self.ordered()
+        header = FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, self.capacity, self.size)
+        return header + timestamps.tobytes() + healthy.tobytes() + latency.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, capacity: int = DEFAULT_CAPACITY) -> "HealthSeries":
+        magic, version, _, count = FILE_HEADER.unpack_from(data)
+        if magic != FILE_MAGIC or version != FILE_VERSION:
+            raise ValueError("Not a health history file")
+
+        offset = FILE_HEADER.size
+        timestamps = array("d", data[offset : offset + 8 * count])
+        offset += 8 * count
+        healthy = array("b", data[offset : offset + count])
+        offset += count
+        latency = array("f", data[offset : offset + 4 * count])
+
+        # Keep only the newest samples if the capacity shrank
+        keep = min(count, capacity)
+        series = cls(capacity)
+        series.timestamps[:keep] = timestamps[count - keep :]
+        series.healthy[:keep] = healthy[count - keep :]
+        series.latency[:keep] = latency[count - keep :]
+        series.size = keep
+        series.head = keep % capacity
+        return series
+
+
+class HealthHistory:
+    """
+    Per-service health series, persisted as one compact binary file per service.
+
+    A `read_only` history loads the files but keeps new samples in memory,
+    for processes that share the directory with the one that writes it.
+    """
+
+    def __init__(
+        self, directory: str | Path, capacity: int = DEFAULT_CAPACITY, read_only: bool = False
+    ):
+        self.directory = Path(directory)
+        self.capacity = capacity
+        self.read_only = read_only
+        self.series: dict[str, HealthSeries] = {}
+
+    @staticmethod
+    def _filename(service: str) -> str:
+        return re.sub(r"[^a-zA-Z0-9_.-]", "_", service) + ".bin"
+
+    def load(self):
+        if not self.directory.exists():
+            return
+        for path in self.directory.glob("*.bin"):
+            try:
+                data = path.read_bytes()
+                # The service name is stored as a sidecar so odd names survive
+                name_file = path.with_suffix(".name")
+                service = name_file.read_text() if name_file.exists() else path.stem
+                self.series[service] = HealthSeries.from_bytes(data, self.capacity)
+            except (OSError, ValueError, struct.error) as e:
+                logger.warning(f"Skipping unreadable health history {path}: {e}")
+        logger.info(f"Loaded health history for {len(self.series)} service(s)")
+
+    def flush(self):
+        """Write every changed series to disk (atomically, one file each)."""
+        if self.read_only:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for service, series in self.series.items():
+            if not series.dirty:
+                continue
+            path = self.directory / self._filename(service)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(series.to_bytes())
+            os.replace(tmp, path)
+            path.with_suffix(".name").write_text(service)
+            series.dirty = False
+
+    def record(self, service: str, timestamp: float, healthy: bool, latency_ms: float | None):
+        series = self.series.get(service)
+        if series is None:
+            series = self.series[service] = HealthSeries(self.capacity)
+        series.append(timestamp, healthy, latency_ms)
+
+    def summarize(self, service: str, window_seconds: float) -> HealthSummary | None:
+        series = self.series.get(service)
+        if series is None:
+            return None
+        return series.summarize(service, time.time() - window_seconds)
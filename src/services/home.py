@@ -0,0 +1,185 @@
+import asyncio
+import logging
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Any
+
+from .admission import AdmissionController
+from .catalog import RefreshingCatalog
+from .n8n import BACKGROUND, N8NClient
+
+logger = logging.getLogger("marcellobot.home")
+
+OPPOSITE_ACTIONS = {"lights_on": "lights_off", "lights_off": "lights_on"}
+
+
+@dataclass
+class _Submission:
+    action: str
+    targets: list[str | None]
+    future: asyncio.Future
+    cancelled: list[str | None] = field(default_factory=list)
+
+
+@dataclass
+class HomeOutcome:
+    """What happened to one /home invocation once its batch was sent."""
+
+    result: dict[str, Any] | None
+    sent: list[str | None]
+    cancelled: list[str | None]
+    batch_size: int
+
+
+class HomeBatcher:
+    """
+    Debounces /home actions into one `home-control` webhook call.
+
+    Actions arriving within `window` seconds of the first are merged per
+    target: repeats collapse, and an on/off pair for the same target cancels
+    out. A single remaining action is sent in the original payload shape;
+    several are sent as `{"action": "batch", "actions": [...]}`.
+
+    Submitters come through the /home route, which holds an admission
+    slot for each of them until their batch returns, so the combined call
+    needs none of its own.
+    """
+
+    def __init__(self, n8n: N8NClient, window: float = 0.75):
+        self.n8n = n8n
+        self.window = window
+        # (action group, lowercased target) -> (action, target to send,
+        # submissions waiting on it with the target as each of them spelled it)
+        self._pending: dict[
+            tuple[str, str | None],
+            tuple[str, str | None, list[tuple[_Submission, str | None]]],
+        ] = {}
+        self._submissions: list[_Submission] = []
+        self._users: set[str] = set()
+        self._flush_task: asyncio.Task | None = None
+
+    @staticmethod
+    def _group(action: str) -> str:
+        return "lights" if action in OPPOSITE_ACTIONS else action
+
+    async def submit(self, action: str, targets: list[str | None], user: str) -> HomeOutcome:
+        submission = _Submission(action, targets, asyncio.get_running_loop().create_future())
+        self._submissions.append(submission)
+        self._users.add(user)
+
+        for target in targets:
+            key = (self._group(action), target.lower() if target else None)
+            existing = self._pending.get(key)
+            if existing and OPPOSITE_ACTIONS.get(existing[0]) == action:
+                # on then off (or vice versa) inside the window is a no-op
+                del self._pending[key]
+                for waiting, waiting_target in existing[2]:
+                    waiting.cancelled.append(waiting_target)
+                submission.cancelled.append(target)
+            elif existing and existing[0] == action:
+                existing[2].append((submission, target))
+            else:
+                self._pending[key] = (action, target, [(submission, target)])
+
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_after_window())
+        return await submission.future
+
+    async def close(self):
+        """Fail the actions still waiting for the window instead of leaving them hanging."""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        # A task cancelled before it first ran never reaches its handler
+        self._drop_waiting()
+
+    def _drop_waiting(self):
+        submissions = self._submissions
+        self._pending, self._submissions, self._users = {}, [], set()
+        self._flush_task = None
+        error = RuntimeError("Home actions were dropped because the bot is shutting down")
+        for submission in submissions:
+            if not submission.future.done():
+                submission.future.set_exception(error)
+
+    async def _flush_after_window(self):
+        try:
+            await asyncio.sleep(self.window)
+        except asyncio.CancelledError:
+            self._drop_waiting()
+            raise
+        pending, submissions, users = self._pending, self._submissions, self._users
+        self._pending, self._submissions, self._users = {}, [], set()
+        self._flush_task = None
+
+        actions = [
+            {"action": action, "target": target}
+            for action, target, _ in pending.values()
+        ]
+        result = None
+        try:
+            if len(actions) == 1:
+                result = await self.n8n.trigger_webhook(
+                    "home-control", {**actions[0], "user": ", ".join(sorted(users))}
+                )
+            elif actions:
+                result = await self.n8n.trigger_webhook(
+                    "home-control",
+                    {"action": "batch", "actions": actions, "user": ", ".join(sorted(users))},
+                )
+        except Exception as e:
+            for submission in submissions:
+                if not submission.future.done():
+                    submission.future.set_exception(e)
+            return
+
+        for submission in submissions:
+            if submission.future.done():
+                continue
+            sent = [target for target in submission.targets if target not in submission.cancelled]
+            submission.future.set_result(
+                HomeOutcome(result, sent, submission.cancelled, len(actions))
+            )
+
+
+class HomeRegistry(RefreshingCatalog):
+    """
+    Cached list of device/area names for /home target autocomplete.
+
+    Names come from the `home-control` webhook (`list_targets` action),
+    seeded from configuration and supplemented by targets used in past
+    commands.
+    """
+
+    def __init__(
+        self,
+        n8n: N8NClient,
+        seed: list[str] | None = None,
+        ttl: float = 600,
+        admission: AdmissionController | None = None,
+    ):
+        super().__init__(ttl)
+        self.n8n = n8n
+        self.admission = admission
+        self.index.update(seed or [])
+
+    def learn(self, names: list[str | None]):
+        self.index.add(name for name in names if name)
+
+    async def refresh(self):
+        # Counts against the home-control and global caps like a /home call
+        async with self.admission.slot("home-control") if self.admission else nullcontext():
+            result = await self.n8n.trigger_webhook(
+                "home-control", {"action": "list_targets"}, lane=BACKGROUND
+            )
+        if result.get("error"):
+            logger.warning(f"Failed to refresh home targets: {result.get('message')}")
+            return
+        names = result.get("targets") or [
+            *result.get("areas", []),
+            *result.get("devices", []),
+        ]
+        self.learn([str(name) for name in names])
@@ -1,19 +1,242 @@
 import aiohttp
-from typing import Any
+import asyncio
+import gzip
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from .codec import JSONCodec, default_codec
+
+if TYPE_CHECKING:
+    from .traffic import TrafficRecorder
+
+STREAM_CHUNK_SIZE = 64 * 1024
+# Request bodies at least this large are gzip-compressed (0 disables)
+DEFAULT_COMPRESS_THRESHOLD = 64 * 1024
+
+# Priority lanes: user-facing commands vs. monitoring/scheduled traffic
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+# Interactive latency is judged over this many recent seconds
+LATENCY_WINDOW = 60
+LATENCY_MIN_SAMPLES = 5
+
+
+@dataclass
+class WebhookBody:
+    """Raw webhook response read with a size cap."""
+
+    status: int
+    content_type: str
+    data: bytes
+    truncated: bool  # the body was larger than the cap and was cut off
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
+    @property
+    def is_json(self) -> bool:
+        return "json" in self.content_type
+
+
+@dataclass
+class Lane:
+    """One priority lane: its own connection pool and latency record."""
+
+    name: str
+    limit: int
+    in_flight: int = 0
+    requests: int = 0
+    throttled: int = 0
+    session: aiohttp.ClientSession | None = None
+    # Sessions replaced by a limit change, closed once the lane is idle
+    retired: list = field(default_factory=list)
+    # (when, ms, webhook)
+    latencies: deque = field(default_factory=lambda: deque(maxlen=500))
+
+    def p95(self, window: float = LATENCY_WINDOW) -> float | None:
+        cutoff = time.monotonic() - window
+        recent = sorted(ms for when, ms, _ in self.latencies if when >= cutoff)
+        if len(recent) < LATENCY_MIN_SAMPLES:
+            return None
+        return recent[min(len(recent) - 1, int(0.95 * len(recent)))]
 
 
 class N8NClient:
-    """Client for calling n8n webhooks."""
+    """
+    Client for calling n8n webhooks.
 
-    def __init__(self, base_url: str, webhook_secret: str | None = None):
+    Calls are tagged with a lane. Interactive (slash command) and
+    background (polling, scheduled) traffic use separate connection pools,
+    and while interactive calls run slow, background calls are throttled
+    to one at a time. Each interactive call is judged against its
+    webhook's target in `latency_targets` (default `interactive_target_ms`);
+    a target of 0 leaves a webhook that is slow by design, like the recipe
+    parser, out of the signal.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        webhook_secret: str | None = None,
+        codec: JSONCodec | None = None,
+        compress_threshold: int = DEFAULT_COMPRESS_THRESHOLD,
+        interactive_connections: int = 16,
+        background_connections: int = 4,
+        interactive_target_ms: float = 10000,
+        latency_targets: dict[str, float] | None = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.webhook_secret = webhook_secret
+        self.codec = codec or default_codec()
+        self.compress_threshold = compress_threshold
+        self.interactive_target_ms = interactive_target_ms
+        self.latency_targets = latency_targets or {}
+        self.lanes = {
+            INTERACTIVE: Lane(INTERACTIVE, interactive_connections),
+            BACKGROUND: Lane(BACKGROUND, background_connections),
+        }
+        self._background_ready = asyncio.Condition()
+        # Set to record every call to a traffic trace
+        self.recorder: "TrafficRecorder | None" = None
+
+    def configure(
+        self,
+        base_url: str,
+        webhook_secret: str | None,
+        codec: JSONCodec,
+        compress_threshold: int,
+        interactive_connections: int,
+        background_connections: int,
+        interactive_target_ms: float,
+        latency_targets: dict[str, float],
+    ):
+        """
+        Apply new settings to later calls without dropping calls in flight.
+
+        A lane whose connection limit changes gets a fresh pool on its next
+        call; the old one is closed once the lane has no calls left in it.
+        """
         self.base_url = base_url.rstrip("/")
         self.webhook_secret = webhook_secret
+        self.codec = codec
+        self.compress_threshold = compress_threshold
+        self.interactive_target_ms = interactive_target_ms
+        self.latency_targets = latency_targets
+        for lane, limit in (
+            (self.lanes[INTERACTIVE], interactive_connections),
+            (self.lanes[BACKGROUND], background_connections),
+        ):
+            if lane.limit == limit:
+                continue
+            lane.limit = limit
+            if lane.session is not None:
+                lane.retired.append(lane.session)
+                lane.session = None
+
+    def interactive_degraded(self) -> bool:
+        """Whether the p95 of recent interactive latency, each over its target, exceeds 1."""
+        cutoff = time.monotonic() - LATENCY_WINDOW
+        ratios = []
+        for when, ms, webhook in self.lanes[INTERACTIVE].latencies:
+            target = self.latency_targets.get(webhook, self.interactive_target_ms)
+            if when >= cutoff and target:
+                ratios.append(ms / target)
+        if len(ratios) < LATENCY_MIN_SAMPLES:
+            return False
+        ratios.sort()
+        return ratios[min(len(ratios) - 1, int(0.95 * len(ratios)))] > 1
+
+    def _background_limit(self) -> int:
+        return 1 if self.interactive_degraded() else self.lanes[BACKGROUND].limit
+
+    @asynccontextmanager
+    async def _lane(self, name: str, webhook: str):
+        """Hold a slot in a lane and yield its pooled session."""
+        lane = self.lanes[name]
+        if name == BACKGROUND:
+            async with self._background_ready:
+                if lane.in_flight >= self._background_limit():
+                    lane.throttled += 1
+                while lane.in_flight >= self._background_limit():
+                    # Re-check periodically: the limit rises again as latency recovers
+                    try:
+                        await asyncio.wait_for(self._background_ready.wait(), 1.0)
+                    except asyncio.TimeoutError:
+                        pass
+                lane.in_flight += 1
+        else:
+            lane.in_flight += 1
+
+        if lane.session is None or lane.session.closed:
+            lane.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=lane.limit)
+            )
+        lane.requests += 1
+        started = time.perf_counter()
+        try:
+            yield lane.session
+        finally:
+            lane.in_flight -= 1
+            lane.latencies.append(
+                (time.monotonic(), (time.perf_counter() - started) * 1000, webhook)
+            )
+            if lane.retired and not lane.in_flight:
+                await self._close_retired(lane)
+            if name == BACKGROUND:
+                async with self._background_ready:
+                    self._background_ready.notify_all()
+
+    @staticmethod
+    async def _close_retired(lane: Lane):
+        retired, lane.retired = lane.retired, []
+        for session in retired:
+            if not session.closed:
+                await session.close()
+
+    async def close(self):
+        for lane in self.lanes.values():
+            await self._close_retired(lane)
+            if lane.session and not lane.session.closed:
+                await lane.session.close()
+
+    def lane_metrics(self) -> dict[str, dict]:
+        metrics = {}
+        for name, lane in self.lanes.items():
+            p95 = lane.p95()
+            metrics[name] = {
+                "in_flight": lane.in_flight,
+                "requests": lane.requests,
+                "throttled": lane.throttled,
+                "p95_ms": round(p95) if p95 is not None else None,
+            }
+        metrics[BACKGROUND]["limit"] = self._background_limit()
+        return metrics
+
+    def _headers(self) -> dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if self.webhook_secret:
+            headers["X-Webhook-Secret"] = self.webhook_secret
+        return headers
+
+    def _encode(self, payload: dict[str, Any] | None) -> tuple[bytes, dict[str, str]]:
+        """Encode a JSON request body, gzipping it when it is large."""
+        headers = self._headers()
+        body = self.codec.dumps(payload or {})
+        if self.compress_threshold and len(body) >= self.compress_threshold:
+            body = gzip.compress(body, compresslevel=6)
+            headers["Content-Encoding"] = "gzip"
+        return body, headers
 
     async def trigger_webhook(
         self,
         webhook_path: str,
         payload: dict[str, Any] | None = None,
         method: str = "POST",
+        lane: str = INTERACTIVE,
     ) -> dict[str, Any]:
         """
         Trigger an n8n webhook and return the response.
@@ -22,23 +245,77 @@ class N8NClient:
             webhook_path: The webhook path (e.g., "utr-stock-check")
             payload: Data to send to the webhook
             method: HTTP method (GET or POST)
+            lane: INTERACTIVE or BACKGROUND
 
         Returns:
             Response data from n8n workflow
         """
         url = f"{self.base_url}/webhook/{webhook_path}"
-        headers = {"Content-Type": "application/json"}
-
-        if self.webhook_secret:
-            headers["X-Webhook-Secret"] = self.webhook_secret
+        started = time.perf_counter()
+        body = b""
 
-        async with aiohttp.ClientSession() as session:
+        # Responses are decompressed transparently; aiohttp advertises
+        # gzip/deflate (and br when Brotli is installed) in Accept-Encoding.
+        async with self._lane(lane, webhook_path) as session:
             if method.upper() == "GET":
-                async with session.get(url, headers=headers, params=payload) as resp:
-                    return await self._handle_response(resp)
+                async with session.get(url, headers=self._headers(), params=payload) as resp:
+                    result = await self._handle_response(resp)
             else:
-                async with session.post(url, headers=headers, json=payload or {}) as resp:
-                    return await self._handle_response(resp)
+                body, headers = self._encode(payload)
+                async with session.post(url, headers=headers, data=body) as resp:
+                    result = await self._handle_response(resp)
+        if self.recorder:
+            self.recorder.n8n_call(
+                webhook_path,
+                lane,
+                payload,
+                (time.perf_counter() - started) * 1000,
+                result,
+                request_bytes=len(body),
+            )
+        return result
+
+    async def stream_webhook(
+        self,
+        webhook_path: str,
+        payload: dict[str, Any] | None = None,
+        max_bytes: int = 8 * 1024 * 1024,
+        lane: str = INTERACTIVE,
+    ) -> WebhookBody:
+        """
+        POST to an n8n webhook and stream the raw response body.
+
+        Reading stops once `max_bytes` have arrived, so an oversized
+        response never has to be held in memory in full. Decoding is left
+        to the caller.
+        """
+        url = f"{self.base_url}/webhook/{webhook_path}"
+        buffer = bytearray()
+        truncated = False
+
+        started = time.perf_counter()
+        body, headers = self._encode(payload)
+        async with self._lane(lane, webhook_path) as session:
+            async with session.post(url, headers=headers, data=body) as resp:
+                async for chunk in resp.content.iter_chunked(STREAM_CHUNK_SIZE):
+                    buffer += chunk
+                    if len(buffer) > max_bytes:
+                        del buffer[max_bytes:]
+                        truncated = True
+                        break
+                result = WebhookBody(resp.status, resp.content_type, bytes(buffer), truncated)
+        if self.recorder:
+            self.recorder.n8n_call(
+                webhook_path,
+                lane,
+                payload,
+                (time.perf_counter() - started) * 1000,
+                result.data.decode(errors="replace"),
+                request_bytes=len(body),
+                status=result.status,
+                content_type=result.content_type,
+            )
+        return result
 
     async def _handle_response(self, resp: aiohttp.ClientResponse) -> dict[str, Any]:
         """Handle the response from n8n."""
@@ -46,9 +323,9 @@ class N8NClient:
             text = await resp.text()
             return {"error": True, "status": resp.status, "message": text}
 
-        try:
-            return await resp.json()
-        except aiohttp.ContentTypeError:
+        if "json" not in resp.content_type:
             # n8n might return plain text
             text = await resp.text()
             return {"response": text}
+        data = await resp.read()
+        return self.codec.loads(data) if data.strip() else {}
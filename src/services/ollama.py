@@ -0,0 +1,324 @@
+import aiohttp
+import asyncio
+import itertools
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+logger = logging.getLogger("marcellobot.ollama")
+
+NS_PER_MS = 1_000_000
+# A request whose model load took longer than this found the model cold
+COLD_LOAD_MS = 500
+# Latency and throughput are reported over this many recent requests
+METRICS_SAMPLES = 500
+# Keep-warm pings go out once this fraction of keep_alive has passed idle
+WARM_REFRESH = 0.5
+
+
+class OllamaBusy(Exception):
+    """Raised when the request queue is full."""
+
+
+class OllamaError(Exception):
+    """Raised when Ollama fails a request or can't be reached."""
+
+
+@dataclass
+class Generation:
+    """One completion with its latency and token counts."""
+
+    text: str
+    model: str
+    queued_ms: float  # waiting in the bot's queue
+    total_ms: float  # queue plus request
+    load_ms: float  # Ollama loading the model; large when it was cold
+    prompt_tokens: int
+    eval_tokens: int
+    eval_ms: float
+    batch_size: int  # requests dispatched together with this one
+
+    @property
+    def tokens_per_second(self) -> float | None:
+        return self.eval_tokens / self.eval_ms * 1000 if self.eval_ms else None
+
+    @property
+    def cold(self) -> bool:
+        return self.load_ms >= COLD_LOAD_MS
+
+    def json(self) -> Any:
+        """The completion parsed as JSON (requests use Ollama's JSON mode by default)."""
+        return json.loads(self.text)
+
+
+@dataclass(eq=False)
+class _Request:
+    body: dict
+    future: asyncio.Future
+    queued_at: float = field(default_factory=time.perf_counter)
+
+    @property
+    def key(self) -> str:
+        return json.dumps(self.body, sort_keys=True)
+
+
+class OllamaClient:
+    """
+    Client for a local Ollama server's generate API.
+
+    Prompts wait in a bounded queue; when it is full, `generate` raises
+    `OllamaBusy` instead of letting latency grow without limit. Ollama
+    has no batch endpoint, but a server with several parallel slots
+    decodes concurrent requests in the same batch. A dispatcher therefore
+    collects prompts for `batch_window` seconds and sends them together,
+    up to `parallel` at once; identical prompts in a batch share one
+    request. Every request asks Ollama to keep the model loaded for
+    `keep_alive` seconds, and `keep_warm` pings it through idle stretches
+    of a monitoring window so the first check after a lull doesn't pay
+    for a cold load.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        keep_alive: float = 600,
+        parallel: int = 4,
+        max_queue: int = 32,
+        batch_window: float = 0.05,
+        timeout: float = 120,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.keep_alive = keep_alive
+        self.parallel = parallel
+        self.max_queue = max_queue
+        self.batch_window = batch_window
+        self.timeout = timeout
+        self.in_flight = 0
+        self.warm_until = 0.0
+        self._pending: deque[_Request] = deque()
+        self._wakeup = asyncio.Event()
+        self._session: aiohttp.ClientSession | None = None
+        self._dispatcher: asyncio.Task | None = None
+        self._warmer: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self._last_request = 0.0
+        self._batch_ids = itertools.count(1)
+        # Counters and recent samples for metrics()
+        self.requests = 0
+        self.rejected = 0
+        self.errors = 0
+        self.shared = 0
+        self.batches = 0
+        self.cold_loads = 0
+        self.warm_pings = 0
+        self.samples: deque[Generation] = deque(maxlen=METRICS_SAMPLES)
+
+    def configure(
+        self,
+        model: str,
+        keep_alive: float,
+        parallel: int,
+        max_queue: int,
+        batch_window: float,
+    ):
+        """Apply new settings to later requests; queued and in-flight ones are kept."""
+        self.model = model
+        self.keep_alive = keep_alive
+        self.parallel = parallel
+        self.max_queue = max_queue
+        self.batch_window = batch_window
+        self._wakeup.set()
+
+    @property
+    def queued(self) -> int:
+        return len(self._pending)
+
+    async def generate(
+        self,
+        prompt: str,
+        system: str | None = None,
+        format: str | dict | None = "json",
+        options: dict | None = None,
+    ) -> Generation:
+        """Queue a prompt and wait for its completion."""
+        if len(self._pending) >= self.max_queue:
+            self.rejected += 1
+            raise OllamaBusy(f"{len(self._pending)} prompts are already waiting for the model")
+        body = {"model": self.model, "prompt": prompt, "stream": False}
+        if system:
+            body["system"] = system
+        if format:
+            body["format"] = format
+        if options:
+            body["options"] = options
+        request = _Request(body, asyncio.get_running_loop().create_future())
+        self._pending.append(request)
+        self.requests += 1
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch(), name="ollama-dispatch")
+        self._wakeup.set()
+        return await request.future
+
+    async def _dispatch(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if not self._pending:
+                continue
+            if self.batch_window and not self.in_flight and len(self._pending) < self.parallel:
+                # Let prompts arriving together leave together
+                await asyncio.sleep(self.batch_window)
+            while self._pending and self.in_flight < self.parallel:
+                groups: dict[str, list[_Request]] = {}
+                while self._pending and len(groups) < self.parallel - self.in_flight:
+                    request = self._pending.popleft()
+                    if request.future.cancelled():
+                        continue
+                    groups.setdefault(request.key, []).append(request)
+                if not groups:
+                    break
+                self.batches += 1
+                batch = next(self._batch_ids)
+                size = sum(map(len, groups.values()))
+                for requests in groups.values():
+                    self.shared += len(requests) - 1
+                    self.in_flight += 1
+                    task = asyncio.create_task(self._send(requests, batch, size))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+
+    def _session_for(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    async def _post(self, body: dict) -> dict:
+        body = {**body, "keep_alive": self.keep_alive}
+        try:
+            async with self._session_for().post(
+                f"{self.base_url}/api/generate",
+                json=body,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            ) as resp:
+                if resp.status >= 400:
+                    raise OllamaError(f"Ollama returned HTTP {resp.status}: {await resp.text()}")
+                return await resp.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise OllamaError(f"Ollama request failed: {e or type(e).__name__}") from e
+        finally:
+            self._last_request = time.monotonic()
+
+    async def _send(self, requests: list[_Request], batch: int, size: int):
+        try:
+            result = await self._post(requests[0].body)
+        except Exception as e:
+            self.errors += 1
+            for request in requests:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+        finally:
+            self.in_flight -= 1
+            self._wakeup.set()
+
+        finished = time.perf_counter()
+        load_ms = (result.get("load_duration") or 0) / NS_PER_MS
+        if load_ms >= COLD_LOAD_MS:
+            self.cold_loads += 1
+        for request in requests:
+            generation = Generation(
+                text=result.get("response", ""),
+                model=result.get("model", requests[0].body["model"]),
+                queued_ms=0.0,
+                total_ms=(finished - request.queued_at) * 1000,
+                load_ms=load_ms,
+                prompt_tokens=result.get("prompt_eval_count") or 0,
+                eval_tokens=result.get("eval_count") or 0,
+                eval_ms=(result.get("eval_duration") or 0) / NS_PER_MS,
+                batch_size=size,
+            )
+            request_ms = (result.get("total_duration") or 0) / NS_PER_MS
+            generation.queued_ms = max(generation.total_ms - request_ms, 0.0)
+            self.samples.append(generation)
+            if not request.future.done():
+                request.future.set_result(generation)
+        logger.debug(
+            f"Batch {batch}: {len(requests)} prompt(s) in {result.get('eval_count', 0)} tokens, "
+            f"load {load_ms:.0f}ms"
+        )
+
+    def keep_warm(self, seconds: float):
+        """Keep the model loaded for at least the next `seconds`, even while idle."""
+        self.warm_until = max(self.warm_until, time.monotonic() + seconds)
+        # keep_alive 0 unloads after each request, so there is nothing to hold
+        if self.keep_alive > 0 and (self._warmer is None or self._warmer.done()):
+            self._warmer = asyncio.create_task(self._keep_warm(), name="ollama-keep-warm")
+
+    async def _keep_warm(self):
+        while time.monotonic() < self.warm_until and self.keep_alive > 0:
+            refresh = self.keep_alive * WARM_REFRESH
+            idle = time.monotonic() - self._last_request
+            if self.in_flight == 0 and (not self._last_request or idle >= refresh):
+                try:
+                    # A prompt-less request just loads the model and resets its keep-alive
+                    result = await self._post({"model": self.model})
+                    self.warm_pings += 1
+                    load_ms = (result.get("load_duration") or 0) / NS_PER_MS
+                    if load_ms >= COLD_LOAD_MS:
+                        logger.info(f"Loaded {self.model} for keep-warm in {load_ms:.0f}ms")
+                except OllamaError as e:
+                    logger.warning(f"Keep-warm ping failed: {e}")
+                idle = 0.0
+            await asyncio.sleep(max(min(refresh - idle, self.warm_until - time.monotonic()), 0.1))
+
+    def metrics(self) -> dict:
+        """Request counts, recent latency percentiles and token throughput."""
+        recent = list(self.samples)
+
+        def percentile(values: list[float], p: float) -> float | None:
+            if not values:
+                return None
+            values = sorted(values)
+            return round(values[min(len(values) - 1, int(p / 100 * len(values)))])
+
+        totals = [sample.total_ms for sample in recent]
+        eval_ms = sum(sample.eval_ms for sample in recent)
+        return {
+            "model": self.model,
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "shared": self.shared,
+            "batches": self.batches,
+            "queued": len(self._pending),
+            "in_flight": self.in_flight,
+            "cold_loads": self.cold_loads,
+            "warm_pings": self.warm_pings,
+            "warm": self.warm_until > time.monotonic(),
+            "p50_ms": percentile(totals, 50),
+            "p95_ms": percentile(totals, 95),
+            "queue_p95_ms": percentile([sample.queued_ms for sample in recent], 95),
+            "prompt_tokens": sum(sample.prompt_tokens for sample in recent),
+            "eval_tokens": sum(sample.eval_tokens for sample in recent),
+            "tokens_per_second": (
+                round(sum(sample.eval_tokens for sample in recent) / eval_ms * 1000, 1)
+                if eval_ms
+                else None
+            ),
+        }
+
+    async def close(self):
+        for task in (self._dispatcher, self._warmer, *self._tasks):
+            if task and not task.done():
+                task.cancel()
+        for request in self._pending:
+            if not request.future.done():
+                request.future.set_exception(OllamaError("Ollama client closed"))
+        self._pending.clear()
+        if self._session and not self._session.closed:
+            await self._session.close()
@@ -0,0 +1,242 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+
+from .restock import retailer
+
+logger = logging.getLogger("marcellobot.politeness")
+
+# Recent fetch latencies kept per host for the percentiles in metrics()
+LATENCY_SAMPLES = 200
+# Backoff after a 429/503 without Retry-After: doubles per consecutive throttle
+BASE_BACKOFF = 60.0
+MAX_BACKOFF = 900.0
+
+
+class HostBusy(Exception):
+    """Raised when a host is backing off for longer than the caller will wait."""
+
+
+def retry_after_seconds(value, now: float | None = None) -> float | None:
+    """Parse a Retry-After value: delay in seconds or an HTTP date."""
+    if value is None or value == "":
+        return None
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        pass
+    try:
+        when = parsedate_to_datetime(str(value)).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(when - (time.time() if now is None else now), 0.0)
+
+
+@dataclass
+class HostPolicy:
+    rate_per_minute: float = 30
+    burst: int = 5
+    max_concurrent: int = 2
+
+
+class TokenBucket:
+    """Refills at `rate` tokens per second up to `capacity`; a take may go into debt."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Take a token, returning how long to wait before using it."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+@dataclass(slots=True)
+class HostStats:
+    requests: int = 0
+    errors: int = 0
+    throttled: int = 0
+    latencies: deque = field(default_factory=lambda: deque(maxlen=LATENCY_SAMPLES))
+
+    def percentile(self, p: float) -> float | None:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+class _Host:
+    def __init__(self, policy: HostPolicy):
+        self.policy = policy
+        self.bucket = TokenBucket(policy.rate_per_minute / 60, policy.burst)
+        self.semaphore = asyncio.Semaphore(policy.max_concurrent)
+        self.in_flight = 0
+        self.backoff_until = 0.0  # epoch seconds
+        self.failures = 0  # consecutive throttles
+        self.stats = HostStats()
+
+
+class HostScheduler:
+    """
+    Politeness for product-page fetches, per retailer host.
+
+    Each host gets a token bucket (steady rate plus a small burst), a cap on
+    concurrent fetches and a backoff window that opens on 429/503, honouring
+    Retry-After and otherwise doubling per consecutive throttle. The bot's
+    own stock checks wait here before calling n8n; the monitor workflows get
+    the same policies and backoffs on every watch sync and report their
+    fetches back, so every checker shares one view of each host.
+    """
+
+    def __init__(
+        self,
+        default: HostPolicy | None = None,
+        policies: dict[str, HostPolicy] | None = None,
+        max_wait: float = 30.0,
+    ):
+        self.default = default or HostPolicy()
+        self.policies = policies or {}
+        self.max_wait = max_wait
+        self._hosts: dict[str, _Host] = {}
+
+    def configure(self, default: HostPolicy, policies: dict[str, HostPolicy]):
+        """Apply new policies to every host, keeping their backoffs and stats."""
+        self.default = default
+        self.policies = policies
+        for host, state in self._hosts.items():
+            policy = policies.get(host, default)
+            if policy == state.policy:
+                continue
+            state.bucket.rate = policy.rate_per_minute / 60
+            state.bucket.capacity = policy.burst
+            state.bucket.tokens = min(state.bucket.tokens, policy.burst)
+            if policy.max_concurrent != state.policy.max_concurrent:
+                # Fetches holding the old semaphore release it as they finish
+                state.semaphore = asyncio.Semaphore(policy.max_concurrent)
+            state.policy = policy
+
+    def _host(self, host: str) -> _Host:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _Host(self.policies.get(host, self.default))
+        return state
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        """Wait for the URL's host to allow a fetch, and time it."""
+        host = retailer(url)
+        state = self._host(host)
+        backoff = state.backoff_until - time.time()
+        if backoff > self.max_wait:
+            raise HostBusy(f"{host} is rate limiting checks; try again in {backoff / 60:.0f}m")
+        delay = max(backoff, state.bucket.reserve())
+        if delay > self.max_wait:
+            # Give the token back; the caller isn't going to use it
+            state.bucket.tokens += 1
+            raise HostBusy(f"Too many checks for {host} right now; try again in {delay:.0f}s")
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        async with state.semaphore:
+            state.in_flight += 1
+            started = time.perf_counter()
+            try:
+                yield
+            except Exception:
+                state.stats.errors += 1
+                raise
+            finally:
+                state.in_flight -= 1
+                state.stats.requests += 1
+                state.stats.latencies.append(time.perf_counter() - started)
+
+    def record_result(self, url: str, result: dict):
+        """Update the URL's host from a stock check result (`throttled` on 429/503)."""
+        host = retailer(url)
+        if result.get("throttled"):
+            self._throttled(host, retry_after_seconds(result.get("retryAfter")))
+        elif result.get("error"):
+            self._host(host).stats.errors += 1
+        else:
+            self._host(host).failures = 0
+
+    def _throttled(self, host: str, delay: float | None, count: int = 1):
+        state = self._host(host)
+        state.failures += count
+        state.stats.throttled += count
+        if delay is None:
+            delay = min(BASE_BACKOFF * 2 ** (state.failures - 1), MAX_BACKOFF)
+        until = time.time() + delay
+        if until > state.backoff_until:
+            state.backoff_until = until
+            logger.warning(f"Backing off {host} for {delay:.0f}s after being throttled")
+
+    def sync_payload(self) -> dict:
+        """Policies and open backoffs, in the shape the monitor workflows read."""
+        now = time.time()
+        return {
+            "default": vars(self.default),
+            "policies": {host: vars(policy) for host, policy in self.policies.items()},
+            "backoff_until": {
+                host: state.backoff_until
+                for host, state in self._hosts.items()
+                if state.backoff_until > now
+            },
+        }
+
+    def merge(self, reports: dict):
+        """Fold per-host fetch reports from a monitor workflow into the stats."""
+        for host, report in reports.items():
+            if not isinstance(report, dict):
+                continue
+            state = self._host(host)
+            state.stats.requests += int(report.get("requests") or 0)
+            state.stats.errors += int(report.get("errors") or 0)
+            state.stats.latencies.extend(
+                latency / 1000 for latency in report.get("latency_ms") or [] if latency >= 0
+            )
+            throttled = int(report.get("throttled") or 0)
+            if throttled:
+                until = float(report.get("backoff_until") or 0)
+                self._throttled(host, max(until - time.time(), 0) or None, throttled)
+            elif report.get("requests"):
+                state.failures = 0
+
+    def snapshot(self) -> dict:
+        return {
+            host: {"backoff_until": state.backoff_until, "failures": state.failures}
+            for host, state in self._hosts.items()
+            if state.backoff_until > time.time() or state.failures
+        }
+
+    def restore(self, data: dict):
+        for host, saved in data.items():
+            state = self._host(host)
+            state.backoff_until = max(state.backoff_until, float(saved["backoff_until"]))
+            state.failures = int(saved["failures"])
+
+    def metrics(self) -> dict:
+        now = time.time()
+        metrics = {}
+        for host, state in sorted(self._hosts.items()):
+            p50, p95 = state.stats.percentile(50), state.stats.percentile(95)
+            metrics[host] = {
+                "requests": state.stats.requests,
+                "errors": state.stats.errors,
+                "throttled": state.stats.throttled,
+                "in_flight": state.in_flight,
+                "backoff_seconds": round(max(state.backoff_until - now, 0)),
+                "p50_ms": round(p50 * 1000) if p50 is not None else None,
+                "p95_ms": round(p95 * 1000) if p95 is not None else None,
+            }
+        return metrics
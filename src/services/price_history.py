@@ -0,0 +1,269 @@
+import bisect
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger("marcellobot.price_history")
+
+# One append-only file per column; rows line up by position
+COLUMNS = (("ts", "d"), ("price", "f"), ("stock", "b"))
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+SPARK_WIDTH = 24
+
+_PRICE_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+def parse_price(value) -> float | None:
+    """Pull a number out of a price like `$1,299.99` or `79.00 EUR`."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value) if value > 0 else None
+    if not isinstance(value, str):
+        return None
+    match = _PRICE_RE.search(value.replace(",", ""))
+    return float(match.group()) if match else None
+
+
+def sparkline(values: list[float]) -> str:
+    low, high = min(values), max(values)
+    if high == low:
+        return SPARK_CHARS[len(SPARK_CHARS) // 2] * len(values)
+    scale = (len(SPARK_CHARS) - 1) / (high - low)
+    return "".join(SPARK_CHARS[round((value - low) * scale)] for value in values)
+
+
+@dataclass
+class PriceSummary:
+    url: str
+    observations: int
+    priced: int
+    latest: float | None
+    low: float | None
+    high: float | None
+    p25: float | None
+    median: float | None
+    p75: float | None
+    in_stock: float  # percent of observations
+    first_seen: float
+    last_seen: float
+    last_in_stock: float | None
+    spark: str
+
+
+class PriceSeries:
+    """
+    Price and availability observations for one product.
+
+    Held as parallel typed arrays (epoch seconds, price with NaN for
+    unknown, in-stock flag) in time order, so a time window is a binary
+    search plus contiguous slices.
+    """
+
+    def __init__(self):
+        self.timestamps = array("d")
+        self.prices = array("f")
+        self.stock = array("b")
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def last_timestamp(self) -> float:
+        return self.timestamps[-1] if self.timestamps else 0.0
+
+    def append(self, timestamp: float, price: float | None, in_stock: bool):
+        self.timestamps.append(timestamp)
+        self.prices.append(math.nan if price is None else price)
+        self.stock.append(1 if in_stock else 0)
+
+    def insert(self, timestamp: float, price: float | None, in_stock: bool) -> bool:
+        """Add an observation in time order; False if there is one at `timestamp` already."""
+        if timestamp > self.last_timestamp or not self.timestamps:
+            self.append(timestamp, price, in_stock)
+            return True
+        index = bisect.bisect_left(self.timestamps, timestamp)
+        if index < len(self.timestamps) and self.timestamps[index] == timestamp:
+            return False
+        self.timestamps.insert(index, timestamp)
+        self.prices.insert(index, math.nan if price is None else price)
+        self.stock.insert(index, 1 if in_stock else 0)
+        return True
+
+    def summarize(self, url: str, since: float, width: int = SPARK_WIDTH) -> PriceSummary | None:
+        start = bisect.bisect_left(self.timestamps, since)
+        timestamps = self.timestamps[start:]
+        if not timestamps:
+            return None
+        prices = self.prices[start:]
+        stock = self.stock[start:]
+
+        known = sorted(price for price in prices if not math.isnan(price))
+
+        def percentile(p: float) -> float | None:
+            if not known:
+                return None
+            return known[min(len(known) - 1, int(p / 100 * len(known)))]
+
+        latest = next((price for price in reversed(prices) if not math.isnan(price)), None)
+        in_stock_at = stock.tobytes().rfind(b"\x01")
+        return PriceSummary(
+            url=url,
+            observations=len(timestamps),
+            priced=len(known),
+            latest=latest,
+            low=known[0] if known else None,
+            high=known[-1] if known else None,
+            p25=percentile(25),
+            median=percentile(50),
+            p75=percentile(75),
+            in_stock=100.0 * sum(stock) / len(stock),
+            first_seen=timestamps[0],
+            last_seen=timestamps[-1],
+            last_in_stock=timestamps[in_stock_at] if in_stock_at != -1 else None,
+            spark=self._spark(timestamps, prices, width),
+        )
+
+    @staticmethod
+    def _spark(timestamps: array, prices: array, width: int) -> str:
+        """Lowest known price in each of `width` equal time buckets."""
+        span = timestamps[-1] - timestamps[0]
+        buckets: list[float | None] = [None] * width
+        for timestamp, price in zip(timestamps, prices):
+            if math.isnan(price):
+                continue
+            index = min(width - 1, int((timestamp - timestamps[0]) / span * width)) if span else 0
+            if buckets[index] is None or price < buckets[index]:
+                buckets[index] = price
+        # Carry the last known price through empty buckets
+        values, last = [], None
+        for value in buckets:
+            last = value if value is not None else last
+            if last is not None:
+                values.append(last)
+        return sparkline(values) if values else ""
+
+
+class PriceHistory:
+    """
+    Per-product price series, stored as append-only columnar files.
+
+    Each product (keyed by a hash of its URL) has one file per column
+    (`.ts`, `.price`, `.stock`) plus a `.url` sidecar; recording an
+    observation appends a few bytes to each. Observations can arrive late
+    (a monitor sync reports checks made before an interactive one), so
+    the files are in arrival order and sorted when read; in memory they
+    are kept in time order. Writers to one product are serialized. A
+    `read_only` history reads the files but keeps new observations in
+    memory.
+    """
+
+    def __init__(self, directory: str | Path, read_only: bool = False):
+        self.directory = Path(directory)
+        self.read_only = read_only
+        self.series: dict[str, PriceSeries] = {}
+        self.urls: set[str] = set()
+        self._locks: dict[str, threading.RLock] = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock(self, url: str) -> threading.RLock:
+        with self._locks_lock:
+            lock = self._locks.get(url)
+            if lock is None:
+                lock = self._locks[url] = threading.RLock()
+            return lock
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha1(url.encode()).hexdigest()[:20]
+
+    def _path(self, url: str, suffix: str) -> Path:
+        return self.directory / f"{self._key(url)}.{suffix}"
+
+    def load(self):
+        """Index the known product URLs; series are read lazily."""
+        if not self.directory.exists():
+            return
+        for path in self.directory.glob("*.url"):
+            try:
+                self.urls.add(path.read_text())
+            except OSError as e:
+                logger.warning(f"Skipping unreadable price history {path}: {e}")
+        logger.info(f"Found price history for {len(self.urls)} product(s)")
+
+    def _read(self, url: str) -> PriceSeries:
+        series = PriceSeries()
+        columns = []
+        for suffix, typecode in COLUMNS:
+            column = array(typecode)
+            path = self._path(url, suffix)
+            if path.exists():
+                data = path.read_bytes()
+                # Drop a torn trailing value from an interrupted append
+                column.frombytes(data[: len(data) - len(data) % column.itemsize])
+            columns.append(column)
+        # A crash between column appends can leave one column a row ahead
+        rows = min(len(column) for column in columns)
+        columns = [column[:rows] for column in columns]
+        timestamps = columns[0]
+        if any(later < earlier for earlier, later in zip(timestamps, timestamps[1:])):
+            order = sorted(range(rows), key=timestamps.__getitem__)
+            columns = [array(column.typecode, map(column.__getitem__, order)) for column in columns]
+        series.timestamps, series.prices, series.stock = columns
+        return series
+
+    def get(self, url: str) -> PriceSeries | None:
+        series = self.series.get(url)
+        if series is None and url in self.urls:
+            with self._lock(url):
+                series = self.series.get(url)
+                if series is None:
+                    try:
+                        series = self.series[url] = self._read(url)
+                    except (OSError, ValueError) as e:
+                        logger.warning(f"Failed to read price history for {url}: {e}")
+                        return None
+        return series
+
+    def record(
+        self,
+        url: str,
+        price: float | None,
+        in_stock: bool,
+        timestamp: float | None = None,
+    ) -> bool:
+        """Add one observation; skipped if there is one at the same time already."""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock(url):
+            series = self.get(url)
+            if series is None:
+                series = self.series[url] = PriceSeries()
+            if not series.insert(timestamp, price, in_stock):
+                return False
+            if self.read_only:
+                self.urls.add(url)
+                return True
+
+            self.directory.mkdir(parents=True, exist_ok=True)
+            if url not in self.urls:
+                self._path(url, "url").write_text(url)
+                self.urls.add(url)
+            row = PriceSeries()
+            row.append(timestamp, price, in_stock)
+            for (suffix, _), column in zip(COLUMNS, (row.timestamps, row.prices, row.stock)):
+                with open(self._path(url, suffix), "ab") as f:
+                    column.tofile(f)
+            return True
+
+    def summarize(self, url: str, window_seconds: float | None = None) -> PriceSummary | None:
+        series = self.get(url)
+        if series is None:
+            return None
+        since = time.time() - window_seconds if window_seconds else 0.0
+        with self._lock(url):
+            return series.summarize(url, since)
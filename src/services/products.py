@@ -0,0 +1,141 @@
+import json
+import logging
+import os
+import re
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from .restock import retailer
+from .watches import normalize_url
+
+logger = logging.getLogger("marcellobot.products")
+
+_BESTBUY_SKU_RE = re.compile(r"/(\d{6,8})\.p$")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+# Names the checkers report when they couldn't read one
+UNKNOWN_NAMES = {"", "unknown", "unknown product", "product"}
+
+
+def product_sku(url: str) -> str:
+    """A product's ID from its URL: Best Buy's SKU, otherwise the last path segment."""
+    parts = urlsplit(url)
+    sku = parse_qs(parts.query).get("skuId")
+    if sku:
+        return sku[0]
+    match = _BESTBUY_SKU_RE.search(parts.path)
+    if match:
+        return match.group(1)
+    return parts.path.rstrip("/").rsplit("/", 1)[-1].lower()
+
+
+def _words(text: str) -> list[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+@dataclass
+class ProductLink:
+    url: str
+    name: str = ""
+    sku: str = ""
+
+    @property
+    def retailer(self) -> str:
+        return retailer(self.url)
+
+
+class ProductCatalog:
+    """
+    Known product pages, for finding a product at every retailer by name or SKU.
+
+    Pages are learned from stock checks, watch lists and price history
+    (with the product name the checkers reported) and saved as JSON. A
+    lookup matches the query against SKUs and name words and returns the
+    best page per retailer. A `read_only` catalog learns in memory only.
+    """
+
+    def __init__(self, path: str | Path, read_only: bool = False):
+        self.path = Path(path)
+        self.read_only = read_only
+        self.links: dict[str, ProductLink] = {}
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self.links)
+
+    def load(self):
+        if not self.path.exists():
+            return
+        try:
+            entries = json.loads(self.path.read_text())
+            for entry in entries:
+                self.links[entry["url"]] = ProductLink(**entry)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Failed to load product catalog {self.path}: {e}")
+        logger.info(f"Loaded {len(self.links)} product page(s)")
+
+    def save(self):
+        """Write the catalog (atomically) if anything was learned since the last save."""
+        if not self.dirty or self.read_only:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps([asdict(link) for link in self.links.values()], indent=1))
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+    def learn(self, url: str, name: str | None = None) -> bool:
+        """Add a product page, or name one that was only known by URL."""
+        url = normalize_url(url)
+        if not urlsplit(url).hostname:
+            return False
+        name = (name or "").strip()
+        if name.lower() in UNKNOWN_NAMES:
+            name = ""
+        link = self.links.get(url)
+        if link is None:
+            self.links[url] = ProductLink(url, name, product_sku(url))
+        elif name and name != link.name:
+            link.name = name
+        else:
+            return False
+        self.dirty = True
+        return True
+
+    def names(self) -> set[str]:
+        """Product names and SKUs, for autocomplete."""
+        return {link.name for link in self.links.values() if link.name} | {
+            link.sku for link in self.links.values() if link.sku
+        }
+
+    def _score(self, link: ProductLink, query: str, words: list[str]) -> int:
+        if link.sku and link.sku.lower() == query:
+            return 3
+        known = _words(f"{link.name} {link.sku}")
+        if all(word in known for word in words):
+            return 2
+        if all(any(k.startswith(word) for k in known) for word in words):
+            return 1
+        return 0
+
+    def find(self, query: str, limit: int = 6) -> list[ProductLink]:
+        """The best-matching page per retailer, best matches first."""
+        query = query.strip().lower()
+        words = _words(query)
+        if not words:
+            return []
+        best: dict[str, tuple[int, ProductLink]] = {}
+        for link in self.links.values():
+            score = self._score(link, query, words)
+            if not score:
+                continue
+            current = best.get(link.retailer)
+            # Among equal matches the shorter name is the more specific product
+            if (
+                current is None
+                or score > current[0]
+                or (score == current[0] and len(link.name) < len(current[1].name))
+            ):
+                best[link.retailer] = (score, link)
+        ranked = sorted(best.values(), key=lambda item: (-item[0], item[1].retailer))
+        return [link for _, link in ranked[:limit]]
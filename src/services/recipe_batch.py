@@ -0,0 +1,205 @@
+import asyncio
+import logging
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from .admission import AdmissionController
+from .n8n import BACKGROUND, N8NClient
+from .recipe_book import CommitResult, ParsedRecipe, RecipeBook, normalize_url
+
+logger = logging.getLogger("marcellobot.recipe_batch")
+
+MAX_BATCH_SIZE = 25
+
+STATUS_EMOJI = {
+    "queued": "⏳",
+    "parsing": "🔄",
+    "parsed": "📝",
+    "saved": "✅",
+    "duplicate": "♻️",
+    "failed": "❌",
+}
+
+
+@dataclass
+class BatchItem:
+    url: str
+    status: str = "queued"
+    title: str | None = None
+    error: str | None = None
+    parsed: ParsedRecipe | None = None
+
+    def describe(self) -> str:
+        label = f"**{self.title}**" if self.title else f"<{self.url}>"
+        line = f"{STATUS_EMOJI[self.status]} {label}"
+        if self.error:
+            line += f" - {self.error}"
+        return line
+
+
+class RecipeBatch:
+    """
+    Imports many recipe URLs at once.
+
+    URLs already in the recipe book (or repeated in the batch) are skipped,
+    the rest are parsed by the recipe-parser workflow on a bounded worker
+    pool, and everything that parsed is committed in a single GitHub commit.
+    A batch holds at most MAX_BATCH_SIZE URLs; ValueError otherwise. With `admission`, each parse holds a slot as the requesting guild and
+    user, so a batch counts against the same caps as other commands.
+    `on_update` is awaited whenever an item changes status.
+    """
+
+    def __init__(
+        self,
+        n8n: N8NClient,
+        recipe_book: RecipeBook,
+        urls: list[str],
+        workers: int = 3,
+        requested_by: str = "",
+        guild_id: int | None = None,
+        user_id: int | None = None,
+        admission: AdmissionController | None = None,
+        on_update: Callable[["RecipeBatch"], Awaitable[None]] | None = None,
+    ):
+        if len(urls) > MAX_BATCH_SIZE:
+            raise ValueError(f"A batch holds at most {MAX_BATCH_SIZE} URLs, got {len(urls)}")
+        self.n8n = n8n
+        self.recipe_book = recipe_book
+        self.workers = workers
+        self.requested_by = requested_by
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.admission = admission
+        self.on_update = on_update
+        self.items = [BatchItem(url) for url in urls]
+        self.commit: CommitResult | None = None
+
+    @staticmethod
+    def split_urls(text: str) -> list[str]:
+        """Split whitespace or comma separated URLs, dropping blanks."""
+        return [url for url in text.replace(",", " ").split() if url]
+
+    def counts(self) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        for item in self.items:
+            counts[item.status] = counts.get(item.status, 0) + 1
+        return counts
+
+    def format_progress(self, limit: int = 1900) -> str:
+        """Render one line per URL, truncated to fit in a Discord message."""
+        summary = ", ".join(f"{count} {status}" for status, count in self.counts().items())
+        lines = [f"**Recipe batch** ({len(self.items)} URLs): {summary}"]
+        for item in self.items:
+            line = item.describe()
+            if sum(len(existing) + 1 for existing in lines) + len(line) > limit:
+                lines.append("...")
+                break
+            lines.append(line)
+        if self.commit:
+            lines.append(f"[View Commit]({self.commit.commit_url}) ({self.commit.format_timings()})")
+        return "\n".join(lines)
+
+    async def _set_status(self, item: BatchItem, status: str, error: str | None = None):
+        item.status = status
+        item.error = error
+        if self.on_update:
+            await self.on_update(self)
+
+    async def _mark_duplicates(self):
+        existing = await self.recipe_book.existing_source_urls()
+        seen: set[str] = set()
+        for item in self.items:
+            normalized = normalize_url(item.url)
+            if normalized in existing or normalized in seen:
+                item.status = "duplicate"
+            seen.add(normalized)
+
+    async def _parse(self, item: BatchItem):
+        await self._set_status(item, "parsing")
+        payload = {
+            "url": item.url,
+            "recipe_text": None,
+            "guild_id": str(self.guild_id) if self.guild_id is not None else None,
+            "requested_by": self.requested_by,
+            "parse_only": True,
+        }
+        slot = (
+            self.admission.slot("recipe-parser", self.guild_id, self.user_id)
+            if self.admission
+            else nullcontext()
+        )
+        try:
+            async with slot:
+                # Bulk imports yield to interactive commands
+                result = await self.n8n.trigger_webhook(
+                    "recipe-parser", payload, lane=BACKGROUND
+                )
+        except Exception as e:
+            await self._set_status(item, "failed", str(e))
+            return
+
+        item.title = result.get("title")
+        if result.get("error"):
+            await self._set_status(item, "failed", result.get("message", "Unknown error"))
+        elif result.get("duplicate"):
+            await self._set_status(item, "duplicate")
+        elif result.get("parsed"):
+            item.parsed = ParsedRecipe.from_result(result)
+            await self._set_status(item, "parsed")
+        else:
+            await self._set_status(item, "failed", "Unexpected workflow response")
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await self._parse(item)
+
+    async def run(self) -> CommitResult | None:
+        """Parse every new URL and commit the results. Returns None if nothing was saved."""
+        await self._mark_duplicates()
+        if self.on_update:
+            await self.on_update(self)
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in self.items:
+            if item.status == "queued":
+                queue.put_nowait(item)
+        await asyncio.gather(
+            *(self._worker(queue) for _ in range(min(self.workers, queue.qsize())))
+        )
+
+        # Two pages can parse to the same title; keep the first so files don't collide
+        parsed: list[BatchItem] = []
+        slugs: set[str] = set()
+        for item in self.items:
+            if item.status != "parsed":
+                continue
+            if item.parsed.slug in slugs:
+                item.status = "duplicate"
+                continue
+            slugs.add(item.parsed.slug)
+            parsed.append(item)
+
+        if not parsed:
+            return None
+
+        try:
+            self.commit = await self.recipe_book.save([item.parsed for item in parsed])
+        except Exception as e:
+            logger.error(f"Batch commit failed: {e}")
+            for item in parsed:
+                item.status = "failed"
+                item.error = f"Commit failed: {e}"
+            if self.on_update:
+                await self.on_update(self)
+            raise
+
+        for item in parsed:
+            item.status = "saved"
+        if self.on_update:
+            await self.on_update(self)
+        return self.commit
@@ -0,0 +1,436 @@
+import asyncio
+import base64
+import io
+import json
+import logging
+import re
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any
+
+import aiohttp
+
+from .github import GitHubClient
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; images are committed as downloaded
+    Image = None
+
+logger = logging.getLogger("marcellobot.recipe_book")
+
+MAX_IMAGES_PER_RECIPE = 3
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+INDEX_PATH = "index.json"
+
+
+@dataclass
+class ParsedRecipe:
+    """A recipe parsed by the recipe-parser workflow, ready to be committed."""
+
+    recipe: dict[str, Any]
+    slug: str
+    filename: str
+    source_url: str | None = None
+
+    @classmethod
+    def from_result(cls, result: dict[str, Any]) -> "ParsedRecipe":
+        """Build from a `parse_only` recipe-parser webhook response."""
+        return cls(
+            recipe=result["recipe"],
+            slug=result["slug"],
+            filename=result["filename"],
+            source_url=result.get("sourceUrl"),
+        )
+
+    @property
+    def title(self) -> str:
+        return self.recipe.get("title", "Unknown Recipe")
+
+    @property
+    def markdown_path(self) -> str:
+        return f"recipes/{self.filename}"
+
+    @property
+    def image_dir(self) -> str:
+        return f"images/{self.slug}"
+
+
+@dataclass
+class DownloadedImage:
+    path: str
+    content: bytes
+    original_url: str
+
+
+@dataclass
+class SavedRecipe:
+    parsed: ParsedRecipe
+    images: list[DownloadedImage] = field(default_factory=list)
+
+    @property
+    def main_image(self) -> DownloadedImage | None:
+        return self.images[0] if self.images else None
+
+
+@dataclass
+class CommitResult:
+    sha: str
+    commit_url: str
+    recipes: list[SavedRecipe]
+    timings: dict[str, float]
+
+    def format_timings(self) -> str:
+        return " | ".join(f"{stage} {secs:.2f}s" for stage, secs in self.timings.items())
+
+
+@contextmanager
+def _timed(timings: dict[str, float], stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = time.perf_counter() - start
+
+
+def _iso_now() -> str:
+    """UTC timestamp in the same format as JavaScript's Date.toISOString()."""
+    return (
+        datetime.now(timezone.utc)
+        .isoformat(timespec="milliseconds")
+        .replace("+00:00", "Z")
+    )
+
+
+def _image_extension(content_type: str) -> str:
+    if "png" in content_type:
+        return "png"
+    if "webp" in content_type:
+        return "webp"
+    if "gif" in content_type:
+        return "gif"
+    return "jpg"
+
+
+def _downscale(content: bytes, ext: str, max_dimension: int) -> bytes:
+    """Shrink an image to fit max_dimension, keeping the original if it isn't smaller."""
+    image_format = {"jpg": "JPEG", "png": "PNG", "webp": "WEBP"}.get(ext)
+    if image_format is None:
+        # Leave GIFs alone so animations survive
+        return content
+
+    try:
+        with Image.open(io.BytesIO(content)) as img:
+            if max(img.size) <= max_dimension:
+                return content
+            img.thumbnail((max_dimension, max_dimension))
+            if image_format == "JPEG" and img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            out = io.BytesIO()
+            img.save(out, format=image_format, quality=85, optimize=True)
+    except (OSError, ValueError):
+        return content
+
+    resized = out.getvalue()
+    return resized if len(resized) < len(content) else content
+
+
+def normalize_url(url: str) -> str:
+    """Normalize a recipe URL for duplicate checks (mirrors the workflow's Check Duplicate node)."""
+    url = re.sub(r"^https?://", "", url.lower())
+    url = url.replace("www.", "", 1)
+    url = re.sub(r"/+$", "", url)
+    return re.sub(r"\?.*$", "", url)
+
+
+def _escape_yaml(value: str | None) -> str:
+    return (value or "").replace('"', '\\"')
+
+
+def render_markdown(
+    recipe: dict[str, Any],
+    source_url: str | None,
+    main_image_path: str | None,
+    date: str,
+) -> str:
+    """Render a recipe to markdown (mirrors the workflow's Create Markdown node)."""
+    lines = ["---", f'title: "{_escape_yaml(recipe["title"])}"']
+    if recipe.get("description"):
+        lines.append(f'description: "{_escape_yaml(recipe["description"])}"')
+    lines.append(f"date: {date}")
+    if recipe.get("source"):
+        lines.append(f'source: "{_escape_yaml(recipe["source"])}"')
+    if source_url:
+        lines.append(f'sourceUrl: "{source_url}"')
+    for key in ("prepTime", "cookTime", "totalTime", "servings"):
+        if recipe.get(key):
+            lines.append(f'{key}: "{recipe[key]}"')
+    if recipe.get("tags"):
+        lines.append("tags:")
+        lines.extend(f"  - {tag}" for tag in recipe["tags"])
+    if main_image_path:
+        lines.append(f'image: "/{main_image_path}"')
+    lines.append("---")
+    markdown = "\n".join(lines) + "\n\n"
+
+    markdown += f"# {recipe['title']}\n\n"
+    if main_image_path:
+        markdown += f"![{recipe['title']}](/{main_image_path})\n\n"
+    if recipe.get("description"):
+        markdown += f"{recipe['description']}\n\n"
+
+    time_info = [
+        f"**{label}:** {recipe[key]}"
+        for key, label in (
+            ("prepTime", "Prep Time"),
+            ("cookTime", "Cook Time"),
+            ("totalTime", "Total Time"),
+            ("servings", "Servings"),
+        )
+        if recipe.get(key)
+    ]
+    if time_info:
+        markdown += " | ".join(time_info) + "\n\n"
+
+    markdown += "## Ingredients\n\n"
+    markdown += "".join(f"- {ing}\n" for ing in recipe["ingredients"])
+    markdown += "\n## Instructions\n\n"
+    markdown += "".join(
+        f"{i}. {step}\n" for i, step in enumerate(recipe["instructions"], start=1)
+    )
+    markdown += "\n"
+
+    if source_url:
+        markdown += f"---\n\n*Source: [{recipe.get('source') or 'Original Recipe'}]({source_url})*\n"
+    else:
+        markdown += f"---\n\n*Source: {recipe.get('source') or 'User submitted'}*\n"
+
+    return markdown
+
+
+class RecipeBook:
+    """
+    Commits parsed recipes to the GitHub recipe book.
+
+    Images for every recipe are downloaded concurrently into size-capped
+    buffers, optionally downscaled, and uploaded as blobs in parallel. All
+    markdown, images and the updated index then land in a single
+    tree/commit/ref update, so save time tracks the slowest image rather
+    than the sum of them.
+    """
+
+    def __init__(
+        self,
+        github: GitHubClient,
+        max_image_bytes: int = 5 * 1024 * 1024,
+        max_image_dimension: int = 1600,
+        download_concurrency: int = 6,
+        blob_concurrency: int = 6,
+        image_timeout: float = 20.0,
+    ):
+        self.github = github
+        self.max_image_bytes = max_image_bytes
+        self.max_image_dimension = max_image_dimension
+        self.image_timeout = image_timeout
+        self._download_slots = asyncio.Semaphore(download_concurrency)
+        self._blob_slots = asyncio.Semaphore(blob_concurrency)
+
+    async def load_index(
+        self, session: aiohttp.ClientSession, ref: str | None = None
+    ) -> list[dict[str, Any]]:
+        """Load the recipe index (`index.json`) at a ref, defaulting to the branch head."""
+        if ref is None:
+            ref = await self.github.get_branch_sha(session)
+        raw = await self.github.get_file(session, INDEX_PATH, ref)
+        if not raw:
+            return []
+        return json.loads(raw).get("recipes", [])
+
+    async def existing_source_urls(self) -> set[str]:
+        """Normalized source URLs of every recipe already in the book."""
+        async with aiohttp.ClientSession() as session:
+            index = await self.load_index(session)
+        return {
+            normalize_url(entry["sourceUrl"])
+            for entry in index
+            if entry.get("sourceUrl")
+        }
+
+    async def save(self, recipes: list[ParsedRecipe]) -> CommitResult:
+        """Commit one or more parsed recipes (with their images) in a single commit."""
+        timings: dict[str, float] = {}
+        started = time.perf_counter()
+
+        async with aiohttp.ClientSession() as session:
+            with _timed(timings, "ref"):
+                head_sha = await self.github.get_branch_sha(session)
+
+            with _timed(timings, "images"):
+                index, downloads = await asyncio.gather(
+                    self.load_index(session, head_sha),
+                    asyncio.gather(
+                        *(self._download_images(session, parsed) for parsed in recipes)
+                    ),
+                )
+            saved = [
+                SavedRecipe(parsed, images) for parsed, images in zip(recipes, downloads)
+            ]
+
+            with _timed(timings, "blobs"):
+                tree_entries = await self._upload_images(session, saved)
+
+            date = _iso_now()
+            for entry in saved:
+                parsed = entry.parsed
+                main_image = entry.main_image
+                tree_entries.append(
+                    {
+                        "path": parsed.markdown_path,
+                        "mode": "100644",
+                        "type": "blob",
+                        "content": render_markdown(
+                            parsed.recipe,
+                            parsed.source_url,
+                            main_image.path if main_image else None,
+                            date,
+                        ),
+                    }
+                )
+                index.append(
+                    {
+                        "title": parsed.title,
+                        "slug": parsed.slug,
+                        "path": parsed.markdown_path,
+                        "sourceUrl": parsed.source_url,
+                        "date": date,
+                        "tags": parsed.recipe.get("tags") or [],
+                    }
+                )
+            tree_entries.append(
+                {
+                    "path": INDEX_PATH,
+                    "mode": "100644",
+                    "type": "blob",
+                    "content": json.dumps(
+                        {"recipes": index}, indent=2, ensure_ascii=False
+                    ),
+                }
+            )
+
+            with _timed(timings, "commit"):
+                tree_sha = await self.github.create_tree(
+                    session, head_sha, tree_entries
+                )
+                commit_sha = await self.github.create_commit(
+                    session, self._commit_message(recipes), tree_sha, head_sha
+                )
+                await self.github.update_branch(session, commit_sha)
+
+        timings["total"] = time.perf_counter() - started
+        result = CommitResult(
+            sha=commit_sha,
+            commit_url=self.github.commit_url(commit_sha),
+            recipes=saved,
+            timings=timings,
+        )
+        logger.info(
+            f"Committed {len(recipes)} recipe(s) as {commit_sha[:7]}: "
+            f"{result.format_timings()}"
+        )
+        return result
+
+    @staticmethod
+    def _commit_message(recipes: list[ParsedRecipe]) -> str:
+        if len(recipes) == 1:
+            return f"Add recipe: {recipes[0].title}"
+        titles = "\n".join(f"- {parsed.title}" for parsed in recipes)
+        return f"Add {len(recipes)} recipes\n\n{titles}"
+
+    async def _download_images(
+        self, session: aiohttp.ClientSession, parsed: ParsedRecipe
+    ) -> list[DownloadedImage]:
+        """Download a recipe's images concurrently, dropping any that fail."""
+        urls = (parsed.recipe.get("imageUrls") or [])[:MAX_IMAGES_PER_RECIPE]
+        if not parsed.source_url or not urls:
+            return []
+
+        images = await asyncio.gather(
+            *(
+                self._download_image(session, url, position, parsed.image_dir)
+                for position, url in enumerate(urls)
+            )
+        )
+        return [image for image in images if image is not None]
+
+    async def _download_image(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        position: int,
+        image_dir: str,
+    ) -> DownloadedImage | None:
+        async with self._download_slots:
+            try:
+                timeout = aiohttp.ClientTimeout(total=self.image_timeout)
+                async with session.get(url, timeout=timeout) as resp:
+                    if resp.status >= 400:
+                        return None
+                    if (resp.content_length or 0) > self.max_image_bytes:
+                        logger.warning(f"Skipping oversized image: {url}")
+                        return None
+
+                    buffer = bytearray()
+                    async for chunk in resp.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                        buffer.extend(chunk)
+                        if len(buffer) > self.max_image_bytes:
+                            logger.warning(f"Skipping oversized image: {url}")
+                            return None
+                    content_type = resp.headers.get("Content-Type", "image/jpeg")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(f"Failed to download image {url}: {e}")
+                return None
+
+        ext = _image_extension(content_type)
+        content = bytes(buffer)
+        if Image is not None and self.max_image_dimension:
+            content = await asyncio.to_thread(
+                _downscale, content, ext, self.max_image_dimension
+            )
+
+        filename = f"main.{ext}" if position == 0 else f"image-{position + 1}.{ext}"
+        return DownloadedImage(
+            path=f"{image_dir}/{filename}", content=content, original_url=url
+        )
+
+    async def _upload_images(
+        self, session: aiohttp.ClientSession, saved: list[SavedRecipe]
+    ) -> list[dict[str, Any]]:
+        """Create blobs for every downloaded image in parallel and return tree entries."""
+        images = [image for entry in saved for image in entry.images]
+        shas = await asyncio.gather(
+            *(self._upload_image(session, image) for image in images)
+        )
+
+        failed = {image.path for image, sha in zip(images, shas) if sha is None}
+        for entry in saved:
+            entry.images = [image for image in entry.images if image.path not in failed]
+
+        return [
+            {"path": image.path, "mode": "100644", "type": "blob", "sha": sha}
+            for image, sha in zip(images, shas)
+            if sha is not None
+        ]
+
+    async def _upload_image(
+        self, session: aiohttp.ClientSession, image: DownloadedImage
+    ) -> str | None:
+        async with self._blob_slots:
+            try:
+                return await self.github.create_blob(
+                    session, base64.b64encode(image.content).decode("ascii"), "base64"
+                )
+            except Exception as e:
+                logger.warning(f"Failed to upload image {image.path}: {e}")
+                return None
@@ -0,0 +1,407 @@
+import asyncio
+import bisect
+import heapq
+import logging
+import math
+import os
+import re
+import time
+import unicodedata
+import zlib
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable
+
+import aiohttp
+
+from .codec import JSONCodec, default_codec
+from .recipe_book import RecipeBook, SavedRecipe
+
+logger = logging.getLogger("marcellobot.recipe_search")
+
+INDEX_VERSION = 1
+# A term in the title counts for three in the ingredients, a tag for two
+FIELD_WEIGHTS = {"title": 3, "tags": 2, "ingredients": 1}
+# BM25 saturation and length normalization
+K1 = 1.2
+B = 0.75
+# Shorter query terms must match exactly; longer ones may match as a prefix
+MIN_PREFIX = 3
+MARKDOWN_FETCH_CONCURRENCY = 6
+
+_WORD_RE = re.compile(r"[a-z]+")
+# Quantities, units and filler that appear in most ingredient lines
+STOP_WORDS = frozenset(
+    """
+    a an and or of the to for in on with into from at by as about
+    cup cups c tbsp tablespoon tablespoons tbs tsp teaspoon teaspoons
+    g gram grams kg ml l liter liters litre litres oz ounce ounces lb lbs pound pounds
+    pinch dash handful can cans package packages pkg clove cloves
+    large medium small whole half piece pieces
+    chopped diced minced sliced grated finely roughly fresh freshly taste optional divided
+    plus more needed about
+    """.split()
+)
+
+
+def _stem(word: str) -> str:
+    """Fold plurals so `tomatoes` matches `tomato` and `berries` matches `berry`."""
+    if len(word) <= 3:
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "sses", "xes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase, accent-free, singular terms of a text, without stop words."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = text.encode("ascii", "ignore").decode()
+    return [_stem(word) for word in _WORD_RE.findall(text) if word not in STOP_WORDS]
+
+
+@dataclass
+class RecipeDoc:
+    """The searchable fields of one recipe in the book."""
+
+    path: str
+    title: str
+    tags: list[str] = field(default_factory=list)
+    ingredients: list[str] = field(default_factory=list)
+    source_url: str | None = None
+
+    def terms(self) -> Counter:
+        """Weighted term frequencies over the title, tags and ingredients."""
+        counts: Counter = Counter()
+        fields = {
+            "title": [self.title],
+            "tags": self.tags,
+            "ingredients": self.ingredients,
+        }
+        for name, texts in fields.items():
+            weight = FIELD_WEIGHTS[name]
+            for text in texts:
+                for term in tokenize(text):
+                    counts[term] += weight
+        return counts
+
+    @classmethod
+    def from_saved(cls, saved: SavedRecipe) -> "RecipeDoc":
+        recipe = saved.parsed.recipe
+        return cls(
+            path=saved.parsed.markdown_path,
+            title=saved.parsed.title,
+            tags=list(recipe.get("tags") or []),
+            ingredients=list(recipe.get("ingredients") or []),
+            source_url=saved.parsed.source_url,
+        )
+
+    @classmethod
+    def from_markdown(cls, path: str, markdown: str, entry: dict | None = None) -> "RecipeDoc":
+        """Read a committed recipe back from its markdown (as `render_markdown` writes it)."""
+        entry = entry or {}
+        title = entry.get("title")
+        tags = list(entry.get("tags") or [])
+        ingredients = []
+        section = None
+        in_frontmatter = markdown.startswith("---")
+        for number, line in enumerate(markdown.splitlines()):
+            if in_frontmatter:
+                if number and line == "---":
+                    in_frontmatter = False
+                elif line.startswith("title:") and not title:
+                    title = line[6:].strip().strip('"').replace('\\"', '"')
+                elif line.startswith("  - ") and not entry.get("tags"):
+                    tags.append(line[4:].strip())
+                continue
+            if line.startswith("## "):
+                section = line[3:].strip().lower()
+            elif line.startswith("# ") and not title:
+                title = line[2:].strip()
+            elif section == "ingredients" and line.startswith("- "):
+                ingredients.append(line[2:].strip())
+        return cls(
+            path=path,
+            title=title or Path(path).stem,
+            tags=tags,
+            ingredients=ingredients,
+            source_url=entry.get("sourceUrl"),
+        )
+
+
+@dataclass
+class SearchHit:
+    doc: RecipeDoc
+    score: float
+    # Indexed terms the recipe matched, prefix matches expanded
+    matched: list[str]
+
+    def matching_ingredients(self, limit: int = 3) -> list[str]:
+        """Ingredient lines containing any matched term."""
+        terms = set(self.matched)
+        lines = [line for line in self.doc.ingredients if terms & set(tokenize(line))]
+        return lines[:limit]
+
+
+class RecipeSearchIndex:
+    """
+    Inverted index over the recipe book's titles, tags and ingredients.
+
+    Each term maps to the recipes containing it with a field-weighted
+    frequency; queries are ranked with BM25, recipes matching every query
+    term first. Terms of three or more letters that aren't indexed match
+    as prefixes (`chick` finds chicken and chickpeas), and a `-term`
+    excludes recipes containing it. Recipes are added as they are
+    committed and the rest is synced from the book's `index.json`, so only
+    new recipes' markdown is ever fetched. The index is saved as a single
+    zlib-compressed file with delta-encoded postings; a `read_only` index
+    loads it but never writes it.
+    """
+
+    def __init__(self, path: str | Path, codec: JSONCodec | None = None, read_only: bool = False):
+        self.path = Path(path)
+        self.codec = codec or default_codec()
+        self.read_only = read_only
+        # Commit of the recipe book the index was last synced to
+        self.head: str | None = None
+        self.docs: list[RecipeDoc | None] = []
+        self.ids: dict[str, int] = {}
+        self.postings: dict[str, dict[int, int]] = {}
+        self.lengths: dict[int, int] = {}
+        self._total_length = 0
+        self._terms: list[str] | None = None
+        self._sync_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.ids
+
+    def add(self, doc: RecipeDoc):
+        """Index a recipe, replacing any earlier version at the same path."""
+        self.remove(doc.path)
+        doc_id = len(self.docs)
+        self.docs.append(doc)
+        self.ids[doc.path] = doc_id
+        self._index(doc_id, doc.terms())
+
+    def _index(self, doc_id: int, terms: Counter):
+        for term, weight in terms.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                self._terms = None
+            postings[doc_id] = weight
+        length = sum(terms.values())
+        self.lengths[doc_id] = length
+        self._total_length += length
+
+    def remove(self, path: str) -> bool:
+        doc_id = self.ids.pop(path, None)
+        if doc_id is None:
+            return False
+        for term in self.docs[doc_id].terms():
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self.postings[term]
+                self._terms = None
+        self._total_length -= self.lengths.pop(doc_id, 0)
+        self.docs[doc_id] = None
+        return True
+
+    def add_saved(self, recipes: Iterable[SavedRecipe]):
+        for saved in recipes:
+            self.add(RecipeDoc.from_saved(saved))
+
+    def _expand(self, term: str) -> list[str]:
+        if term in self.postings or len(term) < MIN_PREFIX:
+            return [term]
+        if self._terms is None:
+            self._terms = sorted(self.postings)
+        start = bisect.bisect_left(self._terms, term)
+        expanded = []
+        for candidate in self._terms[start:]:
+            if not candidate.startswith(term):
+                break
+            expanded.append(candidate)
+        return expanded or [term]
+
+    def search(self, query: str, limit: int = 10) -> list[SearchHit]:
+        """Recipes ranked by how many query terms they match, then by BM25 score."""
+        include, exclude = [], set()
+        for word in query.split():
+            negated = word.startswith("-")
+            for term in tokenize(word):
+                if negated:
+                    exclude.update(self._expand(term))
+                elif term not in include:
+                    include.append(term)
+        if not include or not self.ids:
+            return []
+
+        count = len(self.ids)
+        average = self._total_length / count or 1
+        scores: dict[int, float] = {}
+        matches: dict[int, int] = {}
+        term_hits: list[tuple[list[str], dict[int, int]]] = []
+        lengths = self.lengths
+        for term in include:
+            expanded = self._expand(term)
+            if len(expanded) == 1:
+                hits = self.postings.get(expanded[0], {})
+            else:
+                hits = {}
+                for candidate in expanded:
+                    for doc_id, weight in self.postings.get(candidate, {}).items():
+                        hits[doc_id] = max(hits.get(doc_id, 0), weight)
+            if not hits:
+                continue
+            term_hits.append((expanded, hits))
+            # Counting matches (not listing them) keeps allocation, and so
+            # collector pauses, down on queries touching many recipes
+            idf = math.log(1 + (count - len(hits) + 0.5) / (len(hits) + 0.5))
+            for doc_id, weight in hits.items():
+                norm = K1 * (1 - B + B * lengths[doc_id] / average)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * weight * (K1 + 1) / (weight + norm)
+                matches[doc_id] = matches.get(doc_id, 0) + 1
+
+        excluded = {doc_id for term in exclude for doc_id in self.postings.get(term, ())}
+        ranked = heapq.nlargest(
+            limit,
+            (doc_id for doc_id in scores if doc_id not in excluded),
+            key=lambda doc_id: (matches[doc_id], scores[doc_id]),
+        )
+        return [
+            SearchHit(
+                self.docs[doc_id],
+                scores[doc_id],
+                [
+                    term
+                    for expanded, hits in term_hits
+                    if doc_id in hits
+                    for term in expanded
+                    if doc_id in self.postings.get(term, ())
+                ],
+            )
+            for doc_id in ranked
+        ]
+
+    def dump(self) -> dict:
+        """Compacted state: live recipes renumbered, postings as doc-id deltas."""
+        live = [doc for doc in self.docs if doc is not None]
+        renumber = {self.ids[doc.path]: new_id for new_id, doc in enumerate(live)}
+        postings = {}
+        for term in sorted(self.postings):
+            deltas, weights, previous = [], [], 0
+            for doc_id, weight in sorted(
+                (renumber[old], weight) for old, weight in self.postings[term].items()
+            ):
+                deltas.append(doc_id - previous)
+                weights.append(weight)
+                previous = doc_id
+            postings[term] = [deltas, weights]
+        return {
+            "version": INDEX_VERSION,
+            "head": self.head,
+            "docs": [
+                [doc.path, doc.title, doc.tags, doc.ingredients, doc.source_url] for doc in live
+            ],
+            "postings": postings,
+        }
+
+    def restore(self, state: dict):
+        self.head = state.get("head")
+        self.docs = [RecipeDoc(*fields) for fields in state["docs"]]
+        self.ids = {doc.path: doc_id for doc_id, doc in enumerate(self.docs)}
+        self.postings = {}
+        self.lengths = dict.fromkeys(range(len(self.docs)), 0)
+        for term, (deltas, weights) in state["postings"].items():
+            postings = self.postings[term] = {}
+            doc_id = 0
+            for delta, weight in zip(deltas, weights):
+                doc_id += delta
+                postings[doc_id] = weight
+                self.lengths[doc_id] += weight
+        self._total_length = sum(self.lengths.values())
+        self._terms = None
+
+    def load(self):
+        """Read the saved index, if any; a damaged or outdated file starts it empty."""
+        if not self.path.exists():
+            return
+        try:
+            state = self.codec.loads(zlib.decompress(self.path.read_bytes()))
+            if state.get("version") != INDEX_VERSION:
+                raise ValueError(f"index version {state.get('version')}")
+            self.restore(state)
+        except (OSError, ValueError, KeyError, TypeError, zlib.error) as e:
+            logger.warning(f"Rebuilding recipe search index {self.path}: {e}")
+            return
+        logger.info(f"Loaded recipe search index with {len(self)} recipe(s)")
+
+    def write(self, state: dict):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_bytes(zlib.compress(self.codec.dumps(state)))
+        os.replace(tmp, self.path)
+
+    async def save(self):
+        if self.read_only:
+            return
+        try:
+            await asyncio.to_thread(self.write, self.dump())
+        except OSError as e:
+            logger.warning(f"Failed to save recipe search index: {e}")
+
+    async def sync(self, recipe_book: RecipeBook) -> int:
+        """
+        Bring the index up to the book's branch head: fetch the markdown of
+        recipes it doesn't have and drop ones no longer listed. Returns the
+        number of recipes added.
+        """
+        async with self._sync_lock:
+            started = time.perf_counter()
+            github = recipe_book.github
+            async with aiohttp.ClientSession() as session:
+                head = await github.get_branch_sha(session)
+                if head == self.head:
+                    return 0
+                # Recipes added while this runs aren't in the listing it reads
+                known = set(self.ids)
+                entries = await recipe_book.load_index(session, head)
+                listed = {entry["path"]: entry for entry in entries if entry.get("path")}
+                missing = [path for path in listed if path not in self.ids]
+                slots = asyncio.Semaphore(MARKDOWN_FETCH_CONCURRENCY)
+
+                async def fetch(path: str) -> RecipeDoc | None:
+                    async with slots:
+                        raw = await github.get_file(session, path, head)
+                    if raw is None:
+                        return None
+                    return RecipeDoc.from_markdown(path, raw.decode(errors="replace"), listed[path])
+
+                docs = await asyncio.gather(*(fetch(path) for path in missing))
+
+            for path in known - listed.keys():
+                self.remove(path)
+            added = 0
+            for doc in docs:
+                if doc is not None:
+                    self.add(doc)
+                    added += 1
+            self.head = head
+            await self.save()
+            logger.info(
+                f"Synced recipe search index to {head[:7]}: {added} added, "
+                f"{len(self)} total in {time.perf_counter() - started:.2f}s"
+            )
+            return added
@@ -0,0 +1,356 @@
+import asyncio
+import bisect
+import logging
+import math
+import time
+from array import array
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Iterable
+from urllib.parse import urlsplit
+
+from .n8n import BACKGROUND, N8NClient
+from .price_history import PriceHistory, PriceSeries, parse_price
+from .watches import WatchEntry, epoch_seconds, group_by_product
+
+if TYPE_CHECKING:
+    from .politeness import HostScheduler
+
+logger = logging.getLogger("marcellobot.restock")
+
+HOURS_PER_WEEK = 168
+# Pseudo-counts when blending a product's restock hours with its retailer's and a flat prior
+RETAILER_WEIGHT = 4.0
+UNIFORM_WEIGHT = 2.0
+# Detection stats cover this many recent seconds
+REPORT_WINDOW = 7 * 86400
+
+
+def hour_of_week(timestamp: float) -> int:
+    """UTC hour of the week, Monday 00:00 = 0."""
+    # The epoch was a Thursday
+    return int((timestamp // 3600 + 72) % HOURS_PER_WEEK)
+
+
+def retailer(url: str) -> str:
+    host = urlsplit(url).hostname or ""
+    return host.removeprefix("www.")
+
+
+def restocks(series: PriceSeries, since: float = 0.0) -> list[tuple[float, float]]:
+    """
+    `(time, gap)` for each in-stock check that follows an out-of-stock one.
+
+    The restock happened somewhere in the gap since the previous check, so
+    half of it is the expected detection latency and all of it the worst.
+    """
+    flags = series.stock.tobytes()
+    found = []
+    start = max(bisect.bisect_left(series.timestamps, since) - 1, 0)
+    position = flags.find(b"\x00\x01", start)
+    while position != -1:
+        restocked_at = series.timestamps[position + 1]
+        found.append((restocked_at, restocked_at - series.timestamps[position]))
+        position = flags.find(b"\x00\x01", position + 1)
+    return found
+
+
+class RestockModel:
+    """
+    Hour-of-week restock histograms per product and per retailer.
+
+    A product's restock likelihood for an hour blends its own history with
+    its retailer's (so new products start from the retailer's pattern) and
+    a flat prior (so no hour is ever written off), smoothed over the
+    neighbouring hours because restocks drift a little week to week.
+    """
+
+    def __init__(self):
+        self.products: dict[str, array] = {}
+        self.retailers: dict[str, array] = {}
+
+    def learn(self, url: str, times: Iterable[float]):
+        counts = array("f", bytes(4 * HOURS_PER_WEEK))
+        for timestamp in times:
+            counts[hour_of_week(timestamp)] += 1
+        self.products[url] = counts
+
+    def rebuild_retailers(self):
+        self.retailers = {}
+        for url, counts in self.products.items():
+            totals = self.retailers.setdefault(
+                retailer(url), array("f", bytes(4 * HOURS_PER_WEEK))
+            )
+            for hour, count in enumerate(counts):
+                totals[hour] += count
+
+    @staticmethod
+    def _share(counts: array | None, hour: int) -> tuple[float, float]:
+        """Smoothed share of restocks in `hour`, and the number of restocks seen."""
+        if counts is None:
+            return 0.0, 0.0
+        total = sum(counts)
+        if not total:
+            return 0.0, 0.0
+        smoothed = (
+            0.25 * counts[(hour - 1) % HOURS_PER_WEEK]
+            + 0.5 * counts[hour]
+            + 0.25 * counts[(hour + 1) % HOURS_PER_WEEK]
+        )
+        return smoothed / total, total
+
+    def likelihood(self, url: str, timestamp: float) -> float:
+        """Probability that a restock of `url` falls in the hour containing `timestamp`."""
+        hour = hour_of_week(timestamp)
+        product_share, product_count = self._share(self.products.get(url), hour)
+        retailer_share, retailer_count = self._share(self.retailers.get(retailer(url)), hour)
+        retailer_weight = RETAILER_WEIGHT if retailer_count else 0.0
+        return (
+            product_count * product_share
+            + retailer_weight * retailer_share
+            + UNIFORM_WEIGHT / HOURS_PER_WEEK
+        ) / (product_count + retailer_weight + UNIFORM_WEIGHT)
+
+
+def plan_intervals(
+    weights: dict[str, float],
+    budget_per_hour: float,
+    min_minutes: float,
+    max_minutes: float,
+) -> dict[str, float]:
+    """
+    Split a fetch budget between products, returning minutes between checks.
+
+    Expected detection latency is half the interval, so the total
+    likelihood-weighted latency sum(w / 2r) under sum(r) = budget is
+    minimized by rates proportional to sqrt(w). Products pinned at the
+    interval bounds are fixed and the rest of the budget is re-split;
+    once pinning has spent it all, the rest wait the longest interval.
+    """
+    intervals: dict[str, float] = {}
+    free = dict(weights)
+    budget = budget_per_hour
+    while free:
+        if budget <= 0:
+            for url in free:
+                intervals[url] = max_minutes
+            break
+        roots = {url: math.sqrt(weight) for url, weight in free.items()}
+        total = sum(roots.values()) or 1.0
+        pinned = {}
+        for url, root in roots.items():
+            rate = budget * root / total
+            minutes = 60 / rate if rate > 0 else max_minutes
+            if minutes < min_minutes:
+                pinned[url] = min_minutes
+            elif minutes > max_minutes:
+                pinned[url] = max_minutes
+        if not pinned:
+            for url, root in roots.items():
+                intervals[url] = 60 * total / (budget * root)
+            break
+        for url, minutes in pinned.items():
+            intervals[url] = minutes
+            budget -= 60 / minutes
+            del free[url]
+    return {
+        url: round(min(max(minutes, min_minutes), max_minutes), 1)
+        for url, minutes in intervals.items()
+    }
+
+
+@dataclass
+class PollingReport:
+    """Achieved detection latency against fetches spent over the report window."""
+
+    fetches: int
+    restocks: int
+    mean_latency: float | None  # seconds, expected (half the detection gap)
+    worst_latency: float | None  # seconds, longest detection gap
+    fetches_per_hour: float
+
+
+class AdaptivePoller:
+    """
+    Plans check intervals for adaptive watches and syncs them with n8n.
+
+    Every `sync_interval` seconds each watch-list workflow gets a `sync`
+    call carrying the planned intervals (and the host scheduler's
+    policies and backoffs); it answers with every watch, the checks made
+    since the previous sync, which go into the price history, and
+    per-host fetch reports. Restock hours are learned from that history, and the fetch
+    budget left after fixed-interval watches is spread over the adaptive
+    ones by restock likelihood for the coming hour.
+    """
+
+    def __init__(
+        self,
+        n8n: N8NClient,
+        prices: PriceHistory,
+        webhooks: list[str],
+        budget_per_hour: float = 600,
+        min_minutes: float = 1,
+        max_minutes: float = 60,
+        sync_interval: float = 300,
+        hosts: "HostScheduler | None" = None,
+        on_sync: Callable[[], None] | None = None,
+    ):
+        self.n8n = n8n
+        self.prices = prices
+        self.webhooks = webhooks
+        self.budget_per_hour = budget_per_hour
+        self.min_minutes = min_minutes
+        self.max_minutes = max_minutes
+        self.sync_interval = sync_interval
+        self.hosts = hosts
+        # Called after each round of syncs, with the watch lists fresh
+        self.on_sync = on_sync
+        self.model = RestockModel()
+        self.watches: dict[str, list[WatchEntry]] = {}  # webhook -> all guilds' entries
+        self.intervals: dict[str, dict[str, float]] = {}  # webhook -> url -> minutes
+        self.last_sync = 0.0
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self._run(), name="adaptive-poller")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def sync(self, webhook: str):
+        payload = {"action": "sync", "intervals": self.intervals.get(webhook, {})}
+        if self.hosts:
+            payload["hosts"] = self.hosts.sync_payload()
+        result = await self.n8n.trigger_webhook(webhook, payload, lane=BACKGROUND)
+        if result.get("error") or not isinstance(result.get("products"), list):
+            logger.warning(f"Watch sync with {webhook} failed: {result.get('message')}")
+            return
+        if self.hosts and isinstance(result.get("hosts"), dict):
+            self.hosts.merge(result["hosts"])
+
+        entries = []
+        for product in result["products"]:
+            try:
+                entries.append(WatchEntry.from_dict(product))
+            except (KeyError, TypeError, ValueError):
+                continue
+        self.watches[webhook] = entries
+        await asyncio.to_thread(self._record_checks, result.get("checks") or [])
+
+    def _record_checks(self, checks: list[dict]):
+        for product in checks:
+            url = product.get("url")
+            for check in product.get("checks") or []:
+                try:
+                    checked_at, price, in_stock = check
+                except (TypeError, ValueError):
+                    continue
+                if url:
+                    self.prices.record(
+                        url, parse_price(price), in_stock is True, epoch_seconds(checked_at)
+                    )
+
+    def plan(self, now: float | None = None) -> dict[str, dict[str, float]]:
+        """Recompute adaptive intervals for every watch-list workflow."""
+        now = time.time() if now is None else now
+        # The monitors fetch each product once for all the guilds watching it
+        products = [
+            (webhook, url, entries)
+            for webhook, items in self.watches.items()
+            for url, entries in group_by_product(items).items()
+        ]
+
+        since = now - 365 * 86400
+        for url in {url for _, url, _ in products}:
+            series = self.prices.get(url)
+            self.model.learn(url, [at for at, _ in restocks(series, since)] if series else [])
+        self.model.rebuild_retailers()
+
+        # Fixed-interval products are spent first; adaptive ones share what's left.
+        # A product with any adaptive subscriber is planned, though a fixed
+        # subscriber's shorter interval still applies in the workflow.
+        fixed = sum(
+            60 / max(min(entry.interval_minutes for entry in entries), 1)
+            for _, _, entries in products
+            if not any(entry.adaptive for entry in entries)
+        )
+        budget = max(self.budget_per_hour - fixed, 0.1 * self.budget_per_hour)
+        weights = {
+            (webhook, url): self.model.likelihood(url, now)
+            for webhook, url, entries in products
+            if any(entry.adaptive for entry in entries)
+        }
+        planned = plan_intervals(weights, budget, self.min_minutes, self.max_minutes)
+
+        intervals: dict[str, dict[str, float]] = {}
+        for (webhook, url), minutes in planned.items():
+            intervals.setdefault(webhook, {})[url] = minutes
+        self.intervals = intervals
+        return intervals
+
+    def snapshot(self) -> dict:
+        # Watches aren't kept: the next sync fetches them before anything plans
+        return {"last_sync": self.last_sync, "intervals": self.intervals}
+
+    def restore(self, data: dict):
+        self.last_sync = data["last_sync"]
+        self.intervals = data["intervals"]
+
+    def report(self, now: float | None = None) -> PollingReport:
+        now = time.time() if now is None else now
+        since = now - REPORT_WINDOW
+        fetches = 0
+        gaps: list[float] = []
+        urls = {url for items in self.watches.values() for url in group_by_product(items)}
+        for url in urls:
+            series = self.prices.get(url)
+            if series is None:
+                continue
+            fetches += len(series) - bisect.bisect_left(series.timestamps, since)
+            gaps.extend(gap for _, gap in restocks(series, since))
+        return PollingReport(
+            fetches=fetches,
+            restocks=len(gaps),
+            mean_latency=sum(gaps) / len(gaps) / 2 if gaps else None,
+            worst_latency=max(gaps) if gaps else None,
+            fetches_per_hour=fetches / (REPORT_WINDOW / 3600),
+        )
+
+    async def _run(self):
+        # After a warm restart the restored plan stands until the next sync is due
+        await asyncio.sleep(max(self.last_sync + self.sync_interval - time.time(), 0.0))
+        while True:
+            for webhook in self.webhooks:
+                try:
+                    await self.sync(webhook)
+                except Exception as e:
+                    logger.warning(f"Watch sync with {webhook} failed: {e}")
+            self.last_sync = time.time()
+            if self.on_sync:
+                self.on_sync()
+            try:
+                intervals = await asyncio.to_thread(self.plan)
+                report = await asyncio.to_thread(self.report)
+                logger.info(
+                    f"Planned {sum(map(len, intervals.values()))} adaptive watch interval(s); last 7d: "
+                    f"{report.fetches} checks ({report.fetches_per_hour:.0f}/h), "
+                    f"{report.restocks} restock(s), "
+                    + (
+                        f"expected detection {report.mean_latency / 60:.1f} min"
+                        if report.mean_latency is not None
+                        else "no restocks seen"
+                    )
+                )
+            except Exception as e:
+                logger.warning(f"Adaptive polling plan failed: {e}")
+            await asyncio.sleep(self.sync_interval)
@@ -0,0 +1,190 @@
+import asyncio
+import gc
+import logging
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from .codec import JSONCodec, default_codec, get_codec
+
+logger = logging.getLogger("marcellobot.snapshot")
+
+MAGIC = b"MBSNAP"
+FORMAT_VERSION = 1
+# Magic, format version, then the length of the index that follows
+HEADER = struct.Struct(f"<{len(MAGIC)}sHI")
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot file is missing its header or from another format."""
+
+
+class _Section:
+    def __init__(self, version: int, dump: Callable[[], Any], restore: Callable[[Any], None]):
+        self.version = version
+        self.dump = dump
+        self.restore = restore
+
+
+class SnapshotStore:
+    """
+    Hands in-memory state from one bot process to the next.
+
+    Caches, indexes and schedulers register a named section with a dump
+    and a restore function. On shutdown every section is dumped and
+    written to one file: a fixed header, a JSON index of sections (with
+    each one's version, offset and length) and the encoded sections. On
+    startup the file is memory-mapped and only the index is decoded; a
+    section is decoded when its owner registers, so state nobody asks for
+    costs nothing, and a section whose version changed is skipped. The
+    file is removed once startup is done, so a crash never restores state
+    older than the last clean shutdown, and snapshots older than
+    `max_age` seconds are ignored.
+    """
+
+    def __init__(self, path: str | Path, max_age: float = 900, codec: JSONCodec | None = None):
+        self.path = Path(path)
+        self.max_age = max_age
+        self.codec = codec or default_codec()
+        self.saved = False
+        self._sections: dict[str, _Section] = {}
+        self._file = None
+        self._map: mmap.mmap | None = None
+        self._index: dict[str, list[int]] = {}
+        self._codec: JSONCodec | None = None
+        self._base = 0
+
+    def load(self) -> int:
+        """Map the snapshot file and read its index, returning the number of sections."""
+        if not self.path.exists():
+            return 0
+        try:
+            self._open()
+        except (OSError, ValueError, SnapshotError) as e:
+            logger.warning(f"Ignoring snapshot {self.path}: {e}")
+            self.discard()
+            return 0
+        return len(self._index)
+
+    def _open(self):
+        self._file = open(self.path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            raise SnapshotError("file is truncated")
+        magic, version, index_length = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise SnapshotError("not a snapshot file")
+        if version != FORMAT_VERSION:
+            raise SnapshotError(f"format version {version}, expected {FORMAT_VERSION}")
+        self._base = HEADER.size + index_length
+        index = default_codec().loads(self._map[HEADER.size : self._base])
+        age = time.time() - index["created_at"]
+        if self.max_age and age > self.max_age:
+            raise SnapshotError(f"taken {age:.0f}s ago")
+        self._codec = get_codec(index["codec"])
+        self._index = index["sections"]
+        logger.info(f"Found snapshot from {age:.0f}s ago with {len(self._index)} section(s)")
+
+    def register(
+        self,
+        name: str,
+        version: int,
+        dump: Callable[[], Any],
+        restore: Callable[[Any], None],
+    ) -> bool:
+        """
+        Include a section in future snapshots; restore it now if the loaded
+        snapshot has it at the same version. Returns whether it was restored.
+        """
+        self._sections[name] = _Section(version, dump, restore)
+        entry = self._index.pop(name, None)
+        if entry is None or self._map is None:
+            return False
+        saved_version, offset, length = entry
+        if saved_version != version:
+            logger.info(f"Skipping snapshot section {name}: version {saved_version} != {version}")
+            return False
+        started = time.perf_counter()
+        # Restoring allocates many objects that all survive; collecting while
+        # it runs only rescans them, so the collector waits until it's done
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            start = self._base + offset
+            restore(self._codec.loads(self._map[start : start + length]))
+        except Exception as e:
+            logger.warning(f"Failed to restore snapshot section {name}: {e}")
+            return False
+        finally:
+            if collecting:
+                gc.enable()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Restored {name} from snapshot in {elapsed_ms:.0f}ms")
+        return True
+
+    def unregister(self, name: str):
+        self._sections.pop(name, None)
+
+    def discard(self):
+        """Close and delete the loaded snapshot; sections registered later start cold."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._index = {}
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Failed to remove snapshot {self.path}: {e}")
+
+    def dump(self) -> dict[str, tuple[int, Any]]:
+        """Every registered section's state; call from the event loop."""
+        state = {}
+        for name, section in self._sections.items():
+            try:
+                state[name] = (section.version, section.dump())
+            except Exception as e:
+                logger.warning(f"Failed to snapshot {name}: {e}")
+        return state
+
+    def write(self, state: dict[str, tuple[int, Any]]):
+        """Encode dumped state and replace the snapshot file atomically."""
+        bodies = []
+        sections = {}
+        offset = 0
+        for name, (version, data) in state.items():
+            body = self.codec.dumps(data)
+            sections[name] = [version, offset, len(body)]
+            bodies.append(body)
+            offset += len(body)
+        index = default_codec().dumps(
+            {"created_at": time.time(), "codec": self.codec.name, "sections": sections}
+        )
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "wb") as file:
+            file.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(index)))
+            file.write(index)
+            for body in bodies:
+                file.write(body)
+        os.replace(tmp, self.path)
+
+    async def save(self):
+        """Snapshot every registered section (once per process)."""
+        if self.saved:
+            return
+        self.saved = True
+        started = time.perf_counter()
+        state = self.dump()
+        await asyncio.to_thread(self.write, state)
+        logger.info(
+            f"Saved {len(state)} snapshot section(s) to {self.path} "
+            f"in {(time.perf_counter() - started) * 1000:.0f}ms"
+        )
@@ -0,0 +1,96 @@
+import logging
+
+from .ollama import OllamaBusy, OllamaClient, OllamaError
+
+logger = logging.getLogger("marcellobot.stock_analysis")
+
+# Same cap as the workflow's Prepare HTML node
+MAX_HTML_CHARS = 50_000
+# The workflow's AI Stock Analyzer prompt; {html} is replaced with the page
+STOCK_PROMPT = """\
+You are a product stock availability analyzer. Analyze the following HTML and determine:
+1. If the product is currently in stock
+2. The product name
+3. The product price
+
+HTML to analyze:
+{html}
+
+Respond in JSON format only:
+{
+  "inStock": true/false,
+  "productName": "product name",
+  "price": "$XX.XX or price string",
+  "confidence": "high/medium/low",
+  "reasoning": "brief explanation of how you determined stock status"
+}
+
+CRITICAL RULES FOR STOCK DETECTION:
+1. FIRST check for OUT OF STOCK indicators - if ANY of these exist, set inStock=false:
+   - Text containing: "Out of Stock", "Sold Out", "Unavailable", "Coming Soon"
+   - Disabled buttons with text like "Out of Stock"
+   - "Notify Me" or "Back in Stock Alert" buttons
+   - availability: "OutOfStock" in schema
+
+2. ONLY set inStock=true if you find ACTIVE "Add to Cart" or "Buy Now" buttons
+   - Button must NOT be disabled
+   - Button must be clickable/actionable
+   - availability: "InStock" in schema
+
+3. When uncertain or conflicting signals, ALWAYS default to inStock=false with low confidence
+
+4. Be EXTREMELY strict - false positives (saying in-stock when out) are worse than false negatives"""
+
+
+def stock_prompt(html: str) -> str:
+    return STOCK_PROMPT.replace("{html}", html[:MAX_HTML_CHARS])
+
+
+def stock_verdict(output, url: str | None) -> dict:
+    """
+    Shape a model answer like the workflow's response (mirrors its Process
+    AI Result and Respond Success nodes).
+    """
+    if not isinstance(output, dict):
+        return {
+            "success": False,
+            "error": True,
+            "message": "Failed to check stock: Failed to parse AI response",
+        }
+    in_stock = output.get("inStock") is True
+    name = output.get("productName") or "Unknown Product"
+    price = output.get("price") or "Unknown"
+    status = "🟢 **IN STOCK!** " if in_stock else "🔴 **Out of Stock** - "
+    return {
+        "success": True,
+        "inStock": in_stock,
+        "productName": name,
+        "price": price,
+        "confidence": output.get("confidence") or "unknown",
+        "reasoning": output.get("reasoning") or "",
+        "url": url,
+        "message": f"{status}{name} ({price})",
+    }
+
+
+async def analyze_stock_page(ollama: OllamaClient, page: dict) -> dict:
+    """
+    Judge a product page returned by the universal checker's `page_only`
+    mode. Failed fetches are passed through as the workflow reported them.
+    """
+    if page.get("error") or not page.get("pageOnly"):
+        return page
+    try:
+        generation = await ollama.generate(stock_prompt(page.get("html") or ""))
+        output = generation.json()
+    except (OllamaBusy, OllamaError) as e:
+        return {"success": False, "error": True, "message": f"Failed to check stock: {e}"}
+    except ValueError:
+        output = None
+    else:
+        logger.debug(
+            f"Analyzed {page.get('url')} in {generation.total_ms:.0f}ms "
+            f"({generation.prompt_tokens}+{generation.eval_tokens} tokens, "
+            f"load {generation.load_ms:.0f}ms, batch of {generation.batch_size})"
+        )
+    return stock_verdict(output, page.get("url"))
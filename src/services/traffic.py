@@ -0,0 +1,177 @@
+import contextvars
+import gzip
+import hashlib
+import hmac
+import itertools
+import logging
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Iterator
+
+from .codec import JSONCodec, default_codec
+from .watches import normalize_url
+
+logger = logging.getLogger("marcellobot.traffic")
+
+TRACE_VERSION = 1
+# Response fields whose values are never written to a trace
+SECRET_KEY_RE = re.compile(r"token|secret|password|authorization|api[_-]?key|cookie", re.I)
+PERSONAL_KEYS = frozenset({"added_by", "triggered_by", "user", "username", "requested_by"})
+# Options holding free text; traces keep only their length
+FREE_TEXT_OPTIONS = frozenset({"recipe_text", "data", "value"})
+FREE_TEXT_LENGTH = 200
+# Discord option types for a subcommand and a subcommand group
+SUBCOMMAND_TYPES = (1, 2)
+
+# Id of the recorded command the current task is serving
+_current_command: contextvars.ContextVar[int | None] = contextvars.ContextVar(
+    "traced_command", default=None
+)
+
+
+def sanitize(value: Any) -> Any:
+    """A copy of a webhook response with secrets and user names blanked."""
+    if isinstance(value, dict):
+        return {
+            key: "[redacted]"
+            if SECRET_KEY_RE.search(str(key)) or key in PERSONAL_KEYS
+            else sanitize(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [sanitize(item) for item in value]
+    return value
+
+
+def redact_option(name: str, value: Any) -> Any:
+    if isinstance(value, str) and (name in FREE_TEXT_OPTIONS or len(value) > FREE_TEXT_LENGTH):
+        return {"$redacted": len(value)}
+    return value
+
+
+def unredact_option(value: Any) -> Any:
+    """A stand-in of the recorded length for a redacted option."""
+    if isinstance(value, dict) and "$redacted" in value:
+        return "x" * value["$redacted"]
+    return value
+
+
+def command_options(data: dict) -> tuple[str, dict[str, Any]]:
+    """Full command name (`config set`) and flat options of an interaction payload."""
+    names = [data.get("name", "")]
+    options = data.get("options") or []
+    while options and options[0].get("type") in SUBCOMMAND_TYPES:
+        names.append(options[0]["name"])
+        options = options[0].get("options") or []
+    return " ".join(names), {option["name"]: option.get("value") for option in options}
+
+
+def read_trace(path: str | Path, codec: JSONCodec | None = None) -> Iterator[dict]:
+    """Events of a trace file, header first."""
+    codec = codec or default_codec()
+    path = Path(path)
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rb") as file:
+        for line in file:
+            if line.strip():
+                yield codec.loads(line)
+
+
+class TrafficRecorder:
+    """
+    Records slash commands and n8n webhook calls to a JSONL trace.
+
+    One line per event, offset in seconds from the start of the trace:
+    a `command` with its options, and an `n8n` call with its lane,
+    request size, latency and response, tagged with the command that
+    made it. Guild and user IDs become keyed hashes that only match
+    within one trace; free-text options keep only their length, and
+    response fields that look like secrets or user names are blanked.
+    Request payloads are not kept, only their size and product URL.
+    A path ending in `.gz` is gzip-compressed.
+    """
+
+    def __init__(self, path: str | Path, codec: JSONCodec | None = None):
+        self.path = Path(path)
+        self.codec = codec or default_codec()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        opener = gzip.open if self.path.suffix == ".gz" else open
+        self._file = opener(self.path, "ab")
+        self._key = os.urandom(16)
+        self._started = time.monotonic()
+        self._ids = itertools.count(1)
+        self.events = 0
+        self._write({"type": "trace", "version": TRACE_VERSION, "started_at": time.time()})
+
+    def _write(self, event: dict):
+        if self._file is None:
+            return
+        try:
+            self._file.write(self.codec.dumps(event) + b"\n")
+            self.events += 1
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Failed to record {event.get('type')} event: {e}")
+
+    def _offset(self) -> float:
+        return round(time.monotonic() - self._started, 4)
+
+    def _pseudonym(self, snowflake: int | None) -> int | None:
+        if snowflake is None:
+            return None
+        digest = hmac.new(self._key, str(snowflake).encode(), hashlib.sha256).digest()
+        return int.from_bytes(digest[:7], "big")
+
+    def command(self, guild_id: int | None, user_id: int, data: dict) -> int:
+        """Record a slash command; n8n calls made while serving it are tagged with its id."""
+        name, options = command_options(data)
+        command_id = next(self._ids)
+        _current_command.set(command_id)
+        self._write(
+            {
+                "type": "command",
+                "t": self._offset(),
+                "id": command_id,
+                "command": name,
+                "guild": self._pseudonym(guild_id),
+                "user": self._pseudonym(user_id),
+                "options": {key: redact_option(key, value) for key, value in options.items()},
+            }
+        )
+        return command_id
+
+    def n8n_call(
+        self,
+        webhook: str,
+        lane: str,
+        payload: dict | None,
+        elapsed_ms: float,
+        result: Any,
+        request_bytes: int = 0,
+        status: int | None = None,
+        content_type: str | None = None,
+    ):
+        url = (payload or {}).get("url")
+        event = {
+            "type": "n8n",
+            "t": self._offset(),
+            "command": _current_command.get(),
+            "webhook": webhook,
+            "lane": lane,
+            "key": normalize_url(url) if isinstance(url, str) else None,
+            "request_bytes": request_bytes,
+            "ms": round(elapsed_ms, 1),
+            "response": sanitize(result),
+        }
+        if status is not None:
+            # Streamed calls keep the raw status and body
+            event["status"] = status
+            event["content_type"] = content_type
+        self._write(event)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            logger.info(f"Recorded {self.events} traffic event(s) to {self.path}")
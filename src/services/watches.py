@@ -0,0 +1,260 @@
+import logging
+import sys
+from dataclasses import dataclass, fields
+from datetime import datetime, timezone
+from typing import Any, Iterable, Iterator
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger("marcellobot.watches")
+
+# Query parameters that only say where a link was shared from
+TRACKING_PARAMS = frozenset({"fbclid", "gclid", "msclkid", "irclickid", "irgwc", "ref"})
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a product URL, so the same page watched from several
+    guilds is fetched once: lowercase scheme and host, no default port,
+    fragment, trailing slash or tracking parameters, remaining query
+    parameters sorted. The monitor workflows apply the same rules.
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    host = parts.hostname
+    if not scheme or not host:
+        return url
+    if ":" in host:
+        host = f"[{host}]"
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+    path = parts.path.rstrip("/") or "/"
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def group_by_product(entries: Iterable["WatchEntry"]) -> dict[str, list["WatchEntry"]]:
+    """Watch entries grouped by normalized URL: one fetch serves each group."""
+    groups: dict[str, list[WatchEntry]] = {}
+    for entry in entries:
+        groups.setdefault(normalize_url(entry.url), []).append(entry)
+    return groups
+
+
+def _snowflake(value: Any) -> int:
+    """Discord IDs arrive as strings from n8n; store them as ints (0 when missing)."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def epoch_seconds(value: Any) -> float:
+    """ISO-8601 timestamp (as n8n writes them) to epoch seconds (0.0 when missing)."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not value:
+        return 0.0
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return 0.0
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _iso(epoch: float) -> str | None:
+    if not epoch:
+        return None
+    return (
+        datetime.fromtimestamp(epoch, timezone.utc)
+        .isoformat(timespec="milliseconds")
+        .replace("+00:00", "Z")
+    )
+
+
+@dataclass(slots=True)
+class WatchEntry:
+    """
+    One watched product in one guild.
+
+    IDs are ints and times are epoch seconds (0 meaning never/unknown);
+    the URL, product name and `added_by` are interned, since the same
+    product is often watched from several guilds and the same user adds
+    many products.
+    """
+
+    url: str
+    guild_id: int
+    interval_minutes: int = 5
+    product_name: str = ""
+    added_by: str = ""
+    logs_channel_id: int = 0
+    alerts_channel_id: int = 0
+    added_at: float = 0.0
+    last_checked: float = 0.0
+    last_in_stock: bool = False
+    price_drop_below: float = 0.0  # alert threshold, 0 when unset
+    last_price: float = 0.0
+    adaptive: bool = False  # interval planned by the bot instead of fixed
+
+    def __post_init__(self):
+        self.url = sys.intern(self.url)
+        self.product_name = sys.intern(self.product_name)
+        self.added_by = sys.intern(self.added_by)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "WatchEntry":
+        """Parse an entry in the shape the n8n watch-list workflows store."""
+        last_in_stock = data.get("last_in_stock")
+        return cls(
+            url=data["url"],
+            guild_id=_snowflake(data.get("guild_id")),
+            interval_minutes=int(data.get("interval_minutes") or 5),
+            product_name=data.get("product_name") or "",
+            added_by=data.get("added_by") or "",
+            logs_channel_id=_snowflake(data.get("logs_channel_id")),
+            alerts_channel_id=_snowflake(data.get("alerts_channel_id")),
+            added_at=epoch_seconds(data.get("added_at")),
+            last_checked=epoch_seconds(data.get("last_checked")),
+            last_in_stock=last_in_stock is True or last_in_stock == "true",
+            price_drop_below=float(data.get("price_drop_below") or 0),
+            last_price=float(data.get("last_price") or 0),
+            adaptive=data.get("adaptive") in (True, "true"),
+        )
+
+    def to_payload(self) -> dict[str, Any]:
+        """The `add` payload for the watch-list webhooks (IDs as strings)."""
+        payload = {
+            "action": "add",
+            "url": self.url,
+            "interval_minutes": self.interval_minutes,
+            "guild_id": str(self.guild_id),
+            "added_by": self.added_by,
+            "logs_channel_id": str(self.logs_channel_id),
+            "alerts_channel_id": str(self.alerts_channel_id),
+        }
+        if self.price_drop_below:
+            payload["price_drop_below"] = self.price_drop_below
+        if self.adaptive:
+            payload["adaptive"] = True
+        return payload
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            **self.to_payload(),
+            "product_name": self.product_name or "Unknown Product",
+            "added_at": _iso(self.added_at),
+            "last_checked": _iso(self.last_checked),
+            "last_in_stock": self.last_in_stock,
+            "last_price": self.last_price or None,
+        }
+
+
+def pack_entries(entries: Iterable[WatchEntry]) -> dict[str, Any]:
+    """
+    Entries column by column for snapshots, with strings as positions in
+    one table: the same URLs, names and users repeat across guilds.
+    """
+    entries = list(entries)
+    strings: dict[str, int] = {}
+    columns = []
+    for f in fields(WatchEntry):
+        column = [getattr(entry, f.name) for entry in entries]
+        if f.type is str:
+            column = [strings.setdefault(value, len(strings)) for value in column]
+        columns.append(column)
+    return {
+        "fields": [f.name for f in fields(WatchEntry)],
+        "text": [f.name for f in fields(WatchEntry) if f.type is str],
+        "strings": list(strings),
+        "columns": columns,
+    }
+
+
+def unpack_entries(data: dict[str, Any]) -> list[WatchEntry]:
+    strings = [sys.intern(value) for value in data["strings"]]
+    text = set(data["text"])
+    # Written by a version with other fields: keep the ones that still exist
+    known = {f.name for f in fields(WatchEntry)}
+    columns = {
+        name: [strings[i] for i in column] if name in text else column
+        for name, column in zip(data["fields"], data["columns"])
+        if name in known
+    }
+    if list(columns) == [f.name for f in fields(WatchEntry)]:
+        return [WatchEntry(*row) for row in zip(*columns.values())]
+    names = list(columns)
+    return [WatchEntry(**dict(zip(names, row))) for row in zip(*columns.values())]
+
+
+class WatchStore:
+    """
+    The bot's view of every watch list, keyed by webhook, guild and URL.
+
+    n8n owns the lists; this mirror is updated from the watch/unwatch
+    commands and replaced per guild whenever a watch list is fetched.
+    """
+
+    def __init__(self):
+        self._lists: dict[str, dict[tuple[int, str], WatchEntry]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._lists.values())
+
+    def product_count(self) -> int:
+        """Distinct products across all guilds, i.e. fetches per monitor round."""
+        return sum(len(group_by_product(entries.values())) for entries in self._lists.values())
+
+    def add(self, webhook: str, entry: WatchEntry):
+        self._lists.setdefault(sys.intern(webhook), {})[entry.guild_id, entry.url] = entry
+
+    def remove(self, webhook: str, guild_id: int, url: str) -> WatchEntry | None:
+        entries = self._lists.get(webhook, {})
+        return entries.pop((guild_id, url), None) or entries.pop(
+            (guild_id, normalize_url(url)), None
+        )
+
+    def replace_guild(self, webhook: str, guild_id: int, products: list[dict[str, Any]]):
+        """Replace one guild's entries with a watch list fetched from n8n."""
+        entries = self._lists.setdefault(sys.intern(webhook), {})
+        for key in [key for key in entries if key[0] == guild_id]:
+            del entries[key]
+        for product in products:
+            try:
+                entry = WatchEntry.from_dict(product)
+            except (KeyError, TypeError, ValueError) as e:
+                logger.debug(f"Skipping malformed watch entry from {webhook}: {e}")
+                continue
+            entries[entry.guild_id, entry.url] = entry
+
+    def snapshot(self) -> dict[str, Any]:
+        return {webhook: pack_entries(entries.values()) for webhook, entries in self._lists.items()}
+
+    def restore(self, data: dict[str, Any]):
+        for webhook, packed in data.items():
+            entries = self._lists.setdefault(sys.intern(webhook), {})
+            for entry in unpack_entries(packed):
+                entries.setdefault((entry.guild_id, entry.url), entry)
+
+    def entries(self, webhook: str | None = None) -> Iterator[WatchEntry]:
+        lists = [self._lists.get(webhook, {})] if webhook else self._lists.values()
+        for entries in lists:
+            yield from entries.values()
+
+    def guild_entries(self, webhook: str, guild_id: int) -> list[WatchEntry]:
+        return [
+            entry
+            for (entry_guild, _), entry in self._lists.get(webhook, {}).items()
+            if entry_guild == guild_id
+        ]
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import socket
+
+import pytest
+
+from src.services.cluster import ClusterIPC
+
+
+def free_port_pair() -> int:
+    """A base port whose next port is free too."""
+    while True:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        with socket.socket() as sock:
+            try:
+                sock.bind(("127.0.0.1", port + 1))
+            except OSError:
+                continue
+        return port
+
+
+async def raw_request(port: int, request: dict) -> dict:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(json.dumps(request).encode() + b"\n")
+    await writer.drain()
+    reply = json.loads(await reader.readline())
+    writer.close()
+    return reply
+
+
+def test_requests_need_the_shared_token():
+    async def main():
+        base = free_port_pair()
+        server = ClusterIPC(1, 2, base, "secret")
+        calls = []
+
+        async def reload_config(data):
+            calls.append(data)
+            return {"ok": True}
+
+        server.register("reload_config", reload_config)
+        await server.start()
+        try:
+            client = ClusterIPC(0, 2, base, "secret")
+            assert await client.request(1, "reload_config", {"a": 1}) == {"ok": True}
+
+            for request in (
+                {"op": "reload_config", "data": {"a": 2}},
+                {"op": "reload_config", "data": {"a": 3}, "token": "guess"},
+            ):
+                reply = await raw_request(base + 1, request)
+                assert reply == {"ok": False, "error": "unauthorized"}
+
+            with pytest.raises(RuntimeError):
+                await ClusterIPC(0, 2, base, "wrong").request(1, "reload_config")
+        finally:
+            await server.close()
+        assert calls == [{"a": 1}]
+
+    asyncio.run(main())
+
+
+def test_replies_past_the_default_line_limit():
+    async def main():
+        base = free_port_pair()
+        server = ClusterIPC(1, 2, base, "secret")
+        hosts = {f"shop-{i}.example": {"requests": i, "waits": 0} for i in range(5000)}
+
+        async def stats(data):
+            return {"hosts": hosts}
+
+        server.register("stats", stats)
+        await server.start()
+        try:
+            reply = await ClusterIPC(0, 2, base, "secret").request(1, "stats")
+        finally:
+            await server.close()
+        assert reply == {"hosts": hosts}
+
+    asyncio.run(main())
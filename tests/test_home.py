@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+from src.services.home import HomeBatcher
+
+
+class FakeN8N:
+    def __init__(self):
+        self.calls = []
+
+    async def trigger_webhook(self, path, payload, **kwargs):
+        self.calls.append(payload)
+        return {"message": "ok"}
+
+
+def test_cancel_reports_each_submitters_own_spelling():
+    async def main():
+        n8n = FakeN8N()
+        batcher = HomeBatcher(n8n, window=0.05)
+        return n8n, await asyncio.gather(
+            batcher.submit("lights_on", ["Kitchen"], "a"),
+            batcher.submit("lights_on", ["kitchen"], "b"),
+            batcher.submit("lights_off", ["kitchen"], "c"),
+        )
+
+    n8n, outcomes = asyncio.run(main())
+    assert n8n.calls == []
+    assert [outcome.sent for outcome in outcomes] == [[], [], []]
+    assert [outcome.cancelled for outcome in outcomes] == [["Kitchen"], ["kitchen"], ["kitchen"]]
+
+
+def test_close_fails_waiting_actions():
+    async def main():
+        batcher = HomeBatcher(FakeN8N(), window=10)
+        waiting = asyncio.create_task(batcher.submit("lights_on", ["Hall"], "a"))
+        await asyncio.sleep(0)
+        await batcher.close()
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(waiting, 1)
+
+    asyncio.run(main())
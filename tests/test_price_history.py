@@ -0,0 +1,50 @@
+import threading
+
+from src.services.price_history import PriceHistory
+
+URL = "https://shop.example/widget"
+
+
+def test_late_observations_are_kept_in_time_order(tmp_path):
+    history = PriceHistory(tmp_path)
+    # An interactive check records "now" before the monitor's earlier checks sync
+    assert history.record(URL, 12.0, True, timestamp=300)
+    assert history.record(URL, 10.0, False, timestamp=100)
+    assert history.record(URL, 11.0, True, timestamp=200)
+    assert not history.record(URL, 11.0, True, timestamp=200)
+
+    series = history.get(URL)
+    assert list(series.timestamps) == [100, 200, 300]
+    assert list(series.prices) == [10.0, 11.0, 12.0]
+    assert list(series.stock) == [0, 1, 1]
+
+    reloaded = PriceHistory(tmp_path)
+    reloaded.load()
+    series = reloaded.get(URL)
+    assert list(series.timestamps) == [100, 200, 300]
+    assert list(series.prices) == [10.0, 11.0, 12.0]
+    assert list(series.stock) == [0, 1, 1]
+
+
+def test_concurrent_writers_keep_rows_aligned(tmp_path):
+    history = PriceHistory(tmp_path)
+
+    def write(offset: int):
+        for index in range(200):
+            timestamp = 1000 + index * 4 + offset
+            history.record(URL, float(timestamp), timestamp % 2 == 0, timestamp=timestamp)
+
+    threads = [threading.Thread(target=write, args=(offset,)) for offset in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    reloaded = PriceHistory(tmp_path)
+    reloaded.load()
+    series = reloaded.get(URL)
+    assert len(series) == 800
+    assert list(series.timestamps) == sorted(series.timestamps)
+    for timestamp, price, in_stock in zip(series.timestamps, series.prices, series.stock):
+        assert price == timestamp
+        assert in_stock == (timestamp % 2 == 0)
@@ -0,0 +1,21 @@
+from src.services.restock import plan_intervals
+
+
+def test_plan_intervals_splits_budget_by_sqrt_weight():
+    intervals = plan_intervals({"a": 1, "b": 4}, 30, 1, 60)
+    assert intervals == {"a": 6.0, "b": 3.0}
+
+
+def test_plan_intervals_exhausted_budget_waits_longest_interval():
+    # Pinning b and c at the maximum spends the whole budget
+    for budget in (2.0, 1.99):
+        intervals = plan_intervals({"a": 1000, "b": 1, "c": 1}, budget, 1, 60)
+        assert intervals == {"a": 60, "b": 60, "c": 60}
+
+
+def test_plan_intervals_stay_within_bounds():
+    weights = {f"p{index}": float(index) for index in range(1, 40)}
+    for budget in (0.0, 0.5, 10, 100, 10_000):
+        intervals = plan_intervals(weights, budget, 1, 60)
+        assert set(intervals) == set(weights)
+        assert all(1 <= minutes <= 60 for minutes in intervals.values())